@@ -0,0 +1,301 @@
+"""
+Times the GUI hot paths against histories of 1e3 to 1e6 samples, offscreen. Ex:
+
+    python benchmark.py --out after.json --baseline before.json
+
+The App methods are run unchanged on an offscreen stand-in for the window: the plots are drawn on Agg canvases and
+the Tk widgets and variables are replaced by no-ops, so the numbers are the Python, numpy and matplotlib cost without
+the Tk calls. The results are saved as JSON, and with --baseline every timing is compared against an earlier run.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from live_plot import LivePlot, SequenceMinimap
+from render_scheduler import ChangeCache
+from oven_session import OvenSession
+from oven_gui_main import App
+
+SIZES = (1000, 10000, 100000, 1000000)
+TIME_SCALES = ['1 minute', '3 minutes', '5 minutes', '10 minutes', '20 minutes', '40 minutes', '60 minutes', '120 minutes', "All time"][::-1]
+PROFILE = f'{os.path.dirname(os.path.abspath(__file__))}/cure_cycle_130C.csv'
+SAMPLE_PERIOD = 1.0     # Seconds between the synthetic samples
+
+
+class NullIngest:
+    def open(self, *args):
+        pass
+
+    def close(self, *args):
+        pass
+
+    def write(self, *args):
+        pass
+
+
+class NullVar:
+    def __init__(self, value=None):
+        self.value = value
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class NullWidget:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class ImmediateRenders:
+    """
+    Renders as soon as it's requested, so a sample is timed through to the end of its redraw
+    """
+
+    def __init__(self, app):
+        self.callbacks = {'plot': app.render_plot, 'labels': app.render_labels, 'minimap': app.render_minimap}
+
+    def request(self, name):
+        self.callbacks[name]()
+
+
+class OffscreenApp:
+    """
+    Just enough of App for its plot and update methods to run without a display
+    """
+
+    receive_controller_data_and_update = App.receive_controller_data_and_update
+    update_controller_widgets = App.update_controller_widgets
+    render_labels = App.render_labels
+    render_plot = App.render_plot
+    render_minimap = App.render_minimap
+    update_fleet_overview = App.update_fleet_overview
+    show_session_state = App.show_session_state
+    set_heater_indicator = App.set_heater_indicator
+    preheat_bar = App.preheat_bar
+    show_auto_seq_buttons = App.show_auto_seq_buttons
+    update_seq_minimap = App.update_seq_minimap
+    draw_plot = App.draw_plot
+    get_mins_lims_from_plt_str = App.get_mins_lims_from_plt_str
+
+    def __init__(self, session, hidpi_bool=True):
+        self.session = session
+        self.sessions = {session.name: session}
+        self.fleet_bool = False
+        self.hidpi_bool = hidpi_bool
+        self.time_scales = TIME_SCALES
+        self.plt_scale_var = NullVar('1 minute')
+
+        self.status_colors = {'INACTIVE': 'black', 'CONNECTED': 'blue', 'RUNNING': 'green', 'ESTOPPED': 'red'}
+        self.str_status, self.str_mode, self.str_action = NullVar(), NullVar(), NullVar()
+        self.flt_mean_temp, self.flt_stddev, self.flt_setpoint = NullVar(), NullVar(), NullVar()
+        self.str_fan1, self.str_fan2, self.str_heater_status = NullVar(), NullVar(), NullVar()
+        self.str_cure = NullVar()
+        self.tc_strs = [NullVar() for _ in range(session.history.n_tc)]
+        self.lbl_status = self.btn_estop = self.heater_canvas = self.status_indicator = NullWidget()
+        self.btn_submit_seq_auto = self.btn_select_seq_auto = NullWidget()
+        self.btn_abort_seq_auto = None      # Not running a sequence
+        self.auto_tab_built_bool = 1
+        self.lbl_preheat = self.prog_bar_preheating = None
+
+        self.display_cache = ChangeCache()
+        self.dirty_sessions = set()
+        self.render_scheduler = ImmediateRenders(self)
+
+        self.fig_main_temp_plot = Figure(figsize=(12, 7), dpi=100)
+        self.canvas_main_temp_plot = FigureCanvasAgg(self.fig_main_temp_plot)
+        self.live_plot = LivePlot(self.fig_main_temp_plot, self.canvas_main_temp_plot, hidpi_bool)
+        self.live_plot.create_lines(session.history.n_tc)
+        self.canvas_main_temp_plot.draw()
+
+        self.fig_seq = Figure(figsize=(3, 3.5), dpi=100)
+        self.canvas_autoseq = FigureCanvasAgg(self.fig_seq)
+        self.seq_minimap = SequenceMinimap(self.fig_seq, self.canvas_autoseq, session.auto_sequence_profile, hidpi_bool)
+
+
+def make_session(n, dirname, n_tc=6, seed=0):
+    """
+    A session holding n samples of a 130C hold, as if it had been recording for n seconds
+    """
+
+    session = OvenSession('Oven 1', NullIngest(), '.', dirname, TIME_SCALES, n_tc=n_tc, log=lambda msg: None)
+    session.port = 'benchmark'
+    session.mode = 'MANUAL'
+    session.status = 'RUNNING'
+    session.load_auto_seq(PROFILE)
+    session.profile_mode = 'host'   # Streamed from here like start_auto_seq() does, update_auto_seq() computes the setpoints
+    session.timebase = time.time() - n*SAMPLE_PERIOD
+
+    rng = np.random.default_rng(seed)
+    epoch = session.timebase + SAMPLE_PERIOD*np.arange(n)
+    rel_time = (epoch - session.timebase)/60
+    temps = np.round(130 + rng.normal(0, 1.5, (n, n_tc)), 2)
+
+    # Bulk fill, the same columns that n calls of receive_controller_data would produce
+    history = session.history
+    history.chunk_size = n
+    history._grow()
+    history._epoch[:n] = epoch
+    history._rel_time[:n] = rel_time
+    history._temp[:n] = temps
+    history._setpoint[:n] = 130
+    history._estop[:n] = 0
+    history._heater[:n] = np.arange(n) % 2
+    history._fan1[:n] = 1800
+    history._fan2[:n] = 1810
+    history._mode[:n] = 2
+    history._status[:n] = 2
+    history.n = n
+
+    lo = np.minimum(temps.min(axis=1), 130)
+    hi = np.maximum(temps.max(axis=1), 130)
+    for t, l, h in zip(rel_time, lo, hi):
+        session.plot_windows.push(t, l, h)
+
+    session.rel_time = rel_time[-1]
+    session.tc_readings = temps[-1].astype(float)
+    session.setpoint = 130.0
+    return session
+
+
+def time_call(func, min_time=0.2, max_reps=200):
+    """
+    Calls func until min_time has passed (at least twice, at most max_reps times) and returns the timings in ms
+    """
+
+    times = []
+    t_stop = time.perf_counter() + min_time
+    while len(times) < max_reps and (len(times) < 2 or time.perf_counter() < t_stop):
+        t_start = time.perf_counter()
+        func()
+        times.append(1000*(time.perf_counter() - t_start))
+    return times
+
+
+def run_benchmarks(sizes, min_time, max_csv_size):
+    results = {}
+
+    def record(name, n, times):
+        results.setdefault(name, {})[str(n)] = {'median_ms': float(np.median(times)),
+                                                 'min_ms': float(np.min(times)),
+                                                 'mean_ms': float(np.mean(times)),
+                                                 'reps': len(times)}
+        print(f'{name:<40}{n:>10}{np.median(times):>12.3f} ms  ({len(times)} reps)', flush=True)
+
+    with tempfile.TemporaryDirectory() as dirname:
+        for n in sizes:
+            session = make_session(n, dirname)
+            app = OffscreenApp(session)
+            app.draw_plot()     # First draw builds the background
+
+            # One new sample per call, continuing the history
+            rng = np.random.default_rng(1)
+            def receive():
+                temps = ' '.join(f'{t:.2f}' for t in 130 + rng.normal(0, 1.5, session.history.n_tc))
+                app.receive_controller_data_and_update(session, f'{temps} 1 130.00 0', session.history.epoch[-1] + SAMPLE_PERIOD)
+            record('receive_controller_data_and_update', n, time_call(receive, min_time))
+            record('cure_metrics.update', n, time_call(lambda: session.cure_metrics.update(session.rel_time, session.tc_readings,
+                                                                                           session.temp_mean, session.setpoint), min_time))
+
+            for scale in ('1 minute', 'All time'):
+                app.plt_scale_var.set(scale)
+                record(f'get_mins_lims_from_plt_str ({scale})', n, time_call(app.get_mins_lims_from_plt_str, min_time))
+                record(f'draw_plot ({scale})', n, time_call(app.draw_plot, min_time))
+            app.plt_scale_var.set('1 minute')
+
+            # In the middle of the profile, so the sequence keeps running
+            session.mode = 'AUTO'
+            session.rel_time = session.auto_sequence[-1,0]/2
+            record('update_auto_seq', n, time_call(session.update_auto_seq, min_time))
+            app.update_seq_minimap()     # First draw builds the background
+            record('update_seq_minimap', n, time_call(app.update_seq_minimap, min_time))
+
+            # Progress moving by a pixel every call, the worst case of a fast replay
+            px_step = session.auto_sequence[-1,0]/app.seq_minimap.ax.bbox.width
+            def advance():
+                session.rel_time = (session.rel_time + px_step) % session.auto_sequence[-1,0]
+                app.update_seq_minimap()
+            record('update_seq_minimap (1 px step)', n, time_call(advance, min_time))
+            session.mode = 'MANUAL'
+
+            if n <= max_csv_size:
+                record('save_data_to_csv', n, time_call(session.save_data_to_csv, min_time, max_reps=5))
+
+            session.close_run_log()
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints each timing next to its baseline. Returns the number of regressions beyond the tolerance
+    """
+
+    n_regressions = 0
+    print(f'\n{"":<40}{"Samples":>10}{"Baseline":>12}{"Now":>12}{"Ratio":>8}')
+    for name, by_size in results.items():
+        for n, result in by_size.items():
+            base = baseline.get('results', {}).get(name, {}).get(n)
+            if base is None:
+                continue
+            ratio = result['median_ms']/base['median_ms']
+            flag = ''
+            if ratio > 1 + tolerance:
+                flag = '  SLOWER'
+                n_regressions += 1
+            elif ratio < 1/(1 + tolerance):
+                flag = '  faster'
+            print(f'{name:<40}{n:>10}{base["median_ms"]:>10.3f}ms{result["median_ms"]:>10.3f}ms{ratio:>8.2f}{flag}')
+    return n_regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the GUI hot paths')
+    parser.add_argument('--sizes', type=lambda s: [int(float(n)) for n in s.split(',')], default=SIZES, help='History sizes, ex. 1e3,1e4')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Seconds to spend on each timing')
+    parser.add_argument('--max-csv-size', type=float, default=1e5, help='Largest history to time save_data_to_csv on')
+    parser.add_argument('--out', default=f'benchmark-{datetime.now().strftime("%Y%m%d-%H%M%S")}.json', help='JSON file for the results')
+    parser.add_argument('--baseline', help='Earlier results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Slowdown over the baseline that counts as a regression')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.min_time, args.max_csv_size)
+
+    # The sample rate that the UI keeps up with, if every sample is drawn
+    print()
+    for n, result in results['receive_controller_data_and_update'].items():
+        print(f'{n:>10} samples: keeps up with {1000/result["median_ms"]:.0f} samples/s')
+
+    output = {'meta': {'date': datetime.now().isoformat(timespec='seconds'),
+                       'python': sys.version.split()[0],
+                       'numpy': np.__version__,
+                       'matplotlib': matplotlib.__version__,
+                       'platform': platform.platform(),
+                       'sizes': list(args.sizes)},
+              'results': results}
+    with open(args.out, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f'\nWrote results to: {args.out}')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import argparse
+import glob
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+from oven_session import ESTOP_SETPOINT_C
+from runfile import RunFileReader, load_csv
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    path TEXT PRIMARY KEY,      -- First file of the run, relative to the app directory
+    run_dir TEXT,
+    mtime REAL,                 -- Modification time of the last file when it was indexed
+    start_epoch REAL,
+    end_epoch REAL,
+    duration_min REAL,
+    n_samples INTEGER,
+    peak_temp REAL,
+    mean_temp REAL,
+    max_setpoint REAL,
+    max_tc_spread REAL,
+    profile TEXT,
+    estop_codes TEXT,           -- Comma separated, empty if the run was never estopped
+    fan1_mean REAL,
+    fan1_max INTEGER,
+    fan2_mean REAL,
+    fan2_max INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_start ON runs (start_epoch);
+CREATE INDEX IF NOT EXISTS runs_setpoint ON runs (max_setpoint);
+"""
+
+SEGMENT_RE = re.compile(r'-seg(\d{3})\.csv$')
+
+
+def summarize(store):
+    """
+    Per-run statistics from a TelemetryStore
+    """
+
+    temp = store.temp
+    setpoint = store.setpoint[store.setpoint < ESTOP_SETPOINT_C]   # The estop setpoint isn't a cure temperature
+    return {'start_epoch': float(store.epoch[0]),
+            'end_epoch': float(store.epoch[-1]),
+            'duration_min': float(store.rel_time[-1] - store.rel_time[0]),
+            'n_samples': len(store),
+            'peak_temp': float(np.nanmax(temp)),
+            'mean_temp': float(np.nanmean(temp)),
+            'max_setpoint': float(setpoint.max()) if len(setpoint) else None,
+            'max_tc_spread': float(np.nanmax(np.nanmax(temp, axis=1) - np.nanmin(temp, axis=1))),
+            'fan1_mean': float(store.fan1.mean()),
+            'fan1_max': int(store.fan1.max()),
+            'fan2_mean': float(store.fan2.mean()),
+            'fan2_max': int(store.fan2.max())}
+
+
+class RunCatalog:
+    """
+    SQLite index of every run under the runs directory
+
+    Sessions add their run as soon as its log is closed, and scan() picks up anything written before the catalog
+    existed (or by another copy of the app). Queries only touch the index, never the run files.
+
+    """
+
+    def __init__(self, app_dirname='.', fname='runs/catalog.sqlite'):
+        self.app_dirname = app_dirname or '.'
+        os.makedirs(os.path.dirname(f'{self.app_dirname}/{fname}'), exist_ok=True)
+        self.db = sqlite3.connect(f'{self.app_dirname}/{fname}')
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def _relpath(self, fname):
+        return os.path.relpath(fname, self.app_dirname)
+
+    def add(self, fnames, store, profile=None, estop_codes=()):
+        """
+        Indexes one run. fnames are all of its files (ex. the run log segments), store holds its samples
+        """
+
+        if not len(store):
+            return
+        if not estop_codes and store.estop.any():
+            estop_codes = (1,)      # The files only record that the oven was estopped, not the fault code
+
+        row = summarize(store)
+        row.update(path=self._relpath(fnames[0]),
+                   run_dir=self._relpath(os.path.dirname(fnames[0])),
+                   mtime=max(os.path.getmtime(f) for f in fnames),
+                   profile=profile,
+                   estop_codes=','.join(str(c) for c in sorted(set(estop_codes))))
+
+        cols = ', '.join(row)
+        self.db.execute(f'INSERT OR REPLACE INTO runs ({cols}) VALUES ({", ".join("?"*len(row))})', tuple(row.values()))
+        self.db.commit()
+
+    def scan(self, runs_dirname='runs'):
+        """
+        Indexes the run files that are new or have changed since they were last indexed. Returns the number of runs added
+        """
+
+        # Group the run log segments so each run is indexed once. Any other CSV is a Save Data... export, whose
+        # samples are already in the run log next to it. Sessions recorded before the run log existed only have
+        # their exports, so those are indexed instead
+        runs, exports = {}, []
+        for fname in sorted(glob.glob(f'{self.app_dirname}/{runs_dirname}/**/*.csv', recursive=True)):
+            if SEGMENT_RE.search(fname):
+                runs.setdefault(SEGMENT_RE.sub('', fname), []).append(fname)
+            else:
+                exports.append(fname)
+        run_log_dirs = {os.path.dirname(fnames[0]) for fnames in runs.values()}
+        for fname in exports:
+            if os.path.dirname(fname) in run_log_dirs:
+                print(f'Skipping {fname}: an export, its run log is indexed instead')
+            else:
+                runs[fname] = [fname]
+        for fname in sorted(glob.glob(f'{self.app_dirname}/{runs_dirname}/**/*.ezrun', recursive=True)):
+            runs[fname] = [fname]
+
+        indexed = {row['path']: row['mtime'] for row in self.db.execute('SELECT path, mtime FROM runs')}
+        n_added = 0
+        for fnames in runs.values():
+            if indexed.get(self._relpath(fnames[0])) == max(os.path.getmtime(f) for f in fnames):
+                continue
+            try:
+                store = RunFileReader(fnames[0]).to_store() if fnames[0].endswith('.ezrun') else load_csv(fnames)
+            except (ValueError, OSError) as e:
+                print(f'Skipping {fnames[0]}: {e}')
+                continue
+            if store is not None and len(store):
+                self.add(fnames, store)
+                n_added += 1
+        return n_added
+
+    def query(self, setpoint=None, setpoint_tol=1.0, since=None, until=None, min_spread=None, min_duration=None,
+              estopped=None, profile=None):
+        """
+        Runs matching every given filter, newest first. setpoint matches the highest setpoint of the run within
+        setpoint_tol, since/until are datetimes, min_spread is the worst TC spread in degC, min_duration is in minutes
+
+        """
+
+        where, args = [], []
+        if setpoint is not None:
+            where.append('max_setpoint BETWEEN ? AND ?')
+            args += [setpoint - setpoint_tol, setpoint + setpoint_tol]
+        if since is not None:
+            where.append('start_epoch >= ?')
+            args.append(since.timestamp())
+        if until is not None:
+            where.append('start_epoch < ?')
+            args.append(until.timestamp())
+        if min_spread is not None:
+            where.append('max_tc_spread > ?')
+            args.append(min_spread)
+        if min_duration is not None:
+            where.append('duration_min >= ?')
+            args.append(min_duration)
+        if estopped is not None:
+            where.append("estop_codes != ''" if estopped else "estop_codes = ''")
+        if profile is not None:
+            where.append('profile = ?')
+            args.append(profile)
+
+        sql = 'SELECT * FROM runs'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        return self.db.execute(sql + ' ORDER BY start_epoch DESC', args).fetchall()
+
+    def close(self):
+        self.db.close()
+
+
+def print_runs(rows):
+    print(f'{"Start":<20}{"Duration":>10}{"Setpoint":>10}{"Peak":>8}{"Mean":>8}{"Spread":>8}{"Estop":>7}  {"Profile":<24}Path')
+    for row in rows:
+        start = datetime.fromtimestamp(row['start_epoch']).strftime('%Y/%m/%d %H:%M:%S')
+        duration = str(timedelta(minutes=row['duration_min'])).split('.')[0]
+        setpoint = f'{row["max_setpoint"]:.1f}' if row['max_setpoint'] is not None else '-'
+        print(f'{start:<20}{duration:>10}{setpoint:>10}{row["peak_temp"]:>8.1f}{row["mean_temp"]:>8.1f}{row["max_tc_spread"]:>8.1f}'
+              f'{row["estop_codes"] or "-":>7}  {row["profile"] or "-":<24}{row["path"]}')
+
+
+if __name__ == "__main__":
+    # Ex. all the 130C cures of the last month with a TC spread over 5C:
+    #     python catalog.py --setpoint 130 --last-days 30 --min-spread 5
+    parser = argparse.ArgumentParser(description='Query the run catalog')
+    parser.add_argument('--no-scan', action='store_true', help="Don't index new run files before querying")
+    parser.add_argument('--setpoint', type=float, help='Highest setpoint of the run [degC]')
+    parser.add_argument('--setpoint-tol', type=float, default=1.0, help='Tolerance on --setpoint [degC]')
+    parser.add_argument('--since', type=datetime.fromisoformat, help='Runs started on or after this date (YYYY-MM-DD)')
+    parser.add_argument('--until', type=datetime.fromisoformat, help='Runs started before this date (YYYY-MM-DD)')
+    parser.add_argument('--last-days', type=float, help='Runs started in the last N days')
+    parser.add_argument('--min-spread', type=float, help='Worst TC spread over this [degC]')
+    parser.add_argument('--min-duration', type=float, help='Runs at least this long [min]')
+    parser.add_argument('--estopped', action='store_true', default=None, help='Only runs that were estopped')
+    parser.add_argument('--profile', help='Auto sequence file name')
+    args = parser.parse_args()
+
+    catalog = RunCatalog(os.path.dirname(os.path.abspath(__file__)))
+    if not args.no_scan:
+        n_added = catalog.scan()
+        if n_added:
+            print(f'Indexed {n_added} new runs')
+
+    since = args.since
+    if args.last_days is not None:
+        since = datetime.now() - timedelta(days=args.last_days)
+
+    t_start = time.perf_counter()
+    rows = catalog.query(args.setpoint, args.setpoint_tol, since, args.until, args.min_spread, args.min_duration,
+                         args.estopped, args.profile)
+    t_query = time.perf_counter() - t_start
+
+    print_runs(rows)
+    print(f'{len(rows)} runs ({t_query*1000:.1f} ms)')
+    catalog.close()
@@ -0,0 +1,148 @@
+import json
+import numpy as np
+
+GAS_CONSTANT = 8.314e-3     # kJ/(mol K)
+KELVIN = 273.15
+ESTOP_THRESHOLD_C = 1000    # The firmware takes any setpoint over it as an estop (see oven_session.ESTOP_SETPOINT_C), not a cure temperature
+
+
+class CureMetrics:
+    """
+    Running cure metrics of every TC and of their mean, updated in constant time per sample
+
+    Per channel (the TCs, then the mean):
+        time_above          Minutes above threshold_c. The samples are joined by straight lines, so a sample
+                            interval that crosses the threshold counts the part of it that is above
+        equivalent_time     Arrhenius-equivalent cure time, the minutes at ref_temp_c that give the same thermal dose.
+                            Trapezoidal integral of exp(-Ea/R (1/T - 1/T_ref))
+        peak_temp
+        peak_overshoot      Highest temperature over the highest setpoint so far [C]. Only counted once the channel
+                            has come up to the setpoint from below, so an oven that starts out warmer than the first
+                            setpoints of a ramp doesn't count as overshooting. 0 until then
+        max_heat_rate       Fastest rise and fall [C/min], over intervals of at least ramp_span minutes so the
+        max_cool_rate       sensor noise doesn't count as a ramp
+    And across the TCs, worst_spread: the largest difference between the hottest and coldest TC, and when it was.
+
+    Only the previous sample and the running values are kept, the history is never rescanned.
+
+    """
+
+    def __init__(self, n_tc=6, threshold_c=120.0, ref_temp_c=130.0, activation_kj=65.0, ramp_span=1.0):
+        self.n_tc = n_tc
+        self.threshold_c = threshold_c
+        self.ref_temp_c = ref_temp_c
+        self.activation_kj = activation_kj     # Activation energy of the resin [kJ/mol]
+        self.ramp_span = ramp_span
+        self.channels = [f'TC{i+1}' for i in range(n_tc)] + ['mean']
+        self._temps = np.zeros(n_tc + 1)       # Scratch buffer, the TCs and the mean of the current sample
+        self.clear()
+
+    def clear(self):
+        n = self.n_tc + 1
+        self.n_samples = 0
+        self.last_t = None
+        self.last_temps = np.zeros(n)
+        self.last_weights = np.zeros(n)
+
+        self.time_above = np.zeros(n)
+        self.equivalent_time = np.zeros(n)
+        self.peak_temp = np.full(n, -np.inf)
+        self.max_setpoint = None
+        self.below_bool = np.zeros(n, dtype=bool)      # Has been below the setpoint
+        self.reached_bool = np.zeros(n, dtype=bool)    # Has come up to the setpoint from below since
+        self.peak_overshoot = np.zeros(n)
+
+        self.ramp_t = None      # Start of the current ramp interval
+        self.ramp_temps = np.zeros(n)
+        self.max_heat_rate = np.zeros(n)
+        self.max_cool_rate = np.zeros(n)
+
+        self.worst_spread = 0.0
+        self.t_worst_spread = None
+
+    def arrhenius_weight(self, temps):
+        return np.exp(-self.activation_kj/GAS_CONSTANT*(1/(temps + KELVIN) - 1/(self.ref_temp_c + KELVIN)))
+
+    def update(self, t, temps, temp_mean, setpoint):
+        """
+        Adds one sample: t in minutes, the TC temperatures (nans already filled in), their mean, and the setpoint
+        """
+
+        temps_all = self._temps
+        temps_all[:self.n_tc] = temps
+        temps_all[-1] = temp_mean
+        weights = self.arrhenius_weight(temps_all)
+
+        if self.last_t is not None and t > self.last_t:
+            dt = t - self.last_t
+            lo = np.minimum(self.last_temps, temps_all) - self.threshold_c
+            hi = np.maximum(self.last_temps, temps_all) - self.threshold_c
+            with np.errstate(divide='ignore', invalid='ignore'):
+                fraction_above = np.where(hi <= 0, 0.0, np.where(lo >= 0, 1.0, hi/(hi - lo)))
+            self.time_above += fraction_above*dt
+            self.equivalent_time += 0.5*(weights + self.last_weights)*dt
+
+        np.maximum(self.peak_temp, temps_all, out=self.peak_temp)
+        if 0 < setpoint < ESTOP_THRESHOLD_C:
+            if self.max_setpoint is None or setpoint > self.max_setpoint:
+                self.max_setpoint = setpoint
+            self.below_bool |= temps_all < setpoint
+            self.reached_bool |= self.below_bool & (temps_all >= setpoint)
+        if self.reached_bool.any():
+            overshoot = np.where(self.reached_bool, temps_all - self.max_setpoint, 0.0)
+            np.maximum(self.peak_overshoot, overshoot, out=self.peak_overshoot)
+
+        if self.ramp_t is None:
+            self.ramp_t = t
+            self.ramp_temps[:] = temps_all
+        elif t - self.ramp_t >= self.ramp_span:
+            rates = (temps_all - self.ramp_temps)/(t - self.ramp_t)
+            np.maximum(self.max_heat_rate, rates, out=self.max_heat_rate)
+            np.maximum(self.max_cool_rate, -rates, out=self.max_cool_rate)
+            self.ramp_t = t
+            self.ramp_temps[:] = temps_all
+
+        spread = temps_all[:self.n_tc].max() - temps_all[:self.n_tc].min()
+        if spread > self.worst_spread:
+            self.worst_spread = float(spread)
+            self.t_worst_spread = t
+
+        self.last_t = t
+        self.last_temps[:] = temps_all
+        self.last_weights[:] = weights
+        self.n_samples += 1
+
+    def status_str(self):
+        """
+        One line for the status pane, from the mean temperature
+        """
+
+        if not self.n_samples:
+            return '--'
+        overshoot = f'{self.peak_overshoot[-1]:+.1f}\N{DEGREE CELSIUS}' if self.reached_bool[-1] else '--'
+        return (f'{self.time_above[-1]:.1f} min > {self.threshold_c:g}\N{DEGREE CELSIUS}, '
+                f't_eq {self.equivalent_time[-1]:.1f} min, overshoot {overshoot}, '
+                f'ramp {self.max_heat_rate[-1]:.1f}\N{DEGREE CELSIUS}/min, spread {self.worst_spread:.1f}\N{DEGREE CELSIUS}')
+
+    def summary(self):
+        channels = {}
+        for i, name in enumerate(self.channels):
+            channels[name] = {'time_above_min': float(self.time_above[i]),
+                              'equivalent_time_min': float(self.equivalent_time[i]),
+                              'peak_temp_c': float(self.peak_temp[i]) if self.n_samples else None,
+                              'peak_overshoot_c': float(self.peak_overshoot[i]) if self.reached_bool[i] else None,
+                              'max_heat_rate_c_per_min': float(self.max_heat_rate[i]),
+                              'max_cool_rate_c_per_min': float(self.max_cool_rate[i])}
+        return {'threshold_c': self.threshold_c,
+                'ref_temp_c': self.ref_temp_c,
+                'activation_kj_per_mol': self.activation_kj,
+                'ramp_span_min': self.ramp_span,
+                'n_samples': self.n_samples,
+                'max_setpoint_c': self.max_setpoint,
+                'worst_tc_spread_c': self.worst_spread,
+                'worst_tc_spread_at_min': self.t_worst_spread,
+                'channels': channels}
+
+    def save(self, fname):
+        with open(fname, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
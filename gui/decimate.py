@@ -0,0 +1,96 @@
+import math
+import numpy as np
+
+
+class MinMaxDecimator:
+    """
+    Render-time min/max-per-bucket decimation of a growing (n, k) history column
+
+    Each line keeps the sample index of its minimum and maximum inside every bucket, so peaks and overshoot survive
+    the decimation. Buckets are a power of two samples wide and aligned to absolute sample indices, so finished
+    buckets are computed once and reused by every later frame. A frame only costs the new samples plus the number of
+    buckets on screen, no matter how long the run is.
+
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._levels = {}    # bucket size -> [n_buckets_done, imin, imax]
+
+    def _level(self, y, b):
+        n_full = y.shape[0] // b
+        level = self._levels.get(b)
+        if level is None or level[0]*b > y.shape[0]:    # First use, or the history was cleared underneath us
+            level = [0, np.empty((0, y.shape[1]), dtype=np.int64), np.empty((0, y.shape[1]), dtype=np.int64)]
+            self._levels[b] = level
+
+        done, imin, imax = level
+        if n_full > done:
+            if n_full > imin.shape[0]:     # Grow geometrically like the history store does
+                capacity = max(n_full, 2*imin.shape[0], 64)
+                imin = np.resize(imin, (capacity, y.shape[1]))
+                imax = np.resize(imax, (capacity, y.shape[1]))
+
+            blocks = y[done*b:n_full*b].reshape(n_full - done, b, y.shape[1])
+            offsets = (np.arange(done, n_full)*b)[:, None]
+            imin[done:n_full] = blocks.argmin(axis=1) + offsets
+            imax[done:n_full] = blocks.argmax(axis=1) + offsets
+            level[:] = [n_full, imin, imax]
+
+        return level[1][:n_full], level[2][:n_full]
+
+    @staticmethod
+    def _partial(y, start, stop):
+        # Min/max indices of a single, unfinished bucket
+        chunk = y[start:stop]
+        return chunk.argmin(axis=0)[None, :] + start, chunk.argmax(axis=0)[None, :] + start
+
+    def indices(self, y, start, max_points):
+        """
+        Sample indices (m, k) to draw for each of the k columns of y[start:], m <= ~max_points. Returns None when
+        the window is small enough to be drawn as is
+
+        """
+
+        stop = y.shape[0]
+        n = stop - start
+        n_buckets = max(max_points // 2, 2)
+        if n <= 2*n_buckets:
+            return None
+
+        b = 2**math.ceil(math.log2(n/n_buckets))
+        imin, imax = self._level(y, b)
+
+        first = -(-start // b)    # First bucket fully inside the window
+        last = stop // b          # Buckets [first, last) are finished and cached
+        parts_min = [imin[first:last]]
+        parts_max = [imax[first:last]]
+        if start < first*b:
+            head_min, head_max = self._partial(y, start, first*b)
+            parts_min.insert(0, head_min)
+            parts_max.insert(0, head_max)
+        if last*b < stop:
+            tail_min, tail_max = self._partial(y, last*b, stop)
+            parts_min.append(tail_min)
+            parts_max.append(tail_max)
+
+        bucket_min = np.concatenate(parts_min)
+        bucket_max = np.concatenate(parts_max)
+
+        # Interleave each bucket's two points in time order
+        idx = np.empty((2*bucket_min.shape[0], y.shape[1]), dtype=np.int64)
+        idx[0::2] = np.minimum(bucket_min, bucket_max)
+        idx[1::2] = np.maximum(bucket_min, bucket_max)
+        return idx
+
+    def decimate(self, x, y, start, max_points):
+        """
+        Returns (x, y) for the window y[start:]. x comes back 2D (one column per line) when decimation happened
+        """
+
+        idx = self.indices(y, start, max_points)
+        if idx is None:
+            return x[start:], y[start:]
+        return x[idx], np.take_along_axis(y, idx, axis=0)
@@ -0,0 +1,222 @@
+import math
+
+
+def nice_step(span, divisions=20):
+    """
+    Rounds span/divisions up to the nearest 1, 2, or 5 x 10^n
+    """
+
+    raw = span/divisions
+    if raw <= 0:
+        return 1
+    mag = 10**math.floor(math.log10(raw))
+    for mult in (1, 2, 5, 10):
+        if raw <= mult*mag:
+            return mult*mag
+
+
+class LivePlot:
+    """
+    Temperature history plot that builds its artists once and afterwards only pushes new data into them
+
+    The TC and setpoint lines are animated artists, so the axes, ticks, labels, and legend are rendered once into a
+    cached background. A regular sample only restores that background and blits the data region. The full figure is
+    redrawn only when the axis limits change, and the limits are snapped to coarse steps so that happens rarely.
+
+    """
+
+    def __init__(self, fig, canvas, hidpi_bool=False, y_step=5):
+        self.fig = fig
+        self.canvas = canvas
+        self.hidpi_bool = hidpi_bool
+        self.y_step = y_step
+
+        self.ax = self.fig.add_subplot(111)
+        if self.hidpi_bool:
+            self.ax.set_xlabel('Time [min]', fontsize=25)
+            self.ax.set_ylabel(f'Temperature [\N{DEGREE CELSIUS}]', fontsize=20)
+            self.ax.tick_params(axis='both', which='major', labelsize=20)
+            self.ax.set_title('Temperature History', fontsize=35)
+        else:
+            self.ax.set_xlabel('Time [min]', fontsize=10)
+            self.ax.set_ylabel(f'Temperature [\N{DEGREE CELSIUS}]', fontsize=10)
+            self.ax.tick_params(axis='both', which='major', labelsize=10)
+            self.ax.set_title('Temperature History', fontsize=14)
+
+        self.tc_lines = []
+        self.setpoint_line = None
+
+        self._limits = None
+        self._background = None
+
+        # Any full draw (first draw, resize, limit change) recaptures the background
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def create_lines(self, n_tc):
+        if self.tc_lines:
+            return
+
+        for i in range(n_tc):
+            line, = self.ax.plot([], [], label=f'TC {i+1}', animated=True)
+            self.tc_lines.append(line)
+
+        self.setpoint_line, = self.ax.plot([], [], 'red', linewidth=3, label='Setpoint', animated=True)
+        self.ax.legend()    #loc='northeast'
+        self._background = None     # The legend is part of the background
+
+    def _artists(self):
+        if self.setpoint_line is None:
+            return self.tc_lines
+        return self.tc_lines + [self.setpoint_line]
+
+    def _on_draw(self, event):
+        if self.canvas.is_saving():     # savefig draws the figure at a different dpi
+            return
+        self._background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for line in self._artists():
+            self.ax.draw_artist(line)
+
+    def snap_limits(self, xlim, ylim):
+        """
+        Coarsens the limits so a sliding window only moves the axes every 1/20th of its span, and the y axis only
+        moves in y_step increments
+
+        """
+
+        x0, x1 = xlim
+        step = nice_step(x1 - x0)
+        if x0 <= 0:
+            x1 = math.ceil(x1/step)*step
+        else:
+            span = x1 - x0
+            x1 = math.ceil(x1/step)*step
+            x0 = x1 - span
+
+        y0 = math.floor(ylim[0]/self.y_step)*self.y_step
+        y1 = math.ceil(ylim[1]/self.y_step)*self.y_step
+        if y1 <= y0:
+            y1 = y0 + self.y_step
+
+        return (x0, x1), (y0, y1)
+
+    @property
+    def width_px(self):
+        return int(self.ax.bbox.width)
+
+    def update(self, xlim, ylim, tc_data=None, setpoint_data=None):
+        """
+        tc_data is (time, temps) and setpoint_data is (time, setpoint). After decimation every line has its own time
+        samples, so time can be 2D with one column per line
+
+        """
+
+        if tc_data is None:
+            for line in self._artists():
+                line.set_data([], [])
+        else:
+            time_arry, temp_arry = tc_data
+            self.create_lines(temp_arry.shape[1])
+            for i, line in enumerate(self.tc_lines):
+                line.set_data(time_arry[:, i] if time_arry.ndim == 2 else time_arry, temp_arry[:, i])
+            self.setpoint_line.set_data(*setpoint_data)
+
+        limits = self.snap_limits(xlim, ylim)
+        if limits != self._limits or self._background is None:
+            self._limits = limits
+            self.ax.set_xlim(limits[0])
+            self.ax.set_ylim(limits[1])
+            self.canvas.draw()      # Draws the static background and then the lines through _on_draw
+        else:
+            self.canvas.restore_region(self._background)
+            self._draw_artists()
+            self.canvas.blit(self.ax.bbox)
+
+    def invalidate(self):
+        """
+        Forces a full redraw on the next update
+        """
+
+        self._background = None
+
+    def savefig(self, fname, dpi=400):
+        self.fig.savefig(fname, dpi=dpi)
+        self.invalidate()     # Saving renders at a different dpi, so the cached background can't be reused
+
+
+class SequenceMinimap:
+    """
+    Auto sequence profile in black with the progress through it in red
+
+    The profile, axes and labels never change during a run, so they are rendered once into a cached background. The
+    progress is a single animated line that follows the profile's breakpoints up to the current time, and it is only
+    blitted again once its end has moved by at least a pixel. On a long cure that is a few hundred redraws in total.
+
+    """
+
+    def __init__(self, fig, canvas, profile, hidpi_bool=False):
+        self.fig = fig
+        self.canvas = canvas
+        self.profile = profile
+
+        self.ax = self.fig.add_subplot(111)
+        self.ax.plot(profile.times, profile.temps, 'black')
+        if hidpi_bool:
+            self.ax.set_xlabel('Time [min]', fontsize=10)
+            self.ax.set_ylabel(f'Temperature [\N{DEGREE CELSIUS}]', fontsize=10)
+            self.ax.tick_params(axis='both', which='major', labelsize=10)
+            self.ax.set_title('Sequence', fontsize=15)
+        else:
+            self.ax.set_xlabel('Time [min]', fontsize=5)
+            self.ax.set_ylabel(f'Temperature [\N{DEGREE CELSIUS}]', fontsize=5)
+            self.ax.tick_params(axis='both', which='major', labelsize=5)
+            self.ax.set_title('Sequence', fontsize=6)
+
+        self.progress_line, = self.ax.plot([], [], 'red', animated=True)
+        self.progress_bool = False
+        self._progress_px = None     # Pixel column that the progress was last drawn up to
+        self._background = None
+
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        if self.canvas.is_saving():
+            return
+        self._background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.progress_line)
+
+    def _to_px(self, t):
+        x0, x1 = self.ax.get_xlim()
+        return int((t - x0)/(x1 - x0)*self.ax.bbox.width)
+
+    def update(self, t=None):
+        """
+        Draws the progress up to time t [min], or clears it if t is None
+        """
+
+        if t is None:
+            if not self.progress_bool and self._background is not None:
+                return
+            self.progress_line.set_data([], [])
+            self.progress_bool = False
+            self._progress_px = None
+
+        else:
+            t = min(max(t, self.profile.t_start), self.profile.t_end)
+            px = self._to_px(t)
+            if px == self._progress_px and self._background is not None:
+                return
+
+            i = self.profile.segment(t)
+            self.progress_line.set_data(self.profile.times[:i+1] + [t], self.profile.temps[:i+1] + [self.profile.value(t)])
+            self.progress_bool = True
+            self._progress_px = px
+
+        if self._background is None:
+            self.canvas.draw()      # Renders the background and then the progress through _on_draw
+        else:
+            self.canvas.restore_region(self._background)
+            self.ax.draw_artist(self.progress_line)
+            self.canvas.blit(self.ax.bbox)
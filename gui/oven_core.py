@@ -0,0 +1,192 @@
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from serial_ingest import SerialIngest
+from oven_session import OvenSession
+from catalog import RunCatalog
+from profiler import profiler
+
+logger = logging.getLogger('ezbake')
+
+
+class OvenCore:
+    """
+    Headless controller core: the run directory, the serial loop, every oven session, and the routing of serial lines
+    to them. There is no Tk or display dependency in here
+
+    The GUI is one client of the core and oven_headless.py is another. A client calls poll() regularly and gets back
+    the events it may want to display. Everything is logged through the 'ezbake' logger and to log.txt in the run
+    directory, whether or not a GUI is attached.
+
+    """
+
+    def __init__(self, app_dirname='.', time_scales=(), fleet_bool=False, n_tc=6, serial_ingest=None, fsync_interval=5.0, segment_rows=50000,
+                 clock=time.time, render_newest_bool=True, baudrate=9600, setpoint_quantum=0.1, setpoint_interval=1.0,
+                 profile_upload_bool=False, cure_threshold_c=120.0, cure_ref_temp_c=130.0, cure_activation_kj=65.0):
+        self.app_dirname = app_dirname or '.'     # os.path.dirname(__file__) is empty when started from the gui directory
+        self.time_scales = time_scales
+        self.fleet_bool = fleet_bool
+        self.n_tc = n_tc
+        self.fsync_interval = fsync_interval
+        self.segment_rows = segment_rows
+        self.clock = clock
+        self.render_newest_bool = render_newest_bool    # Record every sample of a burst, but only report the newest state
+        self.baudrate = baudrate    # Of the controllers, faster boards send binary telemetry frames
+        self.setpoint_quantum = setpoint_quantum    # Smallest setpoint change that is sent [C]
+        self.setpoint_interval = setpoint_interval  # Least seconds between setpoint commands
+        self.profile_upload_bool = profile_upload_bool  # Auto sequences run on the controller instead of being streamed
+        self.cure_threshold_c = cure_threshold_c        # Cure metrics: temperature that counts as curing
+        self.cure_ref_temp_c = cure_ref_temp_c          # and the reference temperature and activation energy [kJ/mol]
+        self.cure_activation_kj = cure_activation_kj    # of the equivalent cure time
+
+        self.data_dirname = f'./runs/{datetime.now().strftime("%Y%m%d-%H%M%S")}'
+        os.makedirs(f'{self.app_dirname}/{self.data_dirname}')
+
+        self.log_handler = logging.FileHandler(f'{self.app_dirname}/{self.data_dirname}/log.txt')
+        self.log_handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s', datefmt='%Y/%m/%d %H:%M:%S'))
+        logger.addHandler(self.log_handler)
+        logger.setLevel(logging.INFO)
+
+        # All ports are read by one asyncio event loop on a background thread
+        self.serial_ingest = serial_ingest if serial_ingest is not None else SerialIngest()
+
+        # Every run is indexed as soon as its log is closed
+        self.catalog = RunCatalog(self.app_dirname)
+
+        self.sessions = {}
+        self.routes = {}        # Serial device name -> (session, 'controller' | 'fan1' | 'fan2')
+        self.n_dropped = {}     # Serial device name -> dropped lines already logged
+        self.n_bad_frames = {}  # Serial device name -> corrupted binary frames already logged
+
+    def add_session(self):
+        """
+        Creates the session for the next oven. The first oven records straight into the run directory, the other
+        ovens in fleet mode each get a subdirectory
+        """
+
+        name = f'Oven {len(self.sessions)+1}'
+        data_dirname = self.data_dirname
+        if self.sessions:
+            data_dirname = f'{self.data_dirname}/{name.replace(" ", "_")}'
+            os.makedirs(f'{self.app_dirname}/{data_dirname}')
+
+        prefix = f'[{name}] ' if self.fleet_bool else ''
+        session = OvenSession(name, self.serial_ingest, data_dirname, self.app_dirname, self.time_scales, n_tc=self.n_tc,
+                              log=lambda msg: logger.info(f'{prefix}{msg}'), fsync_interval=self.fsync_interval, segment_rows=self.segment_rows,
+                              clock=self.clock, baudrate=self.baudrate, setpoint_quantum=self.setpoint_quantum,
+                              setpoint_interval=self.setpoint_interval, profile_upload_bool=self.profile_upload_bool,
+                              cure_threshold_c=self.cure_threshold_c, cure_ref_temp_c=self.cure_ref_temp_c,
+                              cure_activation_kj=self.cure_activation_kj)
+        session.on_run_closed = self.catalog_run
+        self.sessions[name] = session
+
+        self.routes[session.device] = (session, 'controller')
+        self.routes[session.fan_devices[0]] = (session, 'fan1')
+        self.routes[session.fan_devices[1]] = (session, 'fan2')
+        return session
+
+    def catalog_run(self, session, fnames):
+        try:
+            self.catalog.add(fnames, session.history, session.run_profile, session.estop_codes)
+        except sqlite3.Error as e:     # The run files are what matters, a stale catalog is caught up by the next scan
+            logger.info(f'Could not add the run to the catalog: {e}')
+
+    def poll(self, max_items=2000, on_event=None):
+        """
+        Drains the lines that the serial loop has queued and routes them to their oven. Never blocks on a port.
+        Returns a list of (event, session, idx) with event one of 'sample', 'reply', 'lost', 'fan', 'lost_fan'. idx is
+        the fan number for the fan events, and the number of samples for a 'sample' event. If on_event is given,
+        it is called with each event as it happens instead
+
+        With render_newest_bool (the default), the controller lines of a burst are parsed as one batch and every
+        sample is recorded, but there is only one 'sample' event per oven for the whole batch. Otherwise each line is
+        parsed on its own and gets its own event, so a client can render every sample.
+
+        """
+
+        events = []
+        emit = on_event if on_event is not None else lambda *event: events.append(event)
+        pending = {}    # Session -> (lines, times) of its controller lines that haven't been parsed yet
+
+        def flush(session):
+            lines, t_recvs = pending.pop(session, ((), ()))
+            if lines:
+                n_samples = session.receive_controller_batch(lines, t_recvs)
+                if n_samples:
+                    emit('sample', session, n_samples)
+
+        # A controller sends either lines or binary TelemetryFrames, the session parses both
+        for device, t_recv, string in self.serial_ingest.drain(max_items=max_items):     # Bounded batch so a backlog can't starve the client
+            if device not in self.routes:
+                continue
+            session, kind = self.routes[device]
+
+            if kind == 'controller':
+                if string is None:
+                    flush(session)
+                    session.lost()
+                    emit('lost', session, None)
+                elif isinstance(string, str) and string.startswith('#'):     # Reply to a command, not telemetry
+                    flush(session)
+                    session.receive_controller_reply(string)
+                    emit('reply', session, None)
+                elif string and session.port:
+                    if self.render_newest_bool:
+                        lines, t_recvs = pending.setdefault(session, ([], []))
+                        lines.append(string)
+                        t_recvs.append(t_recv)
+                    elif session.receive_controller_data(string, t_recv):
+                        emit('sample', session, 1)
+
+            else:
+                flush(session)      # The fan RPM goes into the samples after it
+                idx = 1 if kind == 'fan1' else 2
+                if string is None:
+                    session.lost_fan(idx)
+                    emit('lost_fan', session, idx)
+                elif string and session.receive_fan_data(idx, string):
+                    emit('fan', session, idx)
+
+        for session in list(pending):
+            flush(session)
+
+        # Lines that the serial loop couldn't queue because the client fell behind
+        for device, n_dropped in list(self.serial_ingest.dropped.items()):
+            if n_dropped > self.n_dropped.get(device, 0):
+                logger.info(f'Dropped {n_dropped - self.n_dropped.get(device, 0)} lines from {device}, the display fell behind')
+                self.n_dropped[device] = n_dropped
+
+        # Binary frames that failed their length or CRC check, a noisy cable or a wrong baud rate
+        for device, n_bad in list(self.serial_ingest.bad_frames.items()):
+            if n_bad > self.n_bad_frames.get(device, 0):
+                logger.info(f'Dropped {n_bad - self.n_bad_frames.get(device, 0)} corrupted telemetry frames from {device} ({n_bad} total)')
+                self.n_bad_frames[device] = n_bad
+
+        return events
+
+    def connected(self):
+        return bool(self.serial_ingest.ports)
+
+    def shutdown(self):
+        """
+        Zeroes the setpoint of every oven that is still running, closes every run log, and closes the ports. With the
+        profiler enabled, the stage timings of the whole session are dumped to profile.json in the run directory
+        """
+
+        for session in self.sessions.values():
+            if session.mode == 'AUTO':
+                session.abort_auto_seq()
+            elif session.mode == 'MANUAL' and not session.estop_bool:
+                session.send_temp(0)
+                session.mode = 'OFF'
+            session.close_run_log()
+
+        self.serial_ingest.close_all()
+        self.catalog.close()
+        if profiler.enabled:
+            profiler.dump(f'{self.app_dirname}/{self.data_dirname}/profile.json')
+        logger.removeHandler(self.log_handler)
+        self.log_handler.close()
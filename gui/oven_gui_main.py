@@ -1,22 +1,42 @@
 import os
-import numpy as np
-from pathlib import Path
+import argparse
 import time
+import logging
 from datetime import datetime
-from datetime import timedelta
 from tkinter.filedialog import askopenfilename
-from scipy import interpolate
 import tkinter as tk
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from ttkbootstrap.dialogs import Messagebox
 from ttkbootstrap.scrolled import ScrolledText
-import serial.tools.list_ports
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
+from live_plot import LivePlot, SequenceMinimap
+from port_watcher import PortWatcher
+from windowing import parse_time_scale, window_start
+from oven_core import OvenCore
+from oven_session import SetpointRejected
+from profiler import profiler
+from render_scheduler import RenderScheduler, ChangeCache
+
+logger = logging.getLogger('ezbake')
+
+
+class TkLogHandler(logging.Handler):
+    """
+    Mirrors the records of the core's logger into the log pane
+    """
+
+    def __init__(self, app):
+        super().__init__()
+        self.app = app
+
+    def emit(self, record):
+        self.app.log.insert(END, f'{self.app.get_datetime_log()} - {record.getMessage()}\n')
+
 
 class App(ttk.Window):
-    def __init__(self, window_title=None, icon=None, hidpi_bool=False, app_dirname=None):
+    def __init__(self, window_title=None, icon=None, hidpi_bool=False, app_dirname=None, fleet_bool=False, serial_ingest=None, clock=time.time,
+                 render_newest_bool=True, plot_fps=5, label_fps=2, minimap_fps=1, fast_start_bool=False, baudrate=9600,
+                 profile_upload_bool=False, cure_threshold_c=120.0, cure_ref_temp_c=130.0, cure_activation_kj=65.0):
 
         if window_title and icon:
 
@@ -34,15 +54,13 @@ class App(ttk.Window):
             self.iconphoto(True, tk.PhotoImage(file=icon))
         
         self.hidpi_bool = hidpi_bool
+        self.fleet_bool = fleet_bool    # Fleet mode drives one oven per controller COM port from this window
+        self.fast_start_bool = fast_start_bool  # Shows the window first, matplotlib and the auto tab are loaded after
 
         if not self.hidpi_bool:
             def_font = tk.font.nametofont("TkDefaultFont")
             def_font.config(size=10)
 
-        self.data_dirname = self.get_datetime_str()
-        self.data_dirname = f'./runs/{self.data_dirname}'
-        os.makedirs(self.data_dirname)
-
         ############### Initialize all variables ###############
 
         self.app_dirname = app_dirname
@@ -52,21 +70,17 @@ class App(ttk.Window):
         self.selected_theme.trace("w", lambda *_:self.update_theme(self.selected_theme))
 
         # COM port variable
-        self.controller_com_port_is_selected = None
         self.selected_controller_comport = tk.StringVar(value='None')
         self.selected_controller_comport.trace("w", lambda *_:self.update_com_port_controller())
 
-        self.fan1_com_port_is_selected = None
         self.selected_fan1_comport = tk.StringVar(value='None')
         self.selected_fan1_comport.trace("w", lambda *_:self.update_com_port_fan1())
 
-        self.fan2_com_port_is_selected= None
         self.selected_fan2_comport = tk.StringVar(value='None')
         self.selected_fan2_comport.trace("w", lambda *_:self.update_com_port_fan2())
 
-        self.estop_bool = 0
-
         # Plot scaling variable
+        self.time_scales = ['1 minute', '3 minutes', '5 minutes', '10 minutes', '20 minutes', '40 minutes', '60 minutes', '120 minutes', "All time"][::-1]
         self.plt_scale_var = tk.StringVar(value='1 minute')
         self.plt_scale_var.trace("w", lambda *_:self.draw_plot())
 
@@ -76,42 +90,29 @@ class App(ttk.Window):
 
         self.loaded_csv_var = tk.StringVar()
         self.loaded_csv_bool = 0
-        self.auto_sequence = None
-
-        # Initializing serial port
-        self.ser_controller = None
-        self.ser_fan1 = None
-        self.ser_fan2 = None
-
-        # Lists to record the temperature and setpoint history
-        self.history_time = []
-        self.history_temp = []
-        self.history_setpoint = []
-        self.history_estop = []
-        self.history_mode = []
-        self.history_status = []
-        self.history_fan1 = []
-        self.history_fan2 = []
-        self.history_real_time = []
-        self.history_heater = []
-
-        self.fan1_rpm = 0
-        self.fan2_rpm = 0
 
-        self.timebase = None
-
-        self.tc_readings = np.zeros(6)
-
-        self.temp_mean = None
-        self.temp_std = None
-        self.setpoint = 0
+        # Headless core that owns the run directory, the serial loop, and one session per oven. The GUI is a client
+        # of the core and shows the active session, every session shares the serial loop and the plot
+        self.core = OvenCore(self.app_dirname, self.time_scales, self.fleet_bool, serial_ingest=serial_ingest, clock=clock,
+                             render_newest_bool=render_newest_bool, baudrate=baudrate,
+                             profile_upload_bool=profile_upload_bool, cure_threshold_c=cure_threshold_c, cure_ref_temp_c=cure_ref_temp_c,
+                             cure_activation_kj=cure_activation_kj)
+        self.data_dirname = self.core.data_dirname
+
+        # Samples only mark the display as stale, the scheduler redraws it at a fixed rate. Tk variables and widget
+        # options are only written when the displayed value changes
+        self.display_cache = ChangeCache()
+        self.dirty_sessions = set()
+        self.render_scheduler = RenderScheduler(self)
+        self.render_scheduler.add('plot', self.render_plot, plot_fps)
+        self.render_scheduler.add('labels', self.render_labels, label_fps)
+        self.render_scheduler.add('minimap', self.render_minimap, minimap_fps)
+        self.sessions = self.core.sessions
+        self.session = self.add_session()
 
         self.lbl_preheat = None
         self.prog_bar_preheating = None
 
-        self.null_time = '0:00:00'
-        self.str_rel_time = self.null_time
-
         self.seq_minimap = None
 
         self.btn_abort_seq_auto = None
@@ -193,8 +194,9 @@ class App(ttk.Window):
         self.lbl_controller_com_port = ttk.Label(self.frm_theme_selection, text="Controller COM Port:", anchor='e', font='-size 12')
         self.lbl_controller_com_port.grid(row=0, column=2, padx=10, pady=10, sticky='e')
 
-        self.ports = serial.tools.list_ports.comports()
-        self.dev = [port.device for port in self.ports]
+        # Hot-plugged ports are picked up off the UI thread, the menus only get the changes
+        self.port_watcher = PortWatcher()
+        self.dev = list(self.port_watcher.devices)
 
         self.menu_controller_com = ttk.Menu(self.root)
         for dev in self.dev:
@@ -250,14 +252,15 @@ class App(ttk.Window):
         self.frm_theme_selection.columnconfigure(7, weight=1)
         self.frm_theme_selection.columnconfigure(8, weight=1)
 
-        # Main temperature plot
-        self.fig_main_temp_plot = Figure()
-        self.ax = self.fig_main_temp_plot.add_subplot(111)
-
-        self.canvas = FigureCanvasTkAgg(self.fig_main_temp_plot, master=self.lframe)
-        self.canvas.get_tk_widget().grid(row=1, column=0, sticky='nsew')
-
-        self.draw_plot()
+        # Main temperature plot. Importing matplotlib is most of the startup time, so in fast start it's only built
+        # once the window is on screen
+        self.live_plot = None
+        if self.fast_start_bool:
+            self.lbl_plot_loading = ttk.Label(master=self.lframe, text='Loading plot...', anchor=CENTER)
+            self.lbl_plot_loading.grid(row=1, column=0, sticky='nsew')
+            self.lframe.bind('<Map>', lambda *_:self.on_first_map())
+        else:
+            self.build_main_plot()
         self.lframe.rowconfigure(1, weight=1)
 
         self.frm_plot_options = ttk.Frame(master=self.lframe, padding=10)
@@ -269,7 +272,6 @@ class App(ttk.Window):
         self.btn_savedata = ttk.Button(master=self.frm_plot_options, text='Save Data...', width=15, bootstyle=(INFO, OUTLINE), command=lambda:self.save_data_to_csv())
         self.btn_savedata.pack(side=RIGHT, padx=150, pady=5)
 
-        self.time_scales = ['1 minute', '3 minutes', '5 minutes', '10 minutes', '20 minutes', '40 minutes', '60 minutes', '120 minutes', "All time"][::-1]
         self.menu_scale = ttk.Menu(self.root)
         for scale in self.time_scales:
             self.menu_scale.insert_radiobutton(label=scale, value=scale, index=0, variable=self.plt_scale_var)
@@ -292,6 +294,7 @@ class App(ttk.Window):
         # Log
         self.log = ScrolledText(master=self.lframe, height=5, width=50, autohide=True)
         self.log.grid(row=3, column=0, sticky='nsew')
+        logger.addHandler(TkLogHandler(self))
         self.write_log('Initialized. Select a COM port to connect...')
 
         # Status Frame
@@ -338,6 +341,13 @@ class App(ttk.Window):
         self.lbl_action_val.grid(row=4, column=1, sticky='w')
         self.lbl_mode_val.grid(row=3, column=1, sticky='w')
 
+        # Running cure metrics of the mean temperature, the preheat bar takes row 5
+        self.str_cure = tk.StringVar(value='--')
+        self.lbl_cure = ttk.Label(master=self.frm_status, text='Cure: ', font=f"-size {self.status_fsize}")
+        self.lbl_cure_val = ttk.Label(master=self.frm_status, textvariable=self.str_cure, font=f"-size {self.status_fsize}")
+        self.lbl_cure.grid(row=6, column=0, sticky='w')
+        self.lbl_cure_val.grid(row=6, column=1, columnspan=2, sticky='w')
+
         if self.hidpi_bool:
             self.heater_canvas = tk.Canvas(self.frm_status, width=200, height=200)
             self.heater_canvas.grid(row=0, column=2, rowspan=5)
@@ -357,6 +367,7 @@ class App(ttk.Window):
         self.frm_status.rowconfigure(3, weight=1)
         self.frm_status.rowconfigure(4, weight=1)
         self.frm_status.rowconfigure(5, weight=1)
+        self.frm_status.rowconfigure(6, weight=1)
 
         # Control pane - manual or autosequence selector
         self.frm_control = ttk.Labelframe(master=self.rframe, text="Control", padding=10, bootstyle=INFO)
@@ -386,16 +397,12 @@ class App(ttk.Window):
         self.btn_submit_manual = ttk.Button(master=self.frm_manual, width=10, text="START", bootstyle=SUCCESS, command=lambda:self.on_set_manual_setpoint())
         self.btn_submit_manual.grid(row=2, column=0, padx=10, pady=10)
 
-        # Auto mode
-        self.btn_select_seq_auto = ttk.Button(master=self.frm_auto, width=15, text="Select Sequence...", bootstyle=INFO, command=self.on_open_sequence)
-        self.btn_select_seq_auto.grid(row=1, column=0, padx=10, pady=10)
-
-        self.btn_submit_seq_auto = ttk.Button(master=self.frm_auto, width=10, text="START", bootstyle=SUCCESS, state=DISABLED, command=self.on_start_auto_sequence)
-        self.btn_submit_seq_auto.grid(row=1, column=1, padx=10, pady=10)
-
-        # Initialize auto tab with a message telling the user to input a sequence
-        self.lbl_init_auto = ttk.Label(master=self.frm_auto, text='Please select a temperature profile to run.')
-        self.lbl_init_auto.grid(row=0, column=0, columnspan=2, sticky='w', padx=10, pady=100)
+        # Auto mode, built when its tab is first opened in fast start
+        self.auto_tab_built_bool = 0
+        if self.fast_start_bool:
+            self.nb.bind('<<NotebookTabChanged>>', lambda *_:self.on_tab_changed())
+        else:
+            self.build_auto_tab()
 
         self.rframe.rowconfigure(1, weight=1)
 
@@ -492,8 +499,111 @@ class App(ttk.Window):
         self.frm_status.rowconfigure(0, weight=1)
         self.frm_status.rowconfigure(1, weight=1)
 
+        # Hot path profiler overlay, collapsed by default
+        self.profiler_shown_bool = 0
+        self.profiler_after_id = None
+        self.str_profiler = tk.StringVar(value='')
+
+        self.frm_profiler = ttk.Frame(self.frm_monitor)
+        if profiler.enabled:    # --profile
+            self.frm_profiler.grid(row=1, column=0, columnspan=2, sticky='ew')
+
+        self.btn_profiler = ttk.Button(master=self.frm_profiler, text='Profiler \N{BLACK RIGHT-POINTING SMALL TRIANGLE}', bootstyle=(SECONDARY, LINK), command=self.on_toggle_profiler)
+        self.btn_profiler.grid(row=0, column=0, sticky='w')
+        self.btn_profiler_dump = ttk.Button(master=self.frm_profiler, text='Dump', width=8, bootstyle=(INFO, OUTLINE), command=self.on_dump_profiler)
+        self.lbl_profiler = ttk.Label(master=self.frm_profiler, textvariable=self.str_profiler, font='TkFixedFont', justify=LEFT)
+
+        # Fleet overview, one compact row per oven. Selecting a row puts that oven on the plot and in the panes
+        if self.fleet_bool:
+            self.frm_fleet = ttk.Labelframe(master=self.rframe, text="Fleet", padding=10, bootstyle=INFO)
+            self.frm_fleet.grid(row=3, column=0, sticky='ew', padx=10, pady=10)
+
+            self.tv_fleet = ttk.Treeview(master=self.frm_fleet, columns=[0, 1, 2, 3, 4, 5], show=HEADINGS, height=4, selectmode='browse')
+            for col, heading in enumerate(['Oven', 'Port', 'Mode', 'Mean (\N{DEGREE CELSIUS})', 'Setpoint (\N{DEGREE CELSIUS})', 'Status']):
+                self.tv_fleet.heading(col, text=heading)
+                self.tv_fleet.column(col, width=90, anchor=CENTER)
+            self.tv_fleet.pack(fill=BOTH, expand=YES)
+            self.tv_fleet.bind('<<TreeviewSelect>>', lambda *_:self.on_select_fleet_row())
+
         self.root.pack(fill=BOTH, expand=YES)
 
+        # Closing the window zeroes the ovens and closes the run logs, like the headless client does on exit
+        self.protocol('WM_DELETE_WINDOW', self.on_close)
+
+
+    def build_main_plot(self):
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+
+        self.fig_main_temp_plot = Figure()
+
+        self.canvas = FigureCanvasTkAgg(self.fig_main_temp_plot, master=self.lframe)
+        self.canvas.get_tk_widget().grid(row=1, column=0, sticky='nsew')
+
+        self.live_plot = LivePlot(self.fig_main_temp_plot, self.canvas, self.hidpi_bool)
+
+        self.draw_plot()
+
+    def on_first_map(self):
+        self.lframe.unbind('<Map>')
+        self.after_idle(self.load_main_plot)     # After the idle tasks that draw the window
+
+    def load_main_plot(self):
+        self.lbl_plot_loading.destroy()
+        self.build_main_plot()
+
+    def build_auto_tab(self):
+        self.btn_select_seq_auto = ttk.Button(master=self.frm_auto, width=15, text="Select Sequence...", bootstyle=INFO, command=self.on_open_sequence)
+        self.btn_select_seq_auto.grid(row=1, column=0, padx=10, pady=10)
+
+        self.btn_submit_seq_auto = ttk.Button(master=self.frm_auto, width=10, text="START", bootstyle=SUCCESS, state=DISABLED, command=self.on_start_auto_sequence)
+        self.btn_submit_seq_auto.grid(row=1, column=1, padx=10, pady=10)
+
+        # Initialize auto tab with a message telling the user to input a sequence
+        self.lbl_init_auto = ttk.Label(master=self.frm_auto, text='Please select a temperature profile to run.')
+        self.lbl_init_auto.grid(row=0, column=0, columnspan=2, sticky='w', padx=10, pady=100)
+
+        self.auto_tab_built_bool = 1
+
+    def on_tab_changed(self):
+        if not self.auto_tab_built_bool and self.nb.select() == str(self.frm_auto):
+            self.build_auto_tab()
+            self.show_auto_seq_pane()
+
+    def update_com_menus(self, added, removed):
+        """
+        Adds and removes the changed ports in the COM menus, the rest of the entries and the menubuttons are kept
+        """
+
+        for menu, var in ((self.menu_controller_com, self.selected_controller_comport),
+                          (self.menu_fan1_com, self.selected_fan1_comport),
+                          (self.menu_fan2_com, self.selected_fan2_comport)):
+            last = menu.index(END)
+            if last is not None:
+                for i in range(last, -1, -1):
+                    if menu.entrycget(i, 'label') in removed:
+                        menu.delete(i)
+            for dev in added:
+                menu.insert_radiobutton(label=dev, value=dev, variable=var, index=0)
+
+        self.dev = [dev for dev in self.dev if dev not in removed] + added
+
+    def add_session(self):
+        session = self.core.add_session()
+        session.on_reset = self.on_session_reset
+        return session
+
+    def set_active_session(self, name):
+        self.session = self.sessions[name]
+        if self.live_plot is not None:
+            self.live_plot.invalidate()
+        self.show_auto_seq_pane()
+        self.show_session_state()
+        self.draw_plot()
+
+    def on_session_reset(self, session):
+        if session is self.session:     # The plot only ever shows the active oven
+            self.savefig()
 
     def update_theme(self, sel_theme):
         theme = sel_theme.get()
@@ -506,102 +616,100 @@ class App(ttk.Window):
     def update_com_port_controller(self):
         """
         A temperature of 0 is written anytime a new COM port is selected
+        In fleet mode, a port that isn't in use yet connects a new oven instead of replacing the current one
         """
 
-        if self.controller_com_port_is_selected is None:
-            self.controller_com_port_is_selected = self.selected_controller_comport.get()
-            self.ser_controller = serial.Serial(self.controller_com_port_is_selected, 9600, timeout=1)
-            self.ser_controller.write(b'0')
-            self.reset_timebase()
+        port = self.selected_controller_comport.get()
+        if port == 'None':      # Prevents it from displaying the message when a port is disconnected
+            return
 
-            self.write_log(f'Connected to {self.controller_com_port_is_selected}')
-            self.str_status.set('CONNECTED')
-            self.lbl_status.config(foreground=self.status_colors['CONNECTED'])
+        if self.fleet_bool:
+            if any(session.port == port for session in self.sessions.values()):
+                return
+            if self.session.port is not None:
+                self.session = self.add_session()
+            self.session.connect(port)
+            self.set_active_session(self.session.name)
+            self.update_fleet_overview(self.session)
+
+        elif self.session.port is None:
+            self.session.connect(port)
+            self.show_session_state()
             self.draw_plot()
 
-        elif (self.controller_com_port_is_selected != self.selected_controller_comport.get() and self.selected_controller_comport.get() != 'None'):    # is not None prevents it from displaying the message when a port is disconnected
+        elif self.session.port != port:
             change_com_port_bool = Messagebox.show_warning('You are already connected to a COM Port.\nConnecting to this COM Port will reset the current session and erase all history!')
             if change_com_port_bool:
-                self.controller_com_port_is_selected = self.selected_controller_comport.get()
-                self.ser_controller = serial.Serial(self.controller_com_port_is_selected, 9600, timeout=1)
-                self.ser_controller.write(b'0')
-                self.reset_timebase()
-
-                self.write_log(f'Connected to {self.controller_com_port_is_selected}')
-                self.str_status.set('CONNECTED')
-                self.lbl_status.config(foreground=self.status_colors['CONNECTED'])
+                self.session.connect(port)
+                self.show_session_state()
                 self.draw_plot()
 
-    def update_com_port_fan1(self):
-        if self.fan1_com_port_is_selected is None:
-            self.fan1_com_port_is_selected = self.selected_fan1_comport.get()
-            self.ser_fan1 = serial.Serial(self.fan1_com_port_is_selected, 9600, timeout=1)
-            self.write_log(f'Connected to {self.fan1_com_port_is_selected}')
+    def update_com_port_fan(self, idx, selected_comport):
+        """
+        Fans are attached to the oven that is active when their port is selected
+        """
 
-        elif (self.fan1_com_port_is_selected != self.selected_fan1_comport.get() and self.selected_fan1_comport.get() != 'None'):    # is not None prevents it from displaying the message when a port is disconnected
-            change_com_port_bool = Messagebox.show_warning('You are already connected to a COM Port!')
-            if change_com_port_bool:
-                self.fan1_com_port_is_selected = self.selected_fan1_comport.get()
-                self.ser_fan1 = serial.Serial(self.fan1_com_port_is_selected, 9600, timeout=1)
-                self.write_log(f'Connected to {self.fan1_com_port_is_selected}')
+        port = selected_comport.get()
+        if port == 'None':      # Prevents it from displaying the message when a port is disconnected
+            return
 
-    def update_com_port_fan2(self):
-        if self.fan2_com_port_is_selected is None:
-            self.fan2_com_port_is_selected = self.selected_fan2_comport.get()
-            self.ser_fan2 = serial.Serial(self.fan2_com_port_is_selected, 9600, timeout=1)
-            self.write_log(f'Connected to {self.fan2_com_port_is_selected}')
+        if self.session.fan_ports[idx-1] is None:
+            self.session.connect_fan(idx, port)
 
-        elif (self.fan2_com_port_is_selected != self.selected_fan2_comport.get() and self.selected_fan2_comport.get() != 'None'):    # is not None prevents it from displaying the message when a port is disconnected
+        elif self.session.fan_ports[idx-1] != port:
             change_com_port_bool = Messagebox.show_warning('You are already connected to a COM Port!')
             if change_com_port_bool:
-                self.fan2_com_port_is_selected = self.selected_fan2_comport.get()
-                self.ser_fan2 = serial.Serial(self.fan2_com_port_is_selected, 9600, timeout=1)
-                self.write_log(f'Connected to {self.fan2_com_port_is_selected}')
+                self.session.connect_fan(idx, port)
+
+    def update_com_port_fan1(self):
+        self.update_com_port_fan(1, self.selected_fan1_comport)
+
+    def update_com_port_fan2(self):
+        self.update_com_port_fan(2, self.selected_fan2_comport)
 
     def on_estop(self):
-        if self.controller_com_port_is_selected is None:
-            return
-        else:
-            self.estop_bool = 1
-            self.set_setpoint(0)
-            self.send_temp(self.ser_controller, 9000)
-            self.btn_estop.config(state=DISABLED)
-            self.str_status.set('ESTOPPED')
-            self.lbl_status.config(foreground=self.status_colors['ESTOPPED'])
-            self.write_log('---------- ESTOPPED ----------')
-
-            # Stop any currently running sequence
-            if 'AUTO' in self.str_mode.get():
-                self.on_abort_auto_seq()
-            elif 'MANUAL' in self.str_mode.get():
-                self.str_mode.set('OFF')
+        # Stops every oven, in fleet mode not just the one on display
+        for session in self.sessions.values():
+            session.estop()
+            self.update_fleet_overview(session)
+        self.show_session_state()
+        self.show_auto_seq_buttons()
+        self.update_seq_minimap()
+
+    def on_close(self):
+        # Flushes the run log buffers, catalogs the last runs and saves their cure metrics before the window goes
+        self.core.shutdown()
+        self.port_watcher.stop()
+        self.destroy()
 
     def get_mins_lims_from_plt_str(self):
-        time_range = self.plt_scale_var.get().split(' ')[0]
-        if 'all' in time_range.lower():
-            if len(self.history_temp):
-                time_range = self.history_time[-1]
+        history = self.session.history
+        history_time = history.rel_time
+        time_range = parse_time_scale(self.plt_scale_var.get())
+        if time_range is None:      # All time
+            if len(history):
+                time_range = history_time[-1]
             else:
                 time_range = 1     # Default to 1 minute
-        else:
-            time_range = int(time_range)
 
-        if len(self.history_temp):
-            if self.history_time[-1] < time_range:
+        if len(history):
+            if history_time[-1] < time_range:
                 xlim = [0, time_range]
             else:
-                xlim = [self.history_time[-1]-time_range, self.history_time[-1]]
+                xlim = [history_time[-1]-time_range, history_time[-1]]
+
+            # Binary search for the start of the time slice
+            min_time_idx = window_start(history_time, xlim[0])
 
-            # Get y range inside of time slice
-            min_time_idx = np.argmin(np.abs(np.array(self.history_time)-np.array(xlim[0])))
+            # Views into the history store, nothing is copied here
+            y_val_arry = history.temp[min_time_idx:]      # Clip the y values
+            setpoint_arry = history.setpoint[min_time_idx:]      # Clip the setpoint
 
-            # Easier to work with numpy array than it is with a list of lists
-            y_val_arry = np.column_stack((np.array(self.history_temp), self.history_setpoint))
-            y_val_arry = y_val_arry[min_time_idx:]      # Clip the y values
-            ylim = [y_val_arry.min()*0.8, y_val_arry.max()*1.1]
+            # The y range inside of the time slice is tracked incrementally as the samples come in
+            extrema = self.session.plot_windows[self.plt_scale_var.get()]
+            ylim = [extrema.min*0.8, extrema.max*1.1]
 
-            time_val_arry = np.array(self.history_time)[min_time_idx:]      # Clip the time values
-            setpoint_arry = np.array(self.history_setpoint)[min_time_idx:]      # Clip the setpoint
+            time_val_arry = history_time[min_time_idx:]      # Clip the time values
 
         else:       # No data values have been loaded into the arrays yet
             xlim = [0, time_range]
@@ -622,122 +730,129 @@ class App(ttk.Window):
         if fpath == 'None':     # No sequence loaded
             return
         else:
-            if self.loaded_csv_bool:
-                self.tv_autoseq.destroy()
-                self.lbl_init_auto.destroy()
-                self.canvas_autoseq.destroy()
+            self.session.load_auto_seq(fpath)
+            self.show_auto_seq_pane()
 
-            self.seq_fname = Path(fpath).name
-            self.auto_sequence = np.loadtxt(fpath, delimiter=',', skiprows=1)
+    def show_auto_seq_pane(self):
+        """
+        Builds the auto tab for the sequence loaded in the active session
+        """
 
-            self.lbl_init_auto.destroy()
+        if not self.auto_tab_built_bool:
+            return
 
-            self.tv_autoseq = ttk.Treeview(master=self.frm_auto, columns=[0, 1], show=HEADINGS, height=5, selectmode='none')
-            for row in self.auto_sequence:
-                self.tv_autoseq.insert("", END, values=(row[0], row[1]))
+        if self.loaded_csv_bool:
+            self.tv_autoseq.destroy()
+            self.canvas_autoseq.get_tk_widget().destroy()
+            self.loaded_csv_bool = 0
 
-            self.tv_autoseq.heading(0, text="Time (min)")
-            self.tv_autoseq.heading(1, text="Temp (\N{DEGREE CELSIUS})")
-            self.tv_autoseq.column(0, width=150)
-            self.tv_autoseq.column(1, width=150, anchor=CENTER)
-            self.tv_autoseq.grid(row=0, column=0, columnspan=2, sticky='ew', padx=15, pady=10)
-            
-            # Put the filepath in the "sequence loaded! label"
-            self.loaded_csv_var.set(f'Sequence loaded! {self.seq_fname}')
-            self.lbl_init_auto = ttk.Label(master=self.frm_auto, textvariable=self.loaded_csv_var, bootstyle=(SUCCESS))
-            self.lbl_init_auto.grid(row=2, column=0, columnspan=2, sticky='ew', padx=15, pady=5)
+        self.lbl_init_auto.destroy()
 
-            self.btn_submit_seq_auto.config(state=NORMAL)
+        if self.session.auto_sequence is None:
+            self.lbl_init_auto = ttk.Label(master=self.frm_auto, text='Please select a temperature profile to run.')
+            self.lbl_init_auto.grid(row=0, column=0, columnspan=2, sticky='w', padx=10, pady=100)
+            self.seq_minimap = None
+            self.show_auto_seq_buttons()
+            return
 
-            # Matplotlib plot sequence widget
-            if self.hidpi_bool:
-                self.fig_seq = Figure(figsize=(1, 3.5), dpi=100)
-            else:
-                self.fig_seq = Figure(figsize=(1, 2.1), dpi=100)
-                
-            self.seq_minimap = self.fig_seq.add_subplot(111)
-            self.seq_minimap.plot(self.auto_sequence[:,0], self.auto_sequence[:,1], 'black')
-
-            if self.hidpi_bool:
-                self.seq_minimap.set_xlabel('Time [min]', fontsize=10)
-                self.seq_minimap.set_ylabel(f'Temperature [\N{DEGREE CELSIUS}]', fontsize=10)
-                self.seq_minimap.tick_params(axis='both', which='major', labelsize=10)
-                self.seq_minimap.set_title('Sequence', fontsize=15)
-            else:
-                self.seq_minimap.set_xlabel('Time [min]', fontsize=5)
-                self.seq_minimap.set_ylabel(f'Temperature [\N{DEGREE CELSIUS}]', fontsize=5)
-                self.seq_minimap.tick_params(axis='both', which='major', labelsize=5)
-                self.seq_minimap.set_title('Sequence', fontsize=6)
-
-            self.canvas_autoseq = FigureCanvasTkAgg(self.fig_seq, master=self.frm_auto)
-            if self.hidpi_bool:
-                self.canvas_autoseq.get_tk_widget().grid(row=3, column=0, columnspan=2, sticky='nsew', pady=20, ipady=20)
-            else:
-                self.canvas_autoseq.get_tk_widget().grid(row=3, column=0, columnspan=2, sticky='nsew', pady=20, ipady=20)
-                
-            self.rframe.rowconfigure(1, weight=1)
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
 
-            # Build an interpolation function for the autosequence
-            self.auto_sequence_interp = interpolate.interp1d(self.auto_sequence[:,0], self.auto_sequence[:,1])
+        auto_sequence = self.session.auto_sequence
 
-    def write_log(self, msg):
-        self.log.insert(END, f'{self.get_datetime_log()} - {msg}\n')
+        self.tv_autoseq = ttk.Treeview(master=self.frm_auto, columns=[0, 1], show=HEADINGS, height=5, selectmode='none')
+        for row in auto_sequence:
+            self.tv_autoseq.insert("", END, values=(row[0], row[1]))
 
-    def draw_plot(self):
+        self.tv_autoseq.heading(0, text="Time (min)")
+        self.tv_autoseq.heading(1, text="Temp (\N{DEGREE CELSIUS})")
+        self.tv_autoseq.column(0, width=150)
+        self.tv_autoseq.column(1, width=150, anchor=CENTER)
+        self.tv_autoseq.grid(row=0, column=0, columnspan=2, sticky='ew', padx=15, pady=10)
+        
+        # Put the filepath in the "sequence loaded! label"
+        self.loaded_csv_var.set(f'Sequence loaded! {self.session.seq_fname}')
+        self.lbl_init_auto = ttk.Label(master=self.frm_auto, textvariable=self.loaded_csv_var, bootstyle=(SUCCESS))
+        self.lbl_init_auto.grid(row=2, column=0, columnspan=2, sticky='ew', padx=15, pady=5)
 
-        xlim, ylim, time_arry, temp_as_arry, setpoint_arry = self.get_mins_lims_from_plt_str()
+        # Matplotlib plot sequence widget
+        if self.hidpi_bool:
+            self.fig_seq = Figure(figsize=(1, 3.5), dpi=100)
+        else:
+            self.fig_seq = Figure(figsize=(1, 2.1), dpi=100)
+            
+        self.canvas_autoseq = FigureCanvasTkAgg(self.fig_seq, master=self.frm_auto)
+        self.seq_minimap = SequenceMinimap(self.fig_seq, self.canvas_autoseq, self.session.auto_sequence_profile, self.hidpi_bool)
+        if self.hidpi_bool:
+            self.canvas_autoseq.get_tk_widget().grid(row=3, column=0, columnspan=2, sticky='nsew', pady=20, ipady=20)
+        else:
+            self.canvas_autoseq.get_tk_widget().grid(row=3, column=0, columnspan=2, sticky='nsew', pady=20, ipady=20)
+            
+        self.rframe.rowconfigure(1, weight=1)
+        self.loaded_csv_bool = 1
+
+        self.show_auto_seq_buttons()
+        self.update_seq_minimap()
 
-        self.fig_main_temp_plot.clear()
-        self.ax = self.fig_main_temp_plot.add_subplot(111)
+    def show_auto_seq_buttons(self):
+        """
+        START while the active oven isn't running a sequence, STOP while it is
+        """
 
-        if self.controller_com_port_is_selected:
-            if time_arry is not None:
-                for i in np.arange(self.history_temp[0].shape[0]):
-                    self.ax.plot(time_arry, temp_as_arry[:,i], label=f'TC {i+1}')
+        if not self.auto_tab_built_bool:
+            return
 
-                self.ax.plot(time_arry, setpoint_arry, 'red', linewidth=3, label='Setpoint')
-                self.ax.legend()    #loc='northeast'
+        running_bool = self.session.mode == 'AUTO'
+        if running_bool and self.btn_abort_seq_auto is None:
+            self.btn_submit_seq_auto.destroy()
+            self.btn_abort_seq_auto = ttk.Button(master=self.frm_auto, width=10, text="STOP", bootstyle=DANGER, command=self.on_abort_auto_seq)
+            self.btn_abort_seq_auto.grid(row=1, column=1, padx=10, pady=10)
 
-        if self.hidpi_bool:
-            self.ax.set_xlabel('Time [min]', fontsize=25)
-            self.ax.set_ylabel(f'Temperature [\N{DEGREE CELSIUS}]', fontsize=20)
-            self.ax.tick_params(axis='both', which='major', labelsize=20)
-            self.ax.set_title('Temperature History', fontsize=35)
-        else:
-            self.ax.set_xlabel('Time [min]', fontsize=10)
-            self.ax.set_ylabel(f'Temperature [\N{DEGREE CELSIUS}]', fontsize=10)
-            self.ax.tick_params(axis='both', which='major', labelsize=10)
-            self.ax.set_title('Temperature History', fontsize=14)
+        elif not running_bool and self.btn_abort_seq_auto is not None:
+            self.btn_abort_seq_auto.destroy()
+            self.btn_abort_seq_auto = None
+            self.btn_submit_seq_auto = ttk.Button(master=self.frm_auto, width=10, text="START", bootstyle=SUCCESS, command=self.on_start_auto_sequence)
+            self.btn_submit_seq_auto.grid(row=1, column=1, padx=10, pady=10)
 
-        self.ax.set_xlim(xlim)       # Set the current xlim to whatever was initialized in plt_scale_var
-        self.ax.set_ylim(ylim)       # Compute the ylim based on the range of data being displayed
+        if not running_bool:
+            self.display_cache.config(self.btn_submit_seq_auto, state=NORMAL if self.session.auto_sequence is not None else DISABLED)
+        self.display_cache.config(self.btn_select_seq_auto, state=DISABLED if running_bool else NORMAL)
 
-        self.canvas.draw()
+    def update_seq_minimap(self):
+        """
+        Draws the progress through the sequence in red on top of the target profile
+        """
 
-    def reset_timebase(self):
-        self.save_data_to_csv()     # Save the data before wiping the logs
-        self.savefig()
+        if self.seq_minimap is None:
+            return
 
-        self.timebase = time.time()
-        self.rel_time = 0
+        self.seq_minimap.update(self.session.seq_time if self.session.mode == 'AUTO' else None)
 
-        self.history_time = []
-        self.history_temp = []
-        self.history_setpoint = []
-        self.history_mode = []
-        self.history_estop = []
-        self.history_status = []
+    def write_log(self, msg):
+        logger.info(msg)    # Shows up in the log pane through TkLogHandler, and in the run's log.txt
 
-    def get_rel_time(self, frmt_bool=None):
+    def draw_plot(self):
         """
-        Returns the minutes since the current timebase was initialized
+        Pushes the current time window of the active oven into the live plot. The line artists are reused, and the
+        axes are only redrawn when the (snapped) limits change
+
         """
 
-        sec_rel = (time.time() - self.timebase)
-        if frmt_bool:
-            return sec_rel/60, str(timedelta(seconds=sec_rel)).split('.')[0]    # Chops off the ms
+        if self.live_plot is None:  # Still loading in fast start
+            return
+
+        xlim, ylim, time_arry, temp_as_arry, setpoint_arry = self.get_mins_lims_from_plt_str()
+
+        session = self.session
+        if session.port and time_arry is not None:
+            # Min/max decimation down to ~1 point per pixel column. Peaks and overshoot are kept
+            start = len(session.history) - len(time_arry)
+            max_points = self.live_plot.width_px
+            tc_data = session.lod_temp.decimate(session.history.rel_time, session.history.temp, start, max_points)
+            time_sp, setpoint_sp = session.lod_setpoint.decimate(session.history.rel_time, session.history.setpoint[:, None], start, max_points)
+            self.live_plot.update(xlim, ylim, tc_data, (time_sp.ravel(), setpoint_sp.ravel()))
         else:
-            return sec_rel/60     # Convert second to minutes
+            self.live_plot.update(xlim, ylim)
 
     def get_datetime_str(self):
         return datetime.now().strftime("%Y%m%d-%H%M%S")
@@ -745,25 +860,13 @@ class App(ttk.Window):
     def get_datetime_log(self):
         return datetime.now().strftime("%Y/%m/%d %H:%M:%S")
 
-    def set_setpoint(self, new_setpoint):
-        if not self.estop_bool:
-            if new_setpoint < 140:
-                self.send_temp(self.ser_controller, new_setpoint)
-            else:
-                Messagebox.show_error('Please choose a setpoint less than 140 \N{DEGREE CELSIUS}', title='Max Setpoint Exceeded')
-        else:
-            Messagebox.show_error('System is estopped!', title='ESTOP Active')
-
-    def send_temp(self, ser, temp):
-        ser.write(bytes(f'<{round(temp, 5)}>', 'ascii'))    # Need to enclose temp in <> for the nonblocking parsefloat function on the arduino side
-
     def set_heater_indicator(self, heater_bool):
         if heater_bool:
-            self.heater_canvas.itemconfig(self.status_indicator, fill='#2bed65')
-            self.str_heater_status.set('HEATER ON')
+            self.display_cache.itemconfig(self.heater_canvas, self.status_indicator, fill='#2bed65')
+            self.display_cache.set(self.str_heater_status, 'HEATER ON')
         else:
-            self.heater_canvas.itemconfig(self.status_indicator, fill='gray')
-            self.str_heater_status.set('HEATER OFF')
+            self.display_cache.itemconfig(self.heater_canvas, self.status_indicator, fill='gray')
+            self.display_cache.set(self.str_heater_status, 'HEATER OFF')
 
     def preheat_bar(self, cmd):
         if cmd == 'on':
@@ -789,312 +892,258 @@ class App(ttk.Window):
                 self.lbl_preheat = None
                 self.prog_bar_preheating = None
 
-    def receive_controller_data_and_update(self, data_str):
+    def show_session_state(self):
         """
-        Doubles as the serial parser and state manager while in a state
-        The state transition manager handles the transistion between states in the function change_state
-        
+        Copies the state of the active oven into the status, monitor, and title widgets
         """
 
-        parse_args = data_str.split(' ')
-        for i, arg in enumerate(parse_args[:6]):
-            if arg == 'nan':
-                if len(self.history_temp):
-                    self.tc_readings[i] = self.history_temp[-1][i]     # If it's a nan, set it to value of the last temperature.
-                else:
-                    self.tc_readings[i] = 0     # Corner case if the nan is in the first entry in the history vector
-                self.write_log(f'Nan detected in TC {i+1}')
-            else:
-                self.tc_readings[i] = float(parse_args[i])
-        self.heater_is_active = int(parse_args[6])
-        self.setpoint = float(parse_args[7])
-        estop = int(parse_args[8])
+        session = self.session
+
+        self.display_cache.set(self.str_status, session.status)
+        self.display_cache.config(self.lbl_status, foreground=self.status_colors[session.status])
+        self.display_cache.set(self.str_mode, session.mode_str)
+        self.display_cache.config(self.btn_estop, state=DISABLED if session.estop_bool else NORMAL)
+
+        if session.temp_mean is None:   # No samples from this oven yet
+            for tc in self.tc_strs:
+                self.display_cache.set(tc, f'-- \N{DEGREE CELSIUS}')
+            self.display_cache.set(self.flt_mean_temp, f'-- \N{DEGREE CELSIUS}')
+            self.display_cache.set(self.flt_stddev, f'-- \N{DEGREE CELSIUS}')
+            self.display_cache.set(self.flt_setpoint, f'-- \N{DEGREE CELSIUS}')
+            self.display_cache.set(self.str_action, 'OFF')
+            self.display_cache.set(self.str_cure, '--')
+            self.set_heater_indicator(0)
+            self.preheat_bar('off')
+            return
 
         for idx, tc in enumerate(self.tc_strs):
-            tc.set(f'{self.tc_readings[idx]} \N{DEGREE CELSIUS}')
-
-        self.temp_mean = np.mean(self.tc_readings)
-        self.temp_std = np.std(self.tc_readings, ddof=1)    # Sample standard deviation, not population std deviation
+            self.display_cache.set(tc, f'{session.tc_readings[idx]} \N{DEGREE CELSIUS}')
 
-        self.flt_mean_temp.set(f'{round(self.temp_mean, 2)} \N{DEGREE CELSIUS}')
-        self.flt_stddev.set(f'{round(self.temp_std, 2)} \N{DEGREE CELSIUS}')
-        self.flt_setpoint.set(f'{round(self.setpoint, 2)} \N{DEGREE CELSIUS}')
+        self.display_cache.set(self.flt_mean_temp, f'{round(session.temp_mean, 2)} \N{DEGREE CELSIUS}')
+        self.display_cache.set(self.flt_stddev, f'{round(session.temp_std, 2)} \N{DEGREE CELSIUS}')
+        self.display_cache.set(self.flt_setpoint, f'{round(session.setpoint, 2)} \N{DEGREE CELSIUS}')
 
-        self.set_heater_indicator(self.heater_is_active)
+        self.set_heater_indicator(session.heater_is_active)
 
-        if (self.setpoint - self.temp_mean) > 5:    # System is heating    alternative: add logic AND so that it only says heating if both the temp is out of range and the heater is on
-            self.str_action.set('Heating')
+        self.display_cache.set(self.str_action, session.action)
+        if session.action == 'Heating':
             self.preheat_bar('on')
-        elif (self.temp_mean - self.setpoint) > 5:    # System is cooling
-            self.str_action.set('Cooling')
-            self.preheat_bar('off')
         else:
-            self.str_action.set('Holding')
             self.preheat_bar('off')
 
-        self.rel_time, self.str_rel_time = self.get_rel_time(frmt_bool=True)
-        self.history_time.append(self.rel_time)
-        self.history_temp.append(self.tc_readings.copy())
-        self.history_setpoint.append(self.setpoint)
-        self.history_mode.append(self.str_mode.get().split(' ')[0])
-        self.history_status.append(self.str_status.get())
-        self.history_estop.append(self.estop_bool)
-        self.history_fan1.append(self.fan1_rpm)     # The fan RPMs are appended in the main controller loop so that the length of the list matches those for the other quantities
-        self.history_fan2.append(self.fan2_rpm)
-        self.history_real_time.append(datetime.now().strftime("%m/%d/%Y, %H:%M:%S"))
-        self.history_heater.append(self.heater_is_active)
-
-        if int(estop) and not self.estop_bool:      # Estop can be either 1 or 2 depending on the fault condition. Only calls the estop function once and not in subsequent loops. TODO log the fault condition
-            self.on_estop()
-            self.write_log(f'ESTOP CODE: {estop}')
+        self.display_cache.set(self.str_fan1, f'{session.fan1_rpm} RPM')
+        self.display_cache.set(self.str_fan2, f'{session.fan2_rpm} RPM')
+        self.display_cache.set(self.str_cure, session.cure_metrics.status_str())
 
-        self.draw_plot()
+    def update_fleet_overview(self, session):
+        if not self.fleet_bool:
+            return
 
-        # Then start doing the routines for the state machine
-        if 'MANUAL' in self.str_mode.get():
-            self.str_mode.set(f'MANUAL {self.str_rel_time}')
+        mean_temp = '--' if session.temp_mean is None else f'{round(session.temp_mean, 1)}'
+        values = (session.name, session.port, session.mode_str, mean_temp, f'{round(session.setpoint, 1)}', session.status)
+        if self.tv_fleet.exists(session.name):
+            self.tv_fleet.item(session.name, values=values)
+        else:
+            self.tv_fleet.insert("", END, iid=session.name, values=values)
 
-        if 'AUTO' in self.str_mode.get():
-            self.update_auto_seq()     # Update the auto sequence setpoint
+    def on_select_fleet_row(self):
+        selection = self.tv_fleet.selection()
+        if selection and selection[0] != self.session.name:
+            self.set_active_session(selection[0])
 
-    def receive_fan1_data(self, serial_str):
-        # Was seeing a infrequent occurrence of an empty string being received from the fan arduino
-        try:
-            self.fan1_rpm = int(serial_str)
-            self.str_fan1.set(f'{self.fan1_rpm} RPM')
-        except Exception as e:
-            print(datetime.now().strftime("%d/%m/%Y %H:%M:%S"))
-            print(e)
+    def receive_controller_data_and_update(self, session, data_str, t_recv=None):
+        """
+        Runs the core's ingest and state machine for the session, then refreshes the widgets
+        """
 
-    def receive_fan2_data(self, serial_str):
-        try:
-            self.fan2_rpm = int(serial_str)
-            self.str_fan2.set(f'{self.fan2_rpm} RPM')
-        except Exception as e:
-            print(datetime.now().strftime("%d/%m/%Y %H:%M:%S"))
-            print(e)
+        if session.receive_controller_data(data_str, t_recv):
+            self.update_controller_widgets(session)
+
+    def update_controller_widgets(self, session):
+        """
+        Marks the widgets as stale after a sample from the session. They are redrawn on the next frame of the scheduler
+        """
+
+        self.dirty_sessions.add(session)
+        self.render_scheduler.request('labels')
+
+        if session is self.session:
+            self.render_scheduler.request('plot')
+            if session.mode == 'AUTO' or (self.seq_minimap is not None and self.seq_minimap.progress_bool):    # Running, or just stopped running a sequence
+                self.render_scheduler.request('minimap')
 
-    # "State machine" update functions - self.str_mode holds the current state
+    def render_labels(self):
+        for session in self.dirty_sessions:
+            self.update_fleet_overview(session)
+
+        if self.session in self.dirty_sessions:
+            with profiler.stage('Tk var updates'):
+                self.show_session_state()
+                self.show_auto_seq_buttons()
+        self.dirty_sessions.clear()
+
+    def render_plot(self):
+        with profiler.stage('plot render'):
+            self.draw_plot()
+
+    def render_minimap(self):
+        with profiler.stage('minimap render'):
+            self.update_seq_minimap()
+
+    def update_fan_widgets(self, session, idx):
+        if session is self.session:
+            if idx == 1:
+                self.display_cache.set(self.str_fan1, f'{session.fan1_rpm} RPM')
+            else:
+                self.display_cache.set(self.str_fan2, f'{session.fan2_rpm} RPM')
+
+    # "State machine" update functions - session.mode holds the current state
     def on_set_manual_setpoint(self):      # This is kind of like a state transistion manager
         if not self.entry_manual_setpoint.get():    # If the manual setpoint field was empty
             return
 
-        if 'AUTO' in self.str_mode.get():
-            self.on_abort_auto_seq()
-
-        if 'MANUAL' not in self.str_mode.get(): # Only want to reset the timebase if manual mode is switched into from a different mode
-            self.reset_timebase()
-
         setpoint = float(self.entry_manual_setpoint.get())
-        self.set_setpoint(setpoint)
-        self.str_mode.set(f'MANUAL {self.str_rel_time}')
+        try:
+            self.session.start_manual(setpoint)
+        except SetpointRejected as e:
+            Messagebox.show_error(str(e), title=e.title)
+            return
+
         self.entry_manual_setpoint.delete(0, 'end')
         self.preheat_bar('off')
-        self.str_status.set('RUNNING')
-        self.lbl_status.config(foreground=app.status_colors['RUNNING'])
-        self.write_log(f'Set manual setpoint: {setpoint}C')
+        self.show_session_state()
+        self.show_auto_seq_buttons()
+        self.update_seq_minimap()
 
     def on_start_auto_sequence(self):
-        self.reset_timebase()
+        self.session.start_auto_seq()
 
-        self.str_mode.set(f'AUTO {self.str_rel_time}')
         self.preheat_bar('off')
-        self.str_status.set('RUNNING')
-        self.lbl_status.config(foreground=app.status_colors['RUNNING'])
-        self.update_auto_seq(first_bool=True)  # First time through the auto sequence loop
-        self.write_log('Starting autosequence')
-
-        # Change start button to abort button
-        self.btn_submit_seq_auto.destroy()
-        self.btn_abort_seq_auto = ttk.Button(master=self.frm_auto, width=10, text="STOP", bootstyle=DANGER, command=self.on_abort_auto_seq)
-        self.btn_abort_seq_auto.grid(row=1, column=1, padx=10, pady=10)
-        self.btn_select_seq_auto.config(state=DISABLED)
+        self.show_session_state()
+        self.show_auto_seq_buttons()
+        self.update_seq_minimap()
 
     def on_abort_auto_seq(self):
-        self.set_setpoint(0)
-        self.str_mode.set('OFF')
-        self.str_status.set('CONNECTED')
-        self.lbl_status.config(foreground=self.status_colors['CONNECTED'])
+        self.session.abort_auto_seq()
 
-        self.seq_minimap.lines.pop()    # Remove the last artist to avoid accumulating artists
-        self.canvas_autoseq.draw()
         self.preheat_bar('off')
-        self.write_log('Stopped autosequence')
-
-        self.btn_abort_seq_auto.destroy()
-        self.btn_submit_seq_auto = ttk.Button(master=self.frm_auto, width=10, text="START", bootstyle=SUCCESS, command=self.on_start_auto_sequence)
-        self.btn_submit_seq_auto.grid(row=1, column=1, padx=10, pady=10)
-        self.btn_select_seq_auto.config(state=NORMAL)
+        self.show_session_state()
+        self.show_auto_seq_buttons()
+        self.update_seq_minimap()
 
-    def update_auto_seq(self, first_bool=False):
-        # Tasks to run if sequence is over
-        if self.rel_time > self.auto_sequence[-1,0]:
-            self.set_setpoint(0)
-            self.str_mode.set('OFF')
-            self.str_status.set('CONNECTED')
-            self.lbl_status.config(foreground=self.status_colors['CONNECTED'])
-            self.btn_select_seq_auto.config(state=NORMAL)
-
-        else:
-            # Update the minimap
-            minimap_plt_times = np.linspace(0, self.rel_time, endpoint=True, num=500)
-            minimap_plt_temps = self.auto_sequence_interp(minimap_plt_times)
-            if not first_bool:  # If you pop() on the first time through the loop, you erase the target setpoint plot
-                self.seq_minimap.lines.pop()    # Remove the last artist to avoid accumulating artists
-            self.seq_minimap.plot(minimap_plt_times, minimap_plt_temps, 'red')
-            self.canvas_autoseq.draw()
+    def save_data_to_csv(self):
+        self.session.save_data_to_csv()
 
-            # If the last temp wasn't the same as the current temp, send a new setpoint
-            target_setpoint_interp = float(self.auto_sequence_interp(np.array(self.rel_time)))
-            if target_setpoint_interp != self.setpoint:
-                self.set_setpoint(target_setpoint_interp)
+    def savefig(self):
+        if len(self.session.history) and self.live_plot is not None:
+            fname = f'{self.app_dirname}/{self.session.data_dirname}/{self.get_datetime_str()}.png'
+            self.live_plot.savefig(fname, dpi=400)
+            self.write_log(f'Wrote data to file: {fname}')
 
-            self.str_mode.set(f'AUTO {self.str_rel_time}')
+    def on_toggle_profiler(self):
+        self.profiler_shown_bool = not self.profiler_shown_bool
 
-    def save_data_to_csv(self):
+        if self.profiler_shown_bool:
+            self.btn_profiler.config(text='Profiler \N{BLACK DOWN-POINTING SMALL TRIANGLE}')
+            self.btn_profiler_dump.grid(row=0, column=1, sticky='e', padx=5)
+            self.lbl_profiler.grid(row=1, column=0, columnspan=2, sticky='w')
+            self.update_profiler_overlay()
+        else:
+            self.btn_profiler.config(text='Profiler \N{BLACK RIGHT-POINTING SMALL TRIANGLE}')
+            self.btn_profiler_dump.grid_remove()
+            self.lbl_profiler.grid_remove()
+            if self.profiler_after_id is not None:
+                self.after_cancel(self.profiler_after_id)
+                self.profiler_after_id = None
+
+    def update_profiler_overlay(self):
         """
-        Fields that are saved:
-        Time
-        temp
-        setpoint
-        mode
-        status
-        estop bool
-        
+        Refreshes the stage table once a second while the overlay is open
         """
 
-        if len(self.history_time):
-            history_arry = np.column_stack((self.history_real_time,
-                                            self.history_time,
-                                            self.history_temp,
-                                            self.history_setpoint,
-                                            self.history_estop,
-                                            self.history_heater,
-                                            self.history_fan1,
-                                            self.history_fan2,
-                                            self.history_mode,
-                                            self.history_status
-                                            ))
-            
-            header_str = 'Time, Rel time [min], TC1 [degC], TC2 [degC], TC3 [degC], TC4 [degC], TC5 [degC], TC6 [degC], Setpoint [degC], Estop, Heater On/Off, Fan 1 [RPM], Fan 2 [RPM], Mode, Status'
-            fname = f'{self.app_dirname}/{self.data_dirname}/{self.get_datetime_str()}.csv'
-            np.savetxt(fname, history_arry, delimiter=',', header=header_str, fmt='%s', comments='')    # Last argument prevents '#' from being appended to the start of the file. '%s' allows us to save the file with both string and numerical dtypes
-            self.write_log(f'Wrote data to file: {fname}')
+        self.str_profiler.set(profiler.format())
+        self.profiler_after_id = self.after(1000, self.update_profiler_overlay)
 
-    def savefig(self):
-        if len(self.history_time):
-            fname = f'{self.app_dirname}/{self.data_dirname}/{self.get_datetime_str()}.png'
-            self.fig_main_temp_plot.savefig(fname, dpi=400)
-            self.write_log(f'Wrote data to file: {fname}')
+    def on_dump_profiler(self):
+        fname = f'{self.app_dirname}/{self.session.data_dirname}/profile-{self.get_datetime_str()}.json'
+        profiler.dump(fname)
+        self.write_log(f'Wrote profile to: {fname}')
 
 def process_incoming_data():
+    """
+    Lets the core ingest whatever the serial event loop has queued since the last tick, then refreshes the widgets.
+    Never blocks on a port
+    """
 
-    dev_connected_bool = False
+    dev_connected_bool = app.core.connected()
 
-    # Read from controller
-    if app.controller_com_port_is_selected:
-        dev_connected_bool = True
+    def on_event(event, session, idx):
+        if event == 'sample':
+            app.update_controller_widgets(session)
 
-        try:
-            line = app.ser_controller.readline()
-        except Exception as e:
-            app.write_log('---------- LOST CONNECTION WITH CONTROLLER ----------')
-            app.str_status.set('INACTIVE')
-            app.lbl_status.config(foreground=app.status_colors['INACTIVE'])
-            app.selected_controller_comport.set('None')
-            app.controller_com_port_is_selected = None
-            app.str_mode.set('OFF')
-            line = None
-
-        if line:
-            string = line.decode().strip('\r\n')  # convert the byte string to a unicode string
-            app.receive_controller_data_and_update(string)
-
-    if app.fan1_com_port_is_selected:
-        dev_connected_bool = True
+        elif event == 'lost':
+            if session is app.session:
+                app.selected_controller_comport.set('None')
+                app.show_session_state()
+                app.show_auto_seq_buttons()
+            app.update_fleet_overview(session)
 
-        try:
-            line = app.ser_fan1.readline()
-        except Exception as e:
-            app.write_log('---------- LOST CONNECTION WITH Fan 1 ----------')
-            line = None
-        if line:
-            string = line.decode().strip('\r\n')  # convert the byte string to a unicode string
-            app.receive_fan1_data(string)
-
-    if app.fan2_com_port_is_selected:
-        dev_connected_bool = True
-        try:
-            line = app.ser_fan2.readline()
-        except Exception as e:
-            app.write_log('---------- LOST CONNECTION WITH Fan 2 ----------')
-            line = None
-        if line:
-            string = line.decode().strip('\r\n')  # convert the byte string to a unicode string
-            app.receive_fan2_data(string)
+        elif event == 'lost_fan':
+            if session is app.session:
+                (app.selected_fan1_comport if idx == 1 else app.selected_fan2_comport).set('None')
+            app.update_fan_widgets(session, idx)
+
+        elif event == 'fan':
+            app.update_fan_widgets(session, idx)
+
+    # A burst is recorded in full but only drawn once, unless --render-every-sample
+    app.core.poll(max_items=2000, on_event=on_event)
+    if getattr(app.core.serial_ingest, 'finished', False):     # A replay, reported once its last batch is through
+        app.core.serial_ingest.report()
 
     if dev_connected_bool:
-        app.after(50, process_incoming_data)   # A finite delay (~100) is needed to wait for other events to be captured (limitation of running single-threaded). Else, it will just read the serial port the whole time
+        app.after(20, process_incoming_data)   # Draining is non-blocking, so this only bounds the latency from the serial loop to the UI
     else:
         app.after(1000, process_incoming_data)
 
-    if app.ports != serial.tools.list_ports.comports():     # The list of ports has changed, like after adding a device
-        # Update the menu of possible COM ports
-
-        # Controller
-        app.ports = serial.tools.list_ports.comports()
-        app.dev = [port.device for port in app.ports]
-
-        app.menu_controller_com.destroy()
-        app.mb_controller_com.destroy()
-
-        app.menu_controller_com = ttk.Menu(app.root)
-        for dev in app.dev:
-            app.menu_controller_com.insert_radiobutton(label=dev, value=dev, variable=app.selected_controller_comport, index=0)
-
-        app.mb_controller_com = ttk.Menubutton(
-            master=app.frm_theme_selection,
-            textvariable=app.selected_controller_comport,
-            bootstyle=(SECONDARY, OUTLINE),
-            menu=app.menu_controller_com)
-        app.mb_controller_com.grid(row=0, column=3, padx=5, pady=5, sticky='w')
-
-        # Fan 1
-        app.menu_fan1_com.destroy()
-        app.mb_fan1_com.destroy()
-
-        app.menu_fan1_com = ttk.Menu(app.root)
-        for dev in app.dev:
-            app.menu_fan1_com.insert_radiobutton(label=dev, value=dev, variable=app.selected_fan1_comport, index=0)
-
-        app.mb_fan1_com = ttk.Menubutton(
-            master=app.frm_theme_selection,
-            textvariable=app.selected_fan1_comport,
-            bootstyle=(SECONDARY, OUTLINE),
-            menu=app.menu_fan1_com)
-        app.mb_fan1_com.grid(row=0, column=5, padx=5, pady=5, sticky='w')
-
-        # Fan 2
-        app.menu_fan2_com.destroy()
-        app.mb_fan2_com.destroy()
-
-        app.menu_fan2_com = ttk.Menu(app.root)
-        for dev in app.dev:
-            app.menu_fan2_com.insert_radiobutton(label=dev, value=dev, variable=app.selected_fan2_comport, index=0)
-
-        app.mb_fan2_com = ttk.Menubutton(
-            master=app.frm_theme_selection,
-            textvariable=app.selected_fan2_comport,
-            bootstyle=(SECONDARY, OUTLINE),
-            menu=app.menu_fan2_com)
-        app.mb_fan2_com.grid(row=0, column=7, padx=5, pady=5, sticky='w')
+    for added, removed in app.port_watcher.drain():    # The list of ports has changed, like after adding a device
+        app.update_com_menus(added, removed)
 
 
 if __name__ == "__main__":
     hidpi_bool = True
 
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fleet', action='store_true', help='One window driving several ovens, one per controller COM port')
+    parser.add_argument('--replay', nargs='+', help='Replay a recorded run CSV (or the segments of a run log) instead of a controller')
+    parser.add_argument('--speed', default='1', help="Replay speed, ex. 1, 100 or 'max'")
+    parser.add_argument('--render-every-sample', action='store_true', help='Report every sample of a burst to the display instead of only the newest')
+    parser.add_argument('--plot-fps', type=float, default=5, help='Frame rate of the temperature plot')
+    parser.add_argument('--label-fps', type=float, default=2, help='Frame rate of the status and monitor labels')
+    parser.add_argument('--profile', action='store_true', help='Time the stages of the hot path, shown under Profiler in the Monitor pane')
+    parser.add_argument('--fast-start', action='store_true', help='Show the window first and load the plot and the auto tab after')
+    parser.add_argument('--baud', type=int, default=9600, help='Baud rate of the controllers, ex. 115200 for binary telemetry')
+    parser.add_argument('--upload-profile', action='store_true', help='Upload auto sequences to the controller and run them there')
+    parser.add_argument('--cure-threshold', type=float, default=120.0, help='Temperature that counts as curing in the cure metrics [degC]')
+    parser.add_argument('--cure-ref-temp', type=float, default=130.0, help='Reference temperature of the equivalent cure time [degC]')
+    parser.add_argument('--activation-energy', type=float, default=65.0, help='Activation energy of the resin [kJ/mol]')
+    args = parser.parse_args()
+    profiler.enabled = args.profile
+
+    serial_ingest = None
+    clock = time.time
+    if args.replay:
+        from replay import ReplayIngest, parse_speed
+        serial_ingest = ReplayIngest(args.replay, parse_speed(args.speed))
+        clock = serial_ingest.clock
+
     app_dirname = os.path.dirname(__file__)
-    app = App("TRAK TRO 37 SMH Command, Control, and Monitoring Center", f"{app_dirname}/iconic.png", hidpi_bool, app_dirname)
-    
+    app = App("TRAK TRO 37 SMH Command, Control, and Monitoring Center", f"{app_dirname}/iconic.png", hidpi_bool, app_dirname, args.fleet,
+              serial_ingest, clock, not args.render_every_sample, args.plot_fps, args.label_fps, fast_start_bool=args.fast_start, baudrate=args.baud,
+              profile_upload_bool=args.upload_profile, cure_threshold_c=args.cure_threshold, cure_ref_temp_c=args.cure_ref_temp,
+              cure_activation_kj=args.activation_energy)
+    if args.replay:
+        app.selected_controller_comport.set('replay')     # Connects the session to the recording
+
     app.after(0, process_incoming_data)
     app.mainloop()
\ No newline at end of file
@@ -0,0 +1,72 @@
+"""
+Runs a cure without the GUI. Ex:
+
+    python oven_headless.py --port /dev/ttyACM0 --profile cure_cycle_130C.csv
+    python oven_headless.py --port COM3 --fan1 COM4 --fan2 COM5 --setpoint 80
+
+Repeat --port (and --profile/--setpoint) to drive several ovens at once. The run is logged to stdout and to
+log.txt in the run directory. Every sample is streamed into the run directory as it arrives.
+"""
+
+import argparse
+import logging
+import os
+import time
+
+from oven_core import OvenCore
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless oven controller')
+    parser.add_argument('--port', action='append', required=True, help='Controller COM port, once per oven')
+    parser.add_argument('--fan1', action='append', default=[], help='Fan 1 COM port, in the same order as --port')
+    parser.add_argument('--fan2', action='append', default=[], help='Fan 2 COM port, in the same order as --port')
+    parser.add_argument('--profile', action='append', default=[], help='Auto sequence CSV, in the same order as --port')
+    parser.add_argument('--setpoint', action='append', type=float, default=[], help='Manual setpoint, for the ovens without a profile')
+    parser.add_argument('--poll', type=float, default=0.02, help='Seconds between polls of the serial loop')
+    parser.add_argument('--fsync-interval', type=float, default=5.0, help='Seconds between fsyncs of the run log')
+    parser.add_argument('--segment-rows', type=int, default=50000, help='Rows per run log segment')
+    parser.add_argument('--baud', type=int, default=9600, help='Baud rate of the controllers')
+    parser.add_argument('--setpoint-quantum', type=float, default=0.1, help='Smallest setpoint change that is sent [degC]')
+    parser.add_argument('--setpoint-interval', type=float, default=1.0, help='Least seconds between setpoint commands')
+    parser.add_argument('--upload-profile', action='store_true', help='Upload the profiles to the controllers and run them there')
+    parser.add_argument('--cure-threshold', type=float, default=120.0, help='Temperature that counts as curing in the cure metrics [degC]')
+    parser.add_argument('--cure-ref-temp', type=float, default=130.0, help='Reference temperature of the equivalent cure time [degC]')
+    parser.add_argument('--activation-energy', type=float, default=65.0, help='Activation energy of the resin [kJ/mol]')
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(message)s', datefmt='%Y/%m/%d %H:%M:%S', level=logging.INFO)
+
+    app_dirname = os.path.dirname(os.path.abspath(__file__))
+    core = OvenCore(app_dirname, fleet_bool=len(args.port) > 1, fsync_interval=args.fsync_interval, segment_rows=args.segment_rows,
+                    baudrate=args.baud, setpoint_quantum=args.setpoint_quantum, setpoint_interval=args.setpoint_interval,
+                    profile_upload_bool=args.upload_profile, cure_threshold_c=args.cure_threshold, cure_ref_temp_c=args.cure_ref_temp,
+                    cure_activation_kj=args.activation_energy)
+
+    for i, port in enumerate(args.port):
+        session = core.add_session()
+        session.connect(port)
+        if i < len(args.fan1):
+            session.connect_fan(1, args.fan1[i])
+        if i < len(args.fan2):
+            session.connect_fan(2, args.fan2[i])
+
+        if i < len(args.profile):
+            session.load_auto_seq(args.profile[i])
+            session.start_auto_seq()
+        elif i < len(args.setpoint):
+            session.start_manual(args.setpoint[i])
+
+    try:
+        # Runs until every oven has finished its sequence, been estopped, or lost its connection
+        while any(session.mode in ('AUTO', 'MANUAL') for session in core.sessions.values()):
+            core.poll()
+            time.sleep(args.poll)
+    except KeyboardInterrupt:
+        logging.getLogger('ezbake').info('Interrupted')
+    finally:
+        core.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,548 @@
+import time
+from datetime import datetime
+from datetime import timedelta
+from pathlib import Path
+import numpy as np
+
+from telemetry import TelemetryStore, encode_mode, encode_status, csv_header, parse_lines
+from windowing import WindowExtremaSet
+from decimate import MinMaxDecimator
+from runlog import RunLogWriter
+from profiler import profiler
+from setpoint_profile import SetpointProfile
+from setpoint_channel import SetpointChannel
+from telemetry_frames import TelemetryFrame, SEQ_MOD, frames_to_values
+from cure_metrics import CureMetrics
+
+MAX_SETPOINT_C = 140
+ESTOP_SETPOINT_C = 9000     # The firmware interprets any setpoint over 1000C as an estop
+FW_CLOCK_RESYNC_S = 1.0     # A firmware timestamp this far behind the arrival time means the board restarted
+PROFILE_ACK_TIMEOUT_S = 5.0     # A profile upload that the controller stops answering for this long runs from the host instead
+PROFILE_TRACK_TOL_C = 1.0   # Controller setpoint this far off the profile is logged
+PROFILE_TRACK_LAG_S = 3.0   # The echoed setpoint is up to a loop and the transit behind the profile
+SERIAL_RX_BYTES = 64        # Receive buffer of the controller, anything past it is dropped while the loop blocks
+MAX_PROFILE_POINTS = 32     # From include/constants.h
+
+
+class SetpointRejected(Exception):
+    def __init__(self, msg, title):
+        super().__init__(msg)
+        self.title = title
+
+
+class OvenSession:
+    """
+    Everything that belongs to one oven: its serial link, state machine, telemetry history and auto sequence
+
+    Nothing in here touches Tk. Every session shares the same SerialIngest loop, and the GUI reads the state of the
+    active session after each of its samples. The mode attribute holds the state machine ('NOT SET', 'OFF', 'MANUAL',
+    'AUTO') and status holds the overall status ('INACTIVE', 'CONNECTED', 'RUNNING', 'ESTOPPED').
+
+    """
+
+    def __init__(self, name, serial_ingest, data_dirname, app_dirname='.', time_scales=(), n_tc=6, log=print,
+                 fsync_interval=5.0, segment_rows=50000, clock=time.time, baudrate=9600, setpoint_quantum=0.1, setpoint_interval=1.0,
+                 profile_upload_bool=False, cure_threshold_c=120.0, cure_ref_temp_c=130.0, cure_activation_kj=65.0):
+        self.name = name
+        self.serial_ingest = serial_ingest
+        self.device = f'{name}/controller'
+        self.fan_devices = (f'{name}/fan1', f'{name}/fan2')
+        self.data_dirname = data_dirname
+        self.app_dirname = app_dirname
+        self.log = log
+        self.clock = clock      # Source of the current time, a replay swaps in its own
+        self.on_reset = None    # Called right before the history is wiped, the GUI uses it to save the plot
+        self.on_run_closed = None   # Called with (session, fnames) when a run log is closed, while the history still holds the run
+
+        self.port = None
+        self.fan_ports = [None, None]
+        self.baudrate = baudrate    # Of the controller, the fan boards are always 9600
+
+        # Setpoints are queued and rate limited, and acknowledged by the setpoint in the telemetry
+        self.commands = SetpointChannel(lambda data: self.serial_ingest.write(self.device, data), clock, setpoint_quantum, setpoint_interval,
+                                        log=log)
+
+        # Binary telemetry only: the frame counter and the offset from the firmware's millis() to the epoch
+        self.last_seq = None
+        self.last_t_ms = None
+        self.n_lost_frames = 0
+        self.fw_time_offset = None
+        self.estop_bool = 0
+        self.mode = 'NOT SET'
+        self.status = 'INACTIVE'
+        self.action = 'OFF'
+
+        # Telemetry history and the incremental plot helpers that are fed from it
+        self.history = TelemetryStore(n_tc=n_tc)
+        self.plot_windows = WindowExtremaSet(time_scales)
+        self.lod_temp = MinMaxDecimator()
+        self.lod_setpoint = MinMaxDecimator()
+        self.cure_metrics = CureMetrics(n_tc, cure_threshold_c, cure_ref_temp_c, cure_activation_kj)
+
+        # Every sample is streamed to disk as it arrives. One log per timebase, opened on the first sample
+        self.run_log = None
+        self.run_profile = None     # Auto sequence file of the current run
+        self.estop_codes = []       # Fault codes reported by the firmware during the current run
+        self.fsync_interval = fsync_interval
+        self.segment_rows = segment_rows
+
+        self.fan1_rpm = 0
+        self.fan2_rpm = 0
+
+        self.timebase = None
+        self.rel_time = 0
+        self.str_rel_time = '0:00:00'
+
+        self.tc_readings = np.zeros(n_tc)
+        self.temp_mean = None
+        self.temp_std = None
+        self.setpoint = 0
+        self.heater_is_active = 0
+
+        self.seq_fname = None
+        self.auto_sequence = None
+        self.auto_sequence_profile = None
+        self.seq_segment = None     # Segment of the profile that the last setpoint came from
+        self.seq_t0 = 0             # Rel time that the sequence started at [min], later than the timebase on the controller
+
+        # With profile_upload_bool the sequence is uploaded and interpolated by the firmware, and only monitored here.
+        # profile_mode is 'uploading' until the controller confirms it, then 'device'. 'host' streams the setpoints
+        self.profile_upload_bool = profile_upload_bool
+        self.profile_mode = None
+        self.upload_commands = []   # Commands of the upload that haven't been sent yet
+        self.n_upload_replies = 0   # Replies still expected to the last batch of commands
+        self.t_upload = None
+        self.t_upload_batch = None
+        self.off_profile_bool = False
+
+    @property
+    def seq_time(self):
+        """
+        Minutes into the auto sequence
+        """
+
+        return self.rel_time - self.seq_t0
+
+    @property
+    def mode_str(self):
+        """
+        Mode as displayed, with the time since the timebase for the running modes
+        """
+
+        if self.mode == 'AUTO' and self.profile_mode == 'device':
+            return f'AUTO (controller) {self.str_rel_time}'
+        if self.mode in ('MANUAL', 'AUTO'):
+            return f'{self.mode} {self.str_rel_time}'
+        return self.mode
+
+    def connect(self, port):
+        """
+        A temperature of 0 is written anytime a new COM port is selected
+        """
+
+        self.serial_ingest.open(self.device, port, self.baudrate)
+        self.port = port
+        self.commands.reset()
+        self.last_seq = None
+        self.last_t_ms = None
+        self.fw_time_offset = None
+        self.serial_ingest.write(self.device, b'0')
+        self.reset_timebase()
+
+        self.status = 'CONNECTED'
+        self.log(f'Connected to {port}')
+
+    def connect_fan(self, idx, port):
+        self.serial_ingest.open(self.fan_devices[idx-1], port, 9600)
+        self.fan_ports[idx-1] = port
+        self.log(f'Connected to {port}')
+
+    def lost(self):
+        self.serial_ingest.close(self.device)
+        self.port = None
+        self.status = 'INACTIVE'
+        self.mode = 'OFF'
+        self.log('---------- LOST CONNECTION WITH CONTROLLER ----------')
+
+    def lost_fan(self, idx):
+        self.serial_ingest.close(self.fan_devices[idx-1])
+        self.fan_ports[idx-1] = None
+        if idx == 1:    # No reading, rather than the last one
+            self.fan1_rpm = 0
+        else:
+            self.fan2_rpm = 0
+        self.log(f'---------- LOST CONNECTION WITH Fan {idx} ----------')
+
+    def reset_timebase(self):
+        if self.on_reset is not None:
+            self.on_reset(self)
+        self.close_run_log()     # Everything up to here is already on disk, the next sample starts a new log
+
+        self.run_profile = None
+        self.estop_codes = []
+
+        self.timebase = self.clock()
+        self.rel_time = 0
+        self.str_rel_time = '0:00:00'
+
+        self.history.clear()
+        self.plot_windows.clear()
+        self.lod_temp.clear()
+        self.lod_setpoint.clear()
+        self.cure_metrics.clear()
+
+    def get_rel_time(self, frmt_bool=None, t=None):
+        """
+        Returns the minutes since the current timebase was initialized, either now or at the epoch time t
+        """
+
+        if t is None:
+            t = self.clock()
+        sec_rel = (t - self.timebase)
+        if frmt_bool:
+            return sec_rel/60, str(timedelta(seconds=sec_rel)).split('.')[0]    # Chops off the ms
+        else:
+            return sec_rel/60     # Convert second to minutes
+
+    def check_setpoint(self, new_setpoint):
+        if self.estop_bool:
+            raise SetpointRejected('System is estopped!', 'ESTOP Active')
+        if new_setpoint >= MAX_SETPOINT_C:
+            raise SetpointRejected(f'Please choose a setpoint less than {MAX_SETPOINT_C} \N{DEGREE CELSIUS}', 'Max Setpoint Exceeded')
+
+    def set_setpoint(self, new_setpoint):
+        self.check_setpoint(new_setpoint)
+        self.commands.request(new_setpoint)
+
+    def send_temp(self, temp):
+        self.commands.send_now(temp)    # Skips the queue
+
+    def estop(self):
+        if self.port is None:
+            return
+
+        self.estop_bool = 1
+        self.commands.estop(ESTOP_SETPOINT_C)
+        self.status = 'ESTOPPED'
+        self.log('---------- ESTOPPED ----------')
+
+        # Stop any currently running sequence
+        if self.mode == 'AUTO':
+            self.abort_auto_seq()
+        elif self.mode == 'MANUAL':
+            self.mode = 'OFF'
+
+    def receive_controller_data(self, data_str, t_recv=None):
+        """
+        Parses one telemetry line and runs the state machine for the current mode. Returns False if the line was
+        malformed and dropped
+
+        """
+
+        if t_recv is None:
+            t_recv = self.clock()
+        return self.receive_controller_batch([data_str], [t_recv]) == 1
+
+    def receive_controller_batch(self, lines, t_recvs):
+        """
+        Parses a burst of telemetry lines at once, then runs each sample through the history and the state machine in
+        order. Malformed lines are logged and dropped. Returns the number of samples that were kept
+
+        """
+
+        n_tc = self.history.n_tc
+        with profiler.stage('parse'):
+            if isinstance(lines[0], TelemetryFrame):
+                good, values, t_recvs = self.unpack_frames(lines, t_recvs)
+            else:
+                good, values = parse_lines(lines, n_tc)
+            if len(good) < len(lines):
+                good_set = set(good)
+                for i, line in enumerate(lines):
+                    if i not in good_set:
+                        self.log(f'Dropped malformed line: {line}')
+
+            temps = values[:, :n_tc]
+            for row, col in zip(*np.nonzero(np.isnan(temps))):     # Row order, so a run of nans carries the same value forward
+                if row > 0:
+                    temps[row, col] = temps[row-1, col]     # If it's a nan, set it to value of the last temperature.
+                elif len(self.history):
+                    temps[row, col] = self.history.temp[-1, col]
+                else:
+                    temps[row, col] = 0     # Corner case if the nan is in the first entry in the history vector
+                self.log(f'Nan detected in TC {col+1}')
+
+            temp_means = np.mean(temps, axis=1)
+            temp_stds = np.std(temps, axis=1, ddof=1)    # Sample standard deviation, not population std deviation
+
+        for k, i in enumerate(good):
+            self.ingest_sample(t_recvs[i], temps[k], int(values[k, n_tc]), float(values[k, n_tc+1]), int(values[k, n_tc+2]),
+                               temp_means[k], temp_stds[k])
+        return len(good)
+
+    def unpack_frames(self, frames, t_recvs):
+        """
+        The binary counterpart of parse_lines(). Gaps in the frame counter are logged as lost frames, and the samples
+        are timed by the firmware's clock instead of their arrival, so a burst that arrives at once keeps its spacing
+
+        The offset from millis() to the epoch is the smallest one seen, ie. the frame that arrived with the least delay.
+        It's measured again if the board restarts.
+
+        """
+
+        times = []
+        for frame, t_recv in zip(frames, t_recvs):
+            if self.last_t_ms is not None and frame.t_ms < self.last_t_ms:
+                self.log('Controller restarted')
+            elif self.last_seq is not None:
+                n_lost = (frame.seq - self.last_seq - 1) % SEQ_MOD
+                if n_lost:
+                    self.n_lost_frames += n_lost
+                    self.log(f'Lost {n_lost} telemetry frames ({self.n_lost_frames} total)')
+            self.last_seq = frame.seq
+            self.last_t_ms = frame.t_ms
+
+            offset = t_recv - frame.t_ms/1000
+            if self.fw_time_offset is None or offset < self.fw_time_offset or offset - self.fw_time_offset > FW_CLOCK_RESYNC_S:
+                self.fw_time_offset = offset
+            times.append(self.fw_time_offset + frame.t_ms/1000)
+
+        good, rows = frames_to_values(frames, self.history.n_tc)
+        return good, np.array(rows, dtype=np.float64).reshape(-1, self.history.n_tc + 3), times
+
+    def ingest_sample(self, t_recv, temps, heater_is_active, setpoint, estop, temp_mean, temp_std):
+        """
+        Records one parsed sample (nans already filled in) and runs the state machine on it
+        """
+
+        self.tc_readings[:] = temps
+        self.heater_is_active = heater_is_active
+        self.setpoint = setpoint
+        self.temp_mean = temp_mean
+        self.temp_std = temp_std
+
+        if (self.setpoint - self.temp_mean) > 5:    # System is heating    alternative: add logic AND so that it only says heating if both the temp is out of range and the heater is on
+            self.action = 'Heating'
+        elif (self.temp_mean - self.setpoint) > 5:    # System is cooling
+            self.action = 'Cooling'
+        else:
+            self.action = 'Holding'
+
+        self.rel_time, self.str_rel_time = self.get_rel_time(frmt_bool=True, t=t_recv)
+
+        # The fan RPMs are appended in the main controller loop so that the length of the columns matches those for the other quantities
+        with profiler.stage('history append'):
+            self.history.append(t_recv, self.rel_time, self.tc_readings, self.setpoint, self.estop_bool, self.heater_is_active,
+                                self.fan1_rpm, self.fan2_rpm, encode_mode(self.mode), encode_status(self.status))
+            self.plot_windows.push(self.rel_time, min(self.tc_readings.min(), self.setpoint), max(self.tc_readings.max(), self.setpoint))
+        with profiler.stage('cure metrics'):
+            self.cure_metrics.update(self.rel_time, self.tc_readings, self.temp_mean, self.setpoint)
+
+        if self.run_log is None:
+            self.run_log = RunLogWriter(f'{self.app_dirname}/{self.data_dirname}', datetime.fromtimestamp(t_recv).strftime("%Y%m%d-%H%M%S"),
+                                        csv_header(self.history.n_tc), fsync_interval=self.fsync_interval, segment_rows=self.segment_rows)
+            self.log(f'Streaming data to: {self.run_log.fnames[0]}')
+        with profiler.stage('run log'):
+            self.run_log.append(self.history.format_row(-1))
+
+        self.commands.ack(setpoint, estop, t_recv)
+        self.commands.service(t_recv)     # Sends a setpoint that was held back by the rate limit
+
+        if estop and not self.estop_bool:      # Estop can be either 1 or 2 depending on the fault condition. Only calls the estop function once and not in subsequent loops
+            self.estop()
+            self.estop_codes.append(estop)
+            self.log(f'ESTOP CODE: {estop}')
+
+        if self.mode == 'AUTO':
+            self.update_auto_seq()     # Update the auto sequence setpoint
+
+    def receive_fan_data(self, idx, serial_str):
+        # Was seeing a infrequent occurrence of an empty string being received from the fan arduino
+        try:
+            rpm = int(serial_str)
+        except Exception as e:
+            print(datetime.now().strftime("%d/%m/%Y %H:%M:%S"))
+            print(e)
+            return False
+
+        if idx == 1:
+            self.fan1_rpm = rpm
+        else:
+            self.fan2_rpm = rpm
+        return True
+
+    # State machine transitions - self.mode holds the current state
+    def start_manual(self, setpoint):
+        self.check_setpoint(setpoint)
+
+        if self.mode == 'AUTO':
+            self.abort_auto_seq()
+
+        if self.mode != 'MANUAL': # Only want to reset the timebase if manual mode is switched into from a different mode
+            self.reset_timebase()
+
+        self.set_setpoint(setpoint)
+        self.mode = 'MANUAL'
+        self.status = 'RUNNING'
+        self.log(f'Set manual setpoint: {setpoint}C')
+
+    def load_auto_seq(self, fpath):
+        self.seq_fname = Path(fpath).name
+        self.auto_sequence = np.loadtxt(fpath, delimiter=',', skiprows=1)
+
+        # Compiled once here, every sample of the run then only looks up its segment
+        self.auto_sequence_profile = SetpointProfile(self.auto_sequence)
+
+    def start_auto_seq(self):
+        self.reset_timebase()
+
+        self.mode = 'AUTO'
+        self.status = 'RUNNING'
+        self.run_profile = self.seq_fname
+        self.seq_segment = None
+        self.seq_t0 = 0
+        self.profile_mode = 'host'
+        if self.profile_upload_bool:
+            self.upload_profile()
+        self.update_auto_seq()  # First time through the auto sequence loop
+        self.log('Starting autosequence')
+
+    def upload_profile(self):
+        """
+        Sends the breakpoints of the sequence to the controller and starts it there. The controller confirms each
+        command with a '#' reply. The commands go out in batches that fit its receive buffer, the next batch when the
+        last one has been confirmed
+        """
+
+        profile = self.auto_sequence_profile
+        if len(profile) > MAX_PROFILE_POINTS:
+            self.log(f'Not uploading the profile, the controller takes up to {MAX_PROFILE_POINTS} breakpoints')
+            return
+        try:
+            self.check_setpoint(max(profile.temps))
+        except SetpointRejected as e:
+            self.log(f'Not uploading the profile: {e}')
+            return
+
+        self.commands.cancel()
+        self.upload_commands = [b'<P>'] + [bytes(f'<B {t:.3f} {temp:.2f}>', 'ascii') for t, temp in zip(profile.times, profile.temps)] + [b'<R>']
+        self.profile_mode = 'uploading'
+        self.t_upload = self.clock()
+        self.off_profile_bool = False
+        self.log(f'Uploading the profile to the controller, {len(profile)} breakpoints')
+        self.send_upload_batch()
+
+    def send_upload_batch(self):
+        n = 0
+        n_bytes = 0
+        while n < len(self.upload_commands) and n_bytes + len(self.upload_commands[n]) <= SERIAL_RX_BYTES:
+            n_bytes += len(self.upload_commands[n])
+            n += 1
+        batch, self.upload_commands = self.upload_commands[:n], self.upload_commands[n:]
+        self.serial_ingest.write(self.device, b''.join(batch))
+        self.n_upload_replies = n
+        self.t_upload_batch = self.clock()
+
+    def receive_controller_reply(self, reply):
+        fields = reply[1:].split()
+        if not fields:
+            return
+        if fields[0] in ('P', 'B') and self.profile_mode == 'uploading':
+            self.n_upload_replies -= 1
+            if self.n_upload_replies == 0 and self.upload_commands:
+                self.send_upload_batch()
+        elif fields[0] == 'R' and self.profile_mode == 'uploading':
+            if len(fields) > 1 and fields[1] == str(len(self.auto_sequence_profile)):
+                # The controller starts its profile clock now, not when the upload began. Following it from here
+                # keeps the tracking and the end of the sequence in step with the controller
+                self.profile_mode = 'device'
+                self.seq_t0 = self.get_rel_time()
+                self.log(f'Profile running on the controller, started {self.clock() - self.t_upload:.2f}s after the upload')
+            else:
+                self.log(f'Controller started a different profile ({reply}), running it from here')
+                self.profile_mode = 'host'
+        elif fields[0] == 'D':
+            self.log('Controller finished the profile')
+        elif fields[0] == 'E':
+            if self.profile_mode == 'uploading':
+                self.log(f'Controller rejected the profile ({" ".join(fields[1:])}), running it from here')
+                self.profile_mode = 'host'
+            else:
+                self.log(f'Controller: {" ".join(fields[1:])}')
+
+    def abort_auto_seq(self):
+        if not self.estop_bool:     # Estopped, the firmware has zeroed the setpoint already
+            self.send_temp(0)       # Skips the queue, the sequence has to stop now. Also stops a profile on the controller
+
+        self.mode = 'OFF'
+        self.profile_mode = None    # The rest of an upload isn't sent
+        if not self.estop_bool:
+            self.status = 'CONNECTED'
+        self.log('Stopped autosequence')
+
+    def update_auto_seq(self):
+        # Tasks to run if sequence is over
+        profile = self.auto_sequence_profile
+        seq_time = self.seq_time
+        if seq_time > profile.t_end:
+            self.abort_auto_seq()
+
+        elif self.profile_mode == 'uploading' and self.clock() - self.t_upload_batch > PROFILE_ACK_TIMEOUT_S:
+            self.log('Controller did not start the uploaded profile, running it from here')
+            self.profile_mode = 'host'      # The first setpoint sent from here also stops the profile on the controller
+
+        elif self.profile_mode in ('uploading', 'device'):
+            # The controller interpolates the profile, only check that it's following it
+            target = profile.value(seq_time)
+            lagged = profile.value(seq_time - PROFILE_TRACK_LAG_S/60)
+            off_bool = (self.profile_mode == 'device' and
+                        not min(target, lagged) - PROFILE_TRACK_TOL_C <= self.setpoint <= max(target, lagged) + PROFILE_TRACK_TOL_C)
+            if off_bool and not self.off_profile_bool:
+                self.log(f'Controller setpoint {self.setpoint:.2f}C is off the profile ({target:.2f}C)')
+            self.off_profile_bool = off_bool
+
+        if self.mode == 'AUTO' and self.profile_mode == 'host':
+            segment = profile.segment(seq_time)
+            if segment != self.seq_segment:
+                self.seq_segment = segment
+                self.log(f'Sequence segment {segment + 1}/{profile.n_segments}: {profile.kinds[segment]} to '
+                         f'{profile.temps[segment + 1]:.2f}C, next breakpoint in {profile.time_to_next_breakpoint(seq_time):.1f} min')
+
+            # If the last temp wasn't the same as the current temp, send a new setpoint. The command channel drops it if
+            # it's within the quantum of the last one sent, and otherwise merges it into the next command
+            target_setpoint_interp = profile.value(seq_time)
+            if target_setpoint_interp != self.setpoint:
+                try:
+                    self.set_setpoint(target_setpoint_interp)
+                except SetpointRejected as e:
+                    self.log(str(e))
+
+    def close_run_log(self):
+        if self.run_log is not None:
+            self.run_log.close()
+            self.log(f'Closed run log: {", ".join(self.run_log.fnames)}')
+            if self.cure_metrics.n_samples:
+                fname = f'{self.run_log.dirname}/{self.run_log.prefix}-cure.json'
+                self.cure_metrics.save(fname)
+                self.log(f'Cure metrics: {self.cure_metrics.status_str()}, saved to {fname}')
+            if self.on_run_closed is not None:
+                self.on_run_closed(self, self.run_log.fnames)
+            self.run_log = None
+
+    def save_data_to_csv(self):
+        """
+        Fields that are saved:
+        Time
+        temp
+        setpoint
+        mode
+        status
+        estop bool
+
+        """
+
+        if len(self.history):
+            fname = f'{self.app_dirname}/{self.data_dirname}/{datetime.now().strftime("%Y%m%d-%H%M%S")}.csv'
+            self.history.save_csv(fname)
+            self.log(f'Wrote data to file: {fname}')
+            return fname
@@ -0,0 +1,368 @@
+"""
+Simulates the oven controller and fan boards on Linux pseudo-terminals, so the GUI can run without hardware. Ex:
+
+    python oven_sim.py --rate 10 --nan-rate 0.001
+    python oven_gui_main.py    (then pick the printed /dev/pts/N ports)
+
+The controller pty speaks the protocol of src/ez-bake.cpp: one serialPrintSummary line per loop with the TC
+temperatures, heater state, setpoint and unsafe code, and <setpoint> commands parsed like parsefloat.cpp, so anything
+over 1000 is an estop. The <P>, <B minutes temp> and <R> profile commands are answered with '#' lines, and a running
+profile sets the setpoint every loop. With --binary the controller sends TELEMETRY_BINARY frames instead of lines. Each fan pty
+prints the RPM like fan_read_rpm.cpp, only when it changes. --rate runs the loops that many times faster than the
+hardware, and the oven model advances one real loop per line either way.
+"""
+
+import argparse
+import os
+import re
+import select
+import time
+import tty
+import numpy as np
+
+from telemetry_frames import encode_frame
+
+# From include/constants.h
+DEBOUNCE_LOOPS = 2
+MIN_LEGAL_TEMP_C = -20
+MAX_LEGAL_TEMP_C = 150
+DEVICE_DISCONNECTED_C = -127
+NUM_CHARS = 32          # Receive buffer of parsefloat.cpp
+SERIAL_RX_BYTES = 64    # Hardware serial receive buffer, bytes past it are dropped while the loop blocks
+MAX_PROFILE_POINTS = 32
+
+SAFE, ESTOP, FAULT = 0, 1, 2
+
+LOOP_PERIOD = 0.75      # requestTemperatures() blocks for the 750 ms conversion of a 12 bit DS18B20
+FAN_PERIOD = 0.1        # One 100 ms tach window per loop of fan_read_rpm.cpp
+
+ATOF_RE = re.compile(rb'\s*[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?')
+
+
+def atof(chars):
+    """
+    C atof(): the longest float prefix, 0 if there is none
+    """
+
+    match = ATOF_RE.match(chars)
+    return float(match.group()) if match else 0.0
+
+
+def print_float(x):
+    # Serial.print(float) prints 2 decimals
+    return 'nan' if np.isnan(x) else f'{x:.2f}'
+
+
+class OvenPlant:
+    """
+    Lumped thermal model: the air heats toward max_temp while the heater is on and cools toward ambient while it's
+    off, with time constant tau. Each TC lags the air by its own time constant and sits at its own offset, which is
+    what gives the spread between TCs.
+
+    """
+
+    def __init__(self, n_tc=6, ambient=20.0, max_temp=220.0, tau=900.0, tc_lag=30.0, tc_spread=2.0, noise=0.05,
+                 nan_rate=0.0, disconnect_rate=0.0, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.ambient = ambient
+        self.max_temp = max_temp
+        self.tau = tau
+        self.noise = noise
+        self.nan_rate = nan_rate
+        self.disconnect_rate = disconnect_rate
+
+        self.air = ambient
+        self.tc_lag = tc_lag*self.rng.uniform(0.7, 1.3, n_tc)
+        self.tc_offset = tc_spread*self.rng.uniform(-1, 1, n_tc)
+        self.tc = np.full(n_tc, ambient)
+
+    def step(self, dt, heater):
+        target = self.max_temp if heater else self.ambient
+        self.air += (target - self.air)*(1 - np.exp(-dt/self.tau))
+        self.tc += (self.air + self.tc_offset*(self.air - self.ambient)/(self.max_temp - self.ambient) - self.tc)*(1 - np.exp(-dt/self.tc_lag))
+
+    def read(self):
+        """
+        DS18B20 readings: noisy, quantised to 1/16 C, and with the injected nans and disconnects
+        """
+
+        readings = np.round((self.tc + self.noise*self.rng.standard_normal(len(self.tc)))*16)/16
+        readings[self.rng.random(len(readings)) < self.nan_rate] = np.nan
+        readings[self.rng.random(len(readings)) < self.disconnect_rate] = DEVICE_DISCONNECTED_C
+        return readings
+
+
+class ControllerFirmware:
+    """
+    The loop() of src/ez-bake.cpp, with checkForNewString()/processInput() from src/parsefloat.cpp
+    """
+
+    def __init__(self, binary_bool=False, loop_period=LOOP_PERIOD):
+        self.binary_bool = binary_bool
+        self.loop_period = loop_period      # Real seconds per loop, shorter than the hardware's with --rate
+        self.seq = 0
+        self.t_ms = 0       # millis()
+        self.setpoint = 0.0
+        self.is_unsafe = SAFE
+        self.last_heater = False
+        self.loops_since_change = DEBOUNCE_LOOPS
+
+        self.rx = bytearray()           # Bytes waiting in the serial receive buffer
+        self.recv_in_progress = False
+        self.received_chars = bytearray()
+        self.new_data = False
+
+        self.profile_times = []
+        self.profile_temps = []
+        self.profile_segment = 0
+        self.profile_running = False
+        self.profile_start_ms = 0
+
+    def receive(self, data):
+        self.rx += data[:max(0, SERIAL_RX_BYTES - len(self.rx))]
+
+    def check_for_new_string(self):
+        # Stops reading once a command is complete, the rest waits in the buffer for the next loop
+        while self.rx and not self.new_data:
+            rc = self.rx.pop(0)
+            if self.recv_in_progress:
+                if rc != ord('>'):
+                    if len(self.received_chars) < NUM_CHARS - 1:     # Past that the firmware overwrites the slot that the terminator goes in
+                        self.received_chars.append(rc)
+                else:
+                    self.recv_in_progress = False
+                    self.new_data = True
+            elif rc == ord('<'):
+                self.recv_in_progress = True
+                self.received_chars = bytearray()
+
+    def process_input(self):
+        if self.new_data:
+            self.new_data = False
+            return atof(bytes(self.received_chars))
+        return -1
+
+    def handle_profile_command(self, command):
+        """
+        handleProfileCommand(), returns the reply
+        """
+
+        if command[:1] == b'P':
+            self.profile_times, self.profile_temps = [], []
+            self.profile_running = False
+            return 'P'
+
+        if command[:1] == b'B':
+            match = ATOF_RE.match(command, 1)   # strtod() twice
+            time_min = float(match.group()) if match else 0.0
+            temp = atof(command[match.end() if match else 1:])
+            if (len(self.profile_times) >= MAX_PROFILE_POINTS or temp < 0 or temp >= MAX_LEGAL_TEMP_C or
+                    (self.profile_times and time_min < self.profile_times[-1])):
+                return 'E bad breakpoint'
+            self.profile_times.append(time_min)
+            self.profile_temps.append(temp)
+            return f'B {len(self.profile_times)}'
+
+        if command[:1] == b'R':
+            if len(self.profile_times) < 2 or self.is_unsafe:
+                return 'E cannot run profile'
+            self.profile_running = True
+            self.profile_segment = 0
+            self.profile_start_ms = self.t_ms
+            return f'R {len(self.profile_times)}'
+
+        return 'E unknown command'
+
+    def profile_setpoint(self, elapsed_min):
+        """
+        getProfileSetpoint()
+        """
+
+        times, temps = self.profile_times, self.profile_temps
+        while self.profile_segment < len(times) - 2 and elapsed_min >= times[self.profile_segment + 1]:
+            self.profile_segment += 1
+        i = self.profile_segment
+        if times[i+1] <= times[i]:
+            return temps[i+1]
+        fraction = min(max((elapsed_min - times[i])/(times[i+1] - times[i]), 0), 1)
+        return temps[i] + fraction*(temps[i+1] - temps[i])
+
+    def loop(self, readings):
+        """
+        Runs one loop on the given readings and returns what it prints: the '#' replies to the commands, then the
+        summary line (or frame)
+        """
+
+        replies = []
+        self.check_for_new_string()
+        while self.new_data:
+            if self.received_chars[:1].isalpha():
+                replies.append(self.handle_profile_command(bytes(self.received_chars)))
+                self.new_data = False
+            else:
+                tmp = self.process_input()
+                if tmp >= 0:
+                    self.profile_running = False
+                    if tmp < MAX_LEGAL_TEMP_C and not self.is_unsafe:
+                        self.setpoint = tmp
+                    if tmp > 1000:
+                        self.is_unsafe = ESTOP
+                        self.setpoint = 0.0
+            self.check_for_new_string()
+
+        if self.profile_running:
+            elapsed_min = (self.t_ms - self.profile_start_ms)/60000
+            if self.is_unsafe:
+                self.profile_running = False
+            elif elapsed_min > self.profile_times[-1]:
+                self.profile_running = False
+                self.setpoint = 0.0
+                replies.append('D')
+            else:
+                self.setpoint = self.profile_setpoint(elapsed_min)
+
+        # nan compares false, so like the firmware it doesn't count as an invalid reading
+        if np.any((readings == DEVICE_DISCONNECTED_C) | (readings < MIN_LEGAL_TEMP_C) | (readings > MAX_LEGAL_TEMP_C)):
+            self.is_unsafe = FAULT
+            self.setpoint = 0.0
+
+        if not self.is_unsafe:
+            heater = bool(np.nanmean(readings) < self.setpoint)
+            self.loops_since_change = min(self.loops_since_change + 1, DEBOUNCE_LOOPS)
+            if heater == self.last_heater or self.loops_since_change < DEBOUNCE_LOOPS:
+                heater = self.last_heater
+        else:
+            heater = False
+
+        self.t_ms += int(self.loop_period*1000)
+        replies = ''.join(f'# {reply}\r\n' for reply in replies)
+        if self.binary_bool:
+            line = bytes(replies, 'ascii') + encode_frame(self.seq, self.t_ms, readings, heater, self.setpoint, self.is_unsafe)
+            self.seq += 1
+        else:
+            line = replies + ''.join(f'{print_float(t)} ' for t in readings) + f'{int(heater)} {print_float(self.setpoint)} {self.is_unsafe}\r\n'
+
+        if heater != self.last_heater and not self.is_unsafe:
+            self.loops_since_change = 0
+            self.last_heater = heater
+        return line, self.last_heater and not self.is_unsafe     # The output pin is pulled low while unsafe
+
+
+class FanFirmware:
+    """
+    fan_read_rpm.cpp: the RPM rounded down to 10, printed only when it changes
+    """
+
+    def __init__(self, rpm=1800, jitter=15.0, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.nominal = rpm
+        self.jitter = jitter
+        self.rpm = 0
+        self.last_rpm = self.rpm
+
+    def loop(self):
+        tmp_rpm = int(self.nominal + self.jitter*self.rng.standard_normal())
+        tmp_rpm -= tmp_rpm % 10
+        if 10 < tmp_rpm < 3150:
+            self.rpm = tmp_rpm
+
+        line = f'{self.rpm}\r\n' if self.rpm != self.last_rpm else None
+        self.last_rpm = self.rpm
+        return line
+
+
+class Pty:
+    def __init__(self):
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)      # No echo or newline translation, like a real serial port
+        os.set_blocking(self.master, False)
+        self.name = os.ttyname(self.slave)     # The slave stays open so the master never sees EIO between clients
+        self.n_dropped = 0
+
+    def write(self, line):
+        try:
+            os.write(self.master, line if isinstance(line, bytes) else line.encode('ascii'))
+        except BlockingIOError:     # Nobody is reading, the line is lost like it would be on the wire
+            self.n_dropped += 1
+
+    def read(self):
+        try:
+            return os.read(self.master, 1024)
+        except (BlockingIOError, OSError):
+            return b''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Oven controller and fan simulator on pseudo-terminals')
+    parser.add_argument('--n-tc', type=int, default=6, help='Number of TCs')
+    parser.add_argument('--n-fans', type=int, default=2, help='Number of fan boards, each gets its own pty')
+    parser.add_argument('--rate', type=float, default=1.0, help='Loop rate multiplier over the real hardware')
+    parser.add_argument('--ambient', type=float, default=20.0, help='Ambient temperature [degC]')
+    parser.add_argument('--max-temp', type=float, default=220.0, help='Air temperature that full power settles at [degC]')
+    parser.add_argument('--tau', type=float, default=900.0, help='Time constant of the oven air [s]')
+    parser.add_argument('--tc-lag', type=float, default=30.0, help='Mean time constant of the TCs [s]')
+    parser.add_argument('--tc-spread', type=float, default=2.0, help='Max offset of a TC from the air at max temp [degC]')
+    parser.add_argument('--noise', type=float, default=0.05, help='Std of the sensor noise [degC]')
+    parser.add_argument('--nan-rate', type=float, default=0.0, help='Probability that a reading is nan')
+    parser.add_argument('--disconnect-rate', type=float, default=0.0, help='Probability that a reading is -127 (faults the controller)')
+    parser.add_argument('--fan-rpm', type=float, default=1800, help='Nominal fan RPM')
+    parser.add_argument('--seed', type=int, help='Random seed')
+    parser.add_argument('--binary', action='store_true', help='Send binary telemetry frames instead of lines')
+    args = parser.parse_args()
+
+    plant = OvenPlant(args.n_tc, args.ambient, args.max_temp, args.tau, args.tc_lag, args.tc_spread, args.noise,
+                      args.nan_rate, args.disconnect_rate, args.seed)
+    firmware = ControllerFirmware(args.binary, LOOP_PERIOD/args.rate)
+    fans = [FanFirmware(args.fan_rpm, seed=None if args.seed is None else args.seed + i + 1) for i in range(args.n_fans)]
+
+    controller_pty = Pty()
+    fan_ptys = [Pty() for _ in fans]
+    print(f'Controller: {controller_pty.name}', flush=True)
+    for i, fan_pty in enumerate(fan_ptys):
+        print(f'Fan {i+1}: {fan_pty.name}', flush=True)
+
+    loop_period = LOOP_PERIOD/args.rate
+    fan_period = FAN_PERIOD/args.rate
+    t_next_loop = t_next_fan = t_report = time.monotonic()
+    heater = False
+    n_lines = 0
+
+    try:
+        while True:
+            now = time.monotonic()
+            timeout = max(0.0, min(t_next_loop, t_next_fan) - now)
+            readable, _, _ = select.select([controller_pty.master], [], [], timeout)
+
+            if readable:
+                data = controller_pty.read()
+                firmware.receive(data)
+                if b'>' in data:
+                    print(f'Received: {data!r}', flush=True)
+
+            now = time.monotonic()
+            while now >= t_next_loop:
+                plant.step(LOOP_PERIOD, heater)
+                line, heater = firmware.loop(plant.read())
+                controller_pty.write(line)
+                n_lines += 1
+                t_next_loop += loop_period
+
+            while now >= t_next_fan:
+                for fan, fan_pty in zip(fans, fan_ptys):
+                    line = fan.loop()
+                    if line is not None:
+                        fan_pty.write(line)
+                t_next_fan += fan_period
+
+            if now - t_report >= 10:
+                print(f'{n_lines/(now - t_report):.1f} lines/s, air {plant.air:.1f} C, setpoint {firmware.setpoint:.2f} C, '
+                      f'unsafe {firmware.is_unsafe}, {controller_pty.n_dropped} dropped', flush=True)
+                n_lines = 0
+                t_report = now
+
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
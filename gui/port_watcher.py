@@ -0,0 +1,136 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+from collections import deque
+import serial.tools.list_ports
+
+# From <sys/inotify.h>
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_ATTRIB = 0x4     # udev fixing the permissions of a new node
+EVENT_HEADER = struct.Struct('iIII')    # wd, mask, cookie, len, then len bytes of name
+
+SERIAL_PREFIXES = (b'tty', b'rfcomm', b'cu.')
+
+
+def list_devices():
+    return sorted(port.device for port in serial.tools.list_ports.comports())
+
+
+def open_inotify(dirname='/dev'):
+    """
+    An inotify fd watching dirname for nodes coming and going, or None where inotify isn't available
+    """
+
+    if not os.path.isdir(dirname):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):     # Not Linux
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, dirname.encode(), IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_ATTRIB) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class PortWatcher:
+    """
+    Keeps the list of serial ports up to date on a background thread, so the UI never enumerates them itself
+
+    On Linux the thread sleeps on inotify events for /dev and only enumerates once a serial node has come or gone and
+    /dev has been quiet for debounce seconds, so the burst of events from one plug-in (node, permissions, symlinks)
+    is one enumeration. Elsewhere it enumerates every poll_interval seconds. Only changes are published, as
+    (added, removed) on a deque that the UI drains, the same bridge as SerialIngest.
+
+    """
+
+    def __init__(self, poll_interval=2.0, debounce=0.5, dirname='/dev'):
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.devices = list_devices()   # The first enumeration is synchronous, so the menus start out complete
+        self.events = deque()
+        self.n_scans = 1
+
+        self._inotify_fd = open_inotify(dirname)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='port-watcher', daemon=True)
+        self._thread.start()
+
+    @property
+    def event_driven_bool(self):
+        return self._inotify_fd is not None
+
+    def _read_events(self):
+        """
+        Reads the pending inotify events and returns True if any of them is a serial device
+        """
+
+        serial_bool = False
+        while True:
+            try:
+                data = os.read(self._inotify_fd, 4096)
+            except BlockingIOError:
+                return serial_bool
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if name.startswith(SERIAL_PREFIXES):
+                    serial_bool = True
+
+    def _wait(self):
+        """
+        Blocks until the ports may have changed. Returns False when stopped
+        """
+
+        if self._inotify_fd is None:
+            return not self._stop.wait(self.poll_interval)
+
+        while not self._stop.is_set():
+            readable, _, _ = select.select([self._inotify_fd], [], [], 0.5)    # Wakes up now and then to check for stop
+            if readable and self._read_events():
+                # Debounce: wait until /dev has been quiet for a while
+                while select.select([self._inotify_fd], [], [], self.debounce)[0]:
+                    self._read_events()
+                return True
+        return False
+
+    def _scan(self):
+        devices = list_devices()
+        self.n_scans += 1
+        if devices != self.devices:
+            added = sorted(set(devices) - set(self.devices))
+            removed = sorted(set(self.devices) - set(devices))
+            self.devices = devices
+            self.events.append((added, removed))
+
+    def _run(self):
+        while self._wait():
+            try:
+                self._scan()
+            except Exception:   # An enumeration can fail while a device is half plugged in, the next one catches up
+                pass
+
+    def drain(self):
+        changes = []
+        while self.events:
+            changes.append(self.events.popleft())
+        return changes
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        if self._inotify_fd is not None:
+            os.close(self._inotify_fd)
+            self._inotify_fd = None
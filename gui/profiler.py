@@ -0,0 +1,141 @@
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Stages of a sample, in the order it goes through them
+STAGES = ('serial read', 'decode', 'parse', 'history append', 'run log', 'Tk var updates', 'plot render', 'minimap render')
+
+BINS_PER_DECADE = 10
+MIN_EXP = -7    # 100 ns
+MAX_EXP = 1     # 10 s
+N_BINS = (MAX_EXP - MIN_EXP)*BINS_PER_DECADE + 2    # Plus an underflow and an overflow bin
+
+
+class StageHistogram:
+    """
+    Log-spaced histogram of the durations of one stage. Recording is O(1) and the memory is fixed, so it can stay on
+    for a whole cure
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.counts = [0]*N_BINS
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, dt):
+        if dt > 0:
+            b = int((math.log10(dt) - MIN_EXP)*BINS_PER_DECADE) + 1
+            b = min(max(b, 0), N_BINS - 1)
+        else:
+            b = 0
+        self.counts[b] += 1
+        self.n += 1
+        self.total += dt
+        if dt > self.max:
+            self.max = dt
+
+    @staticmethod
+    def bin_upper(b):
+        return 10**(MIN_EXP + b/BINS_PER_DECADE)
+
+    def percentile(self, p):
+        """
+        Upper edge of the bin holding the p-th percentile, so it is accurate to a bin width (~26%)
+        """
+
+        if not self.n:
+            return 0.0
+        target = p/100*self.n
+        cumulative = 0
+        for b, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return min(self.bin_upper(b), self.max)
+        return self.max
+
+    def summary(self):
+        return {'count': self.n,
+                'mean_ms': 1000*self.total/self.n if self.n else 0.0,
+                'p50_ms': 1000*self.percentile(50),
+                'p95_ms': 1000*self.percentile(95),
+                'p99_ms': 1000*self.percentile(99),
+                'max_ms': 1000*self.max,
+                'total_s': self.total}
+
+
+class StageProfiler:
+    """
+    Timing histograms for each stage of the hot path, from the serial read down to the plot render
+
+    The serial stages are recorded on the serial loop thread and the rest on the UI thread. Each stage is only ever
+    recorded from one thread, so the histograms don't need a lock. Nothing is timed or recorded unless enabled, the
+    GUI turns it on with --profile.
+
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.histograms = {stage: StageHistogram() for stage in STAGES}
+        self.t_start = time.time()
+        self._lock = threading.Lock()   # Only guards adding a new stage
+
+    def record(self, stage, dt):
+        if not self.enabled:
+            return
+        if stage not in self.histograms:
+            with self._lock:
+                self.histograms.setdefault(stage, StageHistogram())
+        self.histograms[stage].record(dt)
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        t_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t_start)
+
+    def clear(self):
+        for histogram in self.histograms.values():
+            histogram.clear()
+        self.t_start = time.time()
+
+    def summary(self):
+        return {stage: histogram.summary() for stage, histogram in self.histograms.items()}
+
+    def format(self):
+        """
+        Fixed-width table of the stages, for the overlay in the GUI
+        """
+
+        lines = [f'{"Stage":<16}{"Count":>8}{"Mean":>9}{"p50":>9}{"p95":>9}{"p99":>9}{"Max":>9}   [ms]']
+        for stage, s in self.summary().items():
+            lines.append(f'{stage:<16}{s["count"]:>8}{s["mean_ms"]:>9.3f}{s["p50_ms"]:>9.3f}{s["p95_ms"]:>9.3f}'
+                         f'{s["p99_ms"]:>9.3f}{s["max_ms"]:>9.3f}')
+        return '\n'.join(lines)
+
+    def dump(self, fname):
+        """
+        Writes the summary and the raw histograms to a JSON file
+        """
+
+        output = {'start': self.t_start,
+                  'end': time.time(),
+                  'bins_upper_s': [StageHistogram.bin_upper(b) for b in range(N_BINS)],
+                  'stages': {stage: dict(histogram.summary(), counts=histogram.counts) for stage, histogram in self.histograms.items()}}
+        with open(fname, 'w') as f:
+            json.dump(output, f, indent=2)
+        return fname
+
+
+# Shared by the serial loop, the sessions and the GUI
+profiler = StageProfiler()
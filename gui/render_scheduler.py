@@ -0,0 +1,66 @@
+class RenderChannel:
+    def __init__(self, callback, fps):
+        self.callback = callback
+        self.interval_ms = max(int(1000/fps), 1)
+        self.dirty_bool = False
+
+
+class RenderScheduler:
+    """
+    Redraws each part of the window at its own fixed rate, however fast the samples come in
+
+    Ingest only marks a channel as dirty with request(). Every frame of a channel, its callback runs once if
+    anything was requested since the last frame, so any number of samples in between are merged into one redraw.
+
+    """
+
+    def __init__(self, widget):
+        self.widget = widget    # Any Tk widget, for after()
+        self.channels = {}
+
+    def add(self, name, callback, fps):
+        self.channels[name] = RenderChannel(callback, fps)
+        self.widget.after(self.channels[name].interval_ms, self._tick, name)
+
+    def set_rate(self, name, fps):
+        self.channels[name].interval_ms = max(int(1000/fps), 1)
+
+    def request(self, name):
+        self.channels[name].dirty_bool = True
+
+    def _tick(self, name):
+        channel = self.channels[name]
+        self.widget.after(channel.interval_ms, self._tick, name)     # Scheduled first so the frame rate doesn't drift with the render time
+        if channel.dirty_bool:
+            channel.dirty_bool = False
+            channel.callback()
+
+
+class ChangeCache:
+    """
+    Writes Tk variables and widget options only when the value actually changes. Every write to a variable that
+    goes through the cache has to go through it, or the cache goes stale
+    """
+
+    def __init__(self):
+        self.values = {}
+
+    def set(self, var, value):
+        key = str(var)      # The Tcl name of the variable
+        if self.values.get(key) != value:
+            self.values[key] = value
+            var.set(value)
+
+    def config(self, widget, **options):
+        for option, value in options.items():
+            key = (str(widget), option)
+            if self.values.get(key) != value:
+                self.values[key] = value
+                widget.config(**{option: value})
+
+    def itemconfig(self, canvas, item, **options):
+        for option, value in options.items():
+            key = (str(canvas), item, option)
+            if self.values.get(key) != value:
+                self.values[key] = value
+                canvas.itemconfig(item, **{option: value})
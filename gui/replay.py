@@ -0,0 +1,166 @@
+"""
+Replays a recorded run through the controller pipeline, without hardware. Ex:
+
+    python replay.py runs/20240101-120000/20240101-120000-seg000.csv --speed max
+    python replay.py run.csv --speed 100 --profile cure_cycle_130C.csv
+
+Any CSV in the save_data_to_csv layout works, and the segments of a run log can be given together. The recorded
+samples are fed to the session as telemetry lines at the recorded pace times --speed, or as fast as possible with
+--speed max. The session runs on the replay clock, so the rel times, mode timers and auto sequence follow the
+recording. When the replay ends the throughput is logged, which makes this a benchmark of the ingest pipeline.
+For the GUI pipeline, start oven_gui_main.py with --replay instead.
+"""
+
+import argparse
+import logging
+import tempfile
+import time
+import numpy as np
+
+from runfile import load_csv
+from oven_core import OvenCore
+
+logger = logging.getLogger('ezbake')
+
+
+def parse_speed(speed_str):
+    """
+    Playback speed from the command line, None for as fast as possible
+    """
+
+    return None if speed_str == 'max' else float(speed_str.rstrip('x'))
+
+
+class ReplayClock:
+    """
+    Stands in for time.time(), and is moved forward by the replay
+    """
+
+    def __init__(self, t):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+class ReplayIngest:
+    """
+    Drop-in for SerialIngest that produces the telemetry lines of a recorded run
+
+    The first controller device that is opened receives the recording. Lines come out of drain() like they would from
+    the serial loop, formatted like serialPrintSummary does, so everything downstream of the serial loop runs unchanged.
+    Setpoints written by the session are kept in writes instead of going anywhere.
+
+    """
+
+    def __init__(self, fnames, speed=1.0):
+        self.store = load_csv(fnames)
+        self.speed = speed      # None replays as fast as the client drains
+
+        # The CSV only keeps the wall clock time to the second, the rel time column has the full resolution
+        t_base = self.store.epoch[0] - 60*self.store.rel_time[0]
+        self.t_rec = t_base + 60*self.store.rel_time
+        self.clock = ReplayClock(t_base)
+
+        self.ports = {}
+        self.writes = []        # (replay time, device, bytes)
+        self.dropped = {}       # Nothing is dropped, the recording waits for the client
+        self.bad_frames = {}    # and there are no binary frames to corrupt
+        self.i = 0
+        self._device = None
+        self._wall_start = None
+        self.reported_bool = False
+
+    def __len__(self):
+        return len(self.store)
+
+    @property
+    def finished(self):
+        return self.i >= len(self)
+
+    def open(self, name, port, baudrate=9600):
+        self.ports[name] = port
+        if self._device is None and name.endswith('/controller'):
+            self._device = name
+            self._wall_start = time.perf_counter()
+
+    def close(self, name):
+        self.ports.pop(name, None)
+        if name == self._device:
+            self._device = None
+
+    def close_all(self):
+        self.ports.clear()
+        self._device = None
+
+    def write(self, name, data):
+        self.writes.append((self.clock(), name, data))
+
+    def format_line(self, i):
+        s = self.store
+        temps = ' '.join(f'{t:.2f}' for t in s.temp[i])
+        return f'{temps} {s.heater[i]} {s.setpoint[i]:.2f} {s.estop[i]}'
+
+    def drain(self, max_items=None):
+        if self._device is None or self.finished:
+            return []
+
+        stop = len(self) if max_items is None else min(len(self), self.i + max_items)
+        if self.speed is not None:
+            t_now = self.t_rec[0] + (time.perf_counter() - self._wall_start)*self.speed
+            stop = min(stop, int(np.searchsorted(self.t_rec, t_now, side='right')))
+
+        events = [(self._device, self.t_rec[i], self.format_line(i)) for i in range(self.i, stop)]
+        if events:
+            self.clock.t = self.t_rec[stop-1]
+        self.i = stop
+        return events
+
+    def report(self):
+        """
+        Logs the replay throughput once it has finished. Call it after the client has processed the last batch, the
+        time until then is part of the replay
+        """
+
+        if not self.finished or self.reported_bool:
+            return
+        self.reported_bool = True
+        t_wall = time.perf_counter() - self._wall_start
+        t_run = self.t_rec[-1] - self.t_rec[0]
+        logger.info(f'Replay finished: {len(self)} samples in {t_wall:.2f} s, {len(self)/t_wall:.0f} samples/s, '
+                    f'{t_run/t_wall:.0f}x real time, {len(self.writes)} commands sent')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a recorded run through the controller pipeline')
+    parser.add_argument('csv', nargs='+', help='Run CSV, or every segment of a run log in order')
+    parser.add_argument('--speed', default='max', help="Playback speed, ex. 1, 100 or 'max'")
+    parser.add_argument('--profile', help='Auto sequence CSV to run against the recording')
+    parser.add_argument('--poll', type=float, default=0.02, help='Seconds between polls when the speed is limited')
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(message)s', datefmt='%Y/%m/%d %H:%M:%S', level=logging.INFO)
+
+    ingest = ReplayIngest(args.csv, parse_speed(args.speed))
+    with tempfile.TemporaryDirectory() as app_dirname:     # Keeps replays out of the runs directory and the catalog
+        core = OvenCore(app_dirname, serial_ingest=ingest, clock=ingest.clock)
+        session = core.add_session()
+        session.connect('replay')
+        if args.profile:
+            session.load_auto_seq(args.profile)
+            session.start_auto_seq()
+
+        try:
+            while not ingest.finished:
+                core.poll()
+                if ingest.speed is not None:
+                    time.sleep(args.poll)
+            ingest.report()
+        except KeyboardInterrupt:
+            logger.info('Interrupted')
+        finally:
+            core.shutdown()
+
+
+if __name__ == "__main__":
+    main()
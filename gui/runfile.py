@@ -0,0 +1,229 @@
+import bisect
+import json
+import struct
+import sys
+from datetime import datetime
+import numpy as np
+
+from telemetry import MODES, STATUSES, TelemetryStore, encode_mode
+
+MAGIC = b'EZBAKERUN\n'
+VERSION = 1
+TEMP_SCALE = 100        # Temperatures are stored as int16 hundredths of a degree, the resolution the firmware prints at
+SETPOINT_SCALE = 100    # Setpoints get int32 so the 9000C estop setpoint fits
+NAN_CODE = np.iinfo(np.int16).min
+
+
+def record_dtype(n_tc):
+    """
+    Fixed-size record for one sample, little-endian and unpadded so the file can be memory-mapped on any machine
+    """
+
+    return np.dtype([('epoch', '<f8'),         # Wall clock time, seconds since the unix epoch
+                     ('rel_time', '<f8'),      # Minutes since the timebase
+                     ('temp', '<i2', (n_tc,)),
+                     ('setpoint', '<i4'),
+                     ('fan1', '<i4'),
+                     ('fan2', '<i4'),
+                     ('estop', 'u1'),
+                     ('heater', 'u1'),
+                     ('mode', 'u1'),
+                     ('status', 'u1')])
+
+
+def quantize_temp(temp):
+    q = np.round(np.asarray(temp, dtype=np.float64)*TEMP_SCALE)
+    nan_mask = np.isnan(q)
+    q = np.clip(np.where(nan_mask, 0, q), NAN_CODE+1, np.iinfo(np.int16).max)    # NAN_CODE itself is reserved
+    q[nan_mask] = NAN_CODE
+    return q.astype(np.int16)
+
+
+def write_header(f, n_tc):
+    dtype = record_dtype(n_tc)
+    header = {'version': VERSION,
+              'n_tc': n_tc,
+              'temp_scale': TEMP_SCALE,
+              'setpoint_scale': SETPOINT_SCALE,
+              'nan_code': int(NAN_CODE),
+              'columns': [[name, dtype[name].base.str, list(dtype[name].shape)] for name in dtype.names],
+              'modes': MODES,
+              'statuses': STATUSES}
+    header = json.dumps(header).encode('ascii')
+
+    # Pad the header so the records start on a 64 byte boundary
+    n_pad = -(len(MAGIC) + 4 + len(header)) % 64
+    header += b' '*n_pad
+
+    f.write(MAGIC)
+    f.write(struct.pack('<I', len(header)))
+    f.write(header)
+
+
+def encode_store(store, start=0, stop=None):
+    """
+    Packs rows [start:stop] of a TelemetryStore into records
+    """
+
+    sl = slice(start, stop)
+    records = np.empty(len(store.epoch[sl]), dtype=record_dtype(store.n_tc))
+    records['epoch'] = store.epoch[sl]
+    records['rel_time'] = store.rel_time[sl]
+    records['temp'] = quantize_temp(store.temp[sl])
+    records['setpoint'] = np.round(store.setpoint[sl].astype(np.float64)*SETPOINT_SCALE)
+    records['fan1'] = store.fan1[sl]
+    records['fan2'] = store.fan2[sl]
+    records['estop'] = store.estop[sl]
+    records['heater'] = store.heater[sl]
+    records['mode'] = store.mode[sl]
+    records['status'] = store.status[sl]
+    return records
+
+
+def save_run(store, fname):
+    with open(fname, 'wb') as f:
+        write_header(f, store.n_tc)
+        encode_store(store).tofile(f)
+
+
+class RunFileReader:
+    """
+    Memory-mapped reader for a binary run file
+
+    Nothing is read up front except the header. Records are paged in by the OS as they are touched, so slicing an hour
+    out of a week-long run only reads that hour. The time lookups are binary searches on the mapped file.
+
+    """
+
+    def __init__(self, fname):
+        self.fname = fname
+        with open(fname, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f'{fname} is not an ez-bake run file')
+            header_len, = struct.unpack('<I', f.read(4))
+            self.header = json.loads(f.read(header_len))
+
+        if self.header['version'] > VERSION:
+            raise ValueError(f'{fname} was written by a newer version ({self.header["version"]})')
+
+        self.n_tc = self.header['n_tc']
+        self.modes = tuple(self.header['modes'])
+        self.statuses = tuple(self.header['statuses'])
+        self.temp_scale = self.header['temp_scale']
+        self.setpoint_scale = self.header['setpoint_scale']
+        self.nan_code = self.header['nan_code']
+        self.dtype = np.dtype([(name, dt, tuple(shape)) for name, dt, shape in self.header['columns']])
+
+        offset = len(MAGIC) + 4 + header_len
+        n = (self._file_size() - offset)//self.dtype.itemsize    # A torn record at the end from a crash is ignored
+        self.records = np.memmap(fname, dtype=self.dtype, mode='r', offset=offset, shape=(n,)) if n else np.empty(0, dtype=self.dtype)
+
+    def _file_size(self):
+        with open(self.fname, 'rb') as f:
+            f.seek(0, 2)
+            return f.tell()
+
+    def __len__(self):
+        return len(self.records)
+
+    def index(self, t, by='rel_time'):
+        """
+        First record at or after t, by 'rel_time' (minutes) or 'epoch' (seconds)
+        """
+
+        return bisect.bisect_left(self.records[by], t)
+
+    def time_range(self, t_start=None, t_end=None, by='rel_time'):
+        """
+        Records with t_start <= t < t_end, as a view into the mapped file
+        """
+
+        start = 0 if t_start is None else self.index(t_start, by)
+        stop = len(self) if t_end is None else self.index(t_end, by)
+        return self.records[start:stop]
+
+    def temp(self, records):
+        temp = records['temp'].astype(np.float32)/np.float32(self.temp_scale)
+        temp[records['temp'] == self.nan_code] = np.nan
+        return temp
+
+    def setpoint(self, records):
+        return records['setpoint'].astype(np.float32)/np.float32(self.setpoint_scale)
+
+    def to_store(self, records=None):
+        """
+        Decodes records (default all of them) into a TelemetryStore
+        """
+
+        if records is None:
+            records = self.records
+
+        store = TelemetryStore(n_tc=self.n_tc, chunk_size=max(len(records), 1))
+        store._grow()
+        n = len(records)
+        store._epoch[:n] = records['epoch']
+        store._rel_time[:n] = records['rel_time']
+        store._temp[:n] = self.temp(records)
+        store._setpoint[:n] = self.setpoint(records)
+        store._estop[:n] = records['estop']
+        store._heater[:n] = records['heater']
+        store._fan1[:n] = records['fan1']
+        store._fan2[:n] = records['fan2']
+        store._mode[:n] = [MODES.index(self.modes[m]) for m in records['mode']] if self.modes != MODES else records['mode']
+        store._status[:n] = [STATUSES.index(self.statuses[s]) for s in records['status']] if self.statuses != STATUSES else records['status']
+        store.n = n
+        return store
+
+
+def load_csv(fnames):
+    """
+    Reads one or more CSVs in the save_data_to_csv layout (ex. the segments of a run log) into a TelemetryStore. Older
+    versions of the GUI saved only the first word of the mode, ex. 'NOT' for 'NOT SET', so modes go through encode_mode()
+    like the displayed ones, and anything it doesn't know is NOT SET
+
+    """
+
+    if isinstance(fnames, str):
+        fnames = [fnames]
+
+    store = None
+    for fname in fnames:
+        with open(fname) as f:
+            header = f.readline().strip()
+            n_tc = sum(col.strip().startswith('TC') for col in header.split(','))
+            if store is None:
+                store = TelemetryStore(n_tc=n_tc)
+            elif n_tc != store.n_tc:
+                raise ValueError(f'{fname} has {n_tc} TCs, expected {store.n_tc}')
+
+            for line in f:
+                cols = line.rstrip('\r\n').split(',')
+                if len(cols) != n_tc + 10:      # The real time takes up two columns
+                    continue
+                epoch = datetime.strptime(f'{cols[0]},{cols[1]}', "%m/%d/%Y, %H:%M:%S").timestamp()
+                store.append(epoch, float(cols[2]), [float(t) for t in cols[3:3+n_tc]], float(cols[3+n_tc]),
+                             int(cols[4+n_tc]), int(cols[5+n_tc]), int(cols[6+n_tc]), int(cols[7+n_tc]),
+                             encode_mode(cols[8+n_tc]), STATUSES.index(cols[9+n_tc]))
+
+    return store
+
+
+def csv_to_run(csv_fnames, run_fname):
+    save_run(load_csv(csv_fnames), run_fname)
+
+
+def run_to_csv(run_fname, csv_fname):
+    RunFileReader(run_fname).to_store().save_csv(csv_fname)
+
+
+if __name__ == "__main__":
+    # python runfile.py <run>-seg000.csv [<run>-seg001.csv ...] run.ezrun
+    # python runfile.py run.ezrun run.csv
+    if len(sys.argv) < 3:
+        print('Usage: runfile.py INPUT.csv [INPUT.csv ...] OUTPUT.ezrun | runfile.py INPUT.ezrun OUTPUT.csv')
+        sys.exit(1)
+
+    if sys.argv[1].endswith('.ezrun'):
+        run_to_csv(sys.argv[1], sys.argv[2])
+    else:
+        csv_to_run(sys.argv[1:-1], sys.argv[-1])
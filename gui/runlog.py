@@ -0,0 +1,83 @@
+import os
+import time
+
+
+class RunLogWriter:
+    """
+    Crash-safe, append-only CSV log of a run
+
+    Rows are buffered in memory and written out every flush_interval seconds (or every max_buffered rows), and the
+    file is fsync'ed every fsync_interval seconds, so a crash loses at most that much data. Every segment_rows rows
+    the writer rotates to a new segment file, and each segment starts with the header so it can be opened on its own.
+    Files are named <prefix>-seg000.csv, <prefix>-seg001.csv, ...
+
+    """
+
+    def __init__(self, dirname, prefix, header, flush_interval=1.0, fsync_interval=5.0, segment_rows=50000, max_buffered=256):
+        self.dirname = dirname
+        self.prefix = prefix
+        self.header = header
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.segment_rows = segment_rows
+        self.max_buffered = max_buffered
+
+        self.segment = -1
+        self.fnames = []
+        self._file = None
+        self._rows_in_segment = 0
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._last_fsync = self._last_flush
+
+        self._rotate()
+
+    def _rotate(self):
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+
+        self.segment += 1
+        fname = f'{self.dirname}/{self.prefix}-seg{self.segment:03d}.csv'
+        self.fnames.append(fname)
+        self._file = open(fname, 'a', newline='')
+        self._file.write(f'{self.header}\n')
+        self._rows_in_segment = 0
+
+    def append(self, row):
+        """
+        row is one formatted CSV line without the newline
+        """
+
+        self._buffer.append(row)
+        self._rows_in_segment += 1
+
+        if self._rows_in_segment >= self.segment_rows:
+            self.flush()
+            self._rotate()
+            return
+
+        now = time.monotonic()
+        if len(self._buffer) >= self.max_buffered or now - self._last_flush >= self.flush_interval:
+            self.flush()
+        if now - self._last_fsync >= self.fsync_interval:
+            self._sync()
+
+    def flush(self):
+        if self._buffer:
+            self._file.write('\n'.join(self._buffer) + '\n')
+            self._buffer = []
+        self._file.flush()
+        self._last_flush = time.monotonic()
+
+    def _sync(self):
+        self.flush()
+        os.fsync(self._file.fileno())
+        self._last_fsync = time.monotonic()
+
+    def close(self):
+        if self._file is None:
+            return
+        self._sync()
+        self._file.close()
+        self._file = None
@@ -0,0 +1,217 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+import serial
+
+from profiler import profiler
+from telemetry_frames import SYNC, MAX_FRAME, decode_frames
+
+
+class SerialIngest:
+    """
+    Multiplexes every serial endpoint (controller, fans, any future boards) on one asyncio event loop
+
+    The loop runs on a single background thread. Ports are opened non-blocking, and on POSIX the loop watches their
+    file descriptors directly with add_reader(). Elsewhere each port gets a coroutine that polls in_waiting every
+    few ms. Writes are handed to the loop as well, so a command never blocks the reads.
+
+    Complete lines are decoded, timestamped on arrival and put on a deque as (name, time, line), which is the
+    thread-safe bridge to the GUI. A line of None means the device was lost. deque.append() and deque.popleft() are
+    atomic, so there is no lock between the loop and the UI thread. Once maxlen events are waiting, new lines are
+    dropped instead of queued and counted per device in dropped, the client reports them. A lost device is always
+    queued, after everything that arrived before it.
+
+    A device that sends binary telemetry frames (see telemetry_frames.py) is detected by the first frame that
+    passes its CRC, and from then on its frames go on the deque as TelemetryFrame instead of a line. Frames with a bad
+    length or CRC are skipped and counted in bad_frames, which the client reports like dropped. Devices whose
+    first line arrives without any sync byte are ASCII for as long as they're open, like the older boards and fans.
+    The '#' replies to commands are lines in either protocol.
+
+    """
+
+    def __init__(self, maxlen=10000, poll_interval=0.005, max_line=256):
+        self.events = deque()
+        self.maxlen = maxlen    # Lines waiting for the UI past which new ones are dropped
+        self.dropped = {}       # Device -> lines dropped because the UI fell behind
+        self.poll_interval = poll_interval
+        self.max_line = max_line        # Longer than any real line, anything past this is garbage
+        self.ports = {}
+        self._buffers = {}
+        self._resync = {}       # Device -> drop everything up to the next newline
+        self.protocols = {}     # Device -> 'ascii', 'binary', or None until detected
+        self.bad_frames = {}    # Device -> binary frames dropped for a bad length or CRC
+        self._pollers = {}
+        self._use_fd_readers = os.name == 'posix'
+
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name='serial-ingest', daemon=True)
+        self._thread.start()
+
+    def _call(self, func, *args):
+        # Runs func on the event loop thread and waits for its result
+        async def call():
+            return func(*args)
+        return asyncio.run_coroutine_threadsafe(call(), self.loop).result()
+
+    def open(self, name, port, baudrate=9600):
+        self.close(name)
+
+        ser = serial.Serial(port, baudrate, timeout=0)    # Non-blocking reads, the loop decides when to read
+        self._call(self._register, name, ser)
+        return ser
+
+    def close(self, name):
+        if name in self.ports:
+            self._call(self._unregister, name)
+
+    def close_all(self):
+        for name in list(self.ports):
+            self.close(name)
+
+    def write(self, name, data):
+        """
+        Thread-safe. Queues the write on the event loop and returns immediately
+        """
+
+        self.loop.call_soon_threadsafe(self._write, name, data)
+
+    # Everything below runs on the event loop thread
+    def _register(self, name, ser):
+        self.ports[name] = ser
+        self._buffers[name] = bytearray()
+        self._resync[name] = False
+        self.protocols[name] = None
+        self.bad_frames.setdefault(name, 0)
+        self.dropped.setdefault(name, 0)
+        if self._use_fd_readers:
+            self.loop.add_reader(ser.fileno(), self._on_readable, name)
+        else:
+            self._pollers[name] = self.loop.create_task(self._poll(name))
+
+    def _unregister(self, name):
+        ser = self.ports.pop(name, None)
+        self._buffers.pop(name, None)
+        self._resync.pop(name, None)
+        self.protocols.pop(name, None)
+        if ser is None:
+            return
+
+        if self._use_fd_readers:
+            try:
+                self.loop.remove_reader(ser.fileno())
+            except Exception:
+                pass
+        else:
+            poller = self._pollers.pop(name, None)
+            if poller is not None:
+                poller.cancel()
+
+        try:
+            ser.close()
+        except Exception:
+            pass
+
+    def _write(self, name, data):
+        ser = self.ports.get(name)
+        if ser is None:
+            return
+        try:
+            ser.write(data)
+        except Exception:
+            self._lost(name)
+
+    def _lost(self, name):
+        self._unregister(name)
+        self.events.append((name, time.time(), None))     # Never dropped, the client has to know
+
+    def _put(self, name, t_recv, items):
+        n_room = max(0, self.maxlen - len(self.events))
+        if len(items) > n_room:
+            self.dropped[name] += len(items) - n_room
+            items = items[:n_room]
+        self.events.extend((name, t_recv, item) for item in items)
+
+    def _read_available(self, name):
+        ser = self.ports[name]
+        try:
+            with profiler.stage('serial read'):
+                data = ser.read(max(ser.in_waiting, 1))
+        except Exception:    # Device unplugged
+            self._lost(name)
+            return
+
+        if data:
+            self._frame(name, data, time.time())
+
+    def _on_readable(self, name):
+        if name in self.ports:
+            self._read_available(name)
+
+    async def _poll(self, name):
+        while name in self.ports:
+            try:
+                waiting = self.ports[name].in_waiting
+            except Exception:
+                self._lost(name)
+                return
+
+            if waiting:
+                self._read_available(name)
+            else:
+                await asyncio.sleep(self.poll_interval)
+
+    def _frame(self, name, data, t_recv):
+        # Splits everything that arrived in one go, the partial line at the end waits in the buffer for the rest
+        with profiler.stage('decode'):
+            buf = self._buffers[name]
+            buf += data
+
+            protocol = self.protocols[name] or self._detect(name, buf)
+            if protocol is None:
+                return
+            if protocol == 'binary':
+                frames, consumed, n_bad = decode_frames(buf)
+                del buf[:consumed]
+                self.bad_frames[name] += n_bad
+                self._put(name, t_recv, frames)
+                return
+
+            end = buf.rfind(b'\n')
+            if end < 0:
+                if len(buf) > self.max_line:    # No newline in too long, drop it and resync on the next one
+                    buf.clear()
+                    self._resync[name] = True
+                return
+
+            lines = buf[:end].decode(errors='ignore').split('\n')
+            del buf[:end+1]
+            if self._resync[name]:
+                lines = lines[1:]
+                self._resync[name] = False
+
+            self._put(name, t_recv, [line.rstrip('\r') for line in lines if len(line) <= self.max_line])
+
+    def _detect(self, name, buf):
+        """
+        Picks the protocol of a device from the first bytes that it sends. Returns None while it can't tell yet
+        """
+
+        if SYNC[:1] in buf:     # Never in an ASCII line
+            frames, _, _ = decode_frames(buf)
+            if any(not isinstance(frame, str) for frame in frames):     # Not just replies
+                self.protocols[name] = 'binary'
+                return 'binary'
+            if len(buf) < 2*MAX_FRAME:   # Wait for the rest of the frame
+                return None
+        elif b'\n' not in buf:
+            return None
+        self.protocols[name] = 'ascii'
+        return 'ascii'
+
+    def drain(self, max_items=None):
+        batch = []
+        while self.events and (max_items is None or len(batch) < max_items):
+            batch.append(self.events.popleft())
+        return batch
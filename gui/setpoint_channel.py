@@ -0,0 +1,134 @@
+import time
+
+from profiler import profiler
+
+
+def format_setpoint(setpoint):
+    # parsefloat on the firmware side needs the <> around it
+    return bytes(f'<{setpoint:.2f}>', 'ascii')
+
+
+class SetpointChannel:
+    """
+    Rate-limited setpoint commands to one controller, acknowledged by the setpoint that the firmware echoes back
+
+    request() only replaces the pending setpoint, so however often the sequence asks for a new one, at most one
+    command goes out every min_interval seconds and it carries the newest value. A setpoint within quantum of what the
+    controller has isn't sent at all: the last command while it's in flight, then the setpoint the controller echoes.
+    If the echo moves off the last command (the controller restarted, or dropped it) the next request is sent again.
+    Commands are rounded to the 0.01 C that the telemetry reports, so a command is acknowledged when a sample echoes
+    it exactly. The time from the write to that sample is recorded in the profiler
+    as 'setpoint ack'. A command that isn't acknowledged within ack_timeout is sent again, up to max_retries times.
+
+    send_now() skips the queue, for the shutdown, and so does estop(). The firmware answers an estop with a setpoint
+    of 0 and its estop flag, so that is what acknowledges it, recorded as 'estop ack'.
+
+    """
+
+    def __init__(self, write, clock=time.time, quantum=0.1, min_interval=1.0, ack_timeout=5.0, max_retries=3, log=print):
+        self.write = write      # Called with the bytes of a command
+        self.clock = clock
+        self.quantum = quantum
+        self.min_interval = min_interval
+        self.ack_timeout = ack_timeout
+        self.max_retries = max_retries
+        self.log = log
+        self.reset()
+
+    def reset(self):
+        self.pending = None
+        self.sent = None        # Last setpoint written, acknowledged or not. None once the controller has moved off it
+        self.echoed = None      # Setpoint in the last sample
+        self.t_sent = None
+        self.in_flight = None   # Written and not acknowledged yet
+        self.t_estop = None     # Estop written and not acknowledged yet
+        self.n_retries = 0
+        self.last_latency = None
+        self.n_sent = 0
+        self.n_merged = 0       # Requests replaced by a newer one before they went out, or within the quantum
+
+    def cancel(self):
+        """
+        Drops the pending and unacknowledged setpoints, ex. when the controller takes over the setpoint itself
+        """
+
+        self.pending = None
+        self.in_flight = None
+        self.sent = None
+        self.n_retries = 0
+
+    def request(self, setpoint, t=None):
+        setpoint = round(setpoint, 2)
+        current = self.sent if self.sent is not None else self.echoed
+        if current is not None and abs(setpoint - current) < self.quantum:
+            self.pending = None     # Back within the quantum of what the controller already has
+            self.n_merged += 1
+            return
+        if self.pending is not None:
+            self.n_merged += 1
+        self.pending = setpoint
+        self.service(t)
+
+    def service(self, t=None):
+        """
+        Sends the pending setpoint if the rate limit allows it, and resends an unacknowledged one. Call it regularly,
+        the session calls it on every sample
+        """
+
+        if t is None:
+            t = self.clock()
+
+        if self.in_flight is not None and self.pending is None and t - self.t_sent > self.ack_timeout:
+            if self.n_retries < self.max_retries:
+                self.n_retries += 1
+                self.log(f'Setpoint {self.in_flight:.2f}C not acknowledged after {t - self.t_sent:.1f}s, resending')
+                self._send(self.in_flight, t)
+            else:
+                self.log(f'Setpoint {self.in_flight:.2f}C was never acknowledged')
+                self.in_flight = None
+
+        if self.pending is not None and (self.t_sent is None or t - self.t_sent >= self.min_interval):
+            setpoint, self.pending = self.pending, None
+            self.n_retries = 0
+            self._send(setpoint, t)
+
+    def _send(self, setpoint, t):
+        self.write(format_setpoint(setpoint))
+        self.sent = self.in_flight = setpoint
+        self.t_sent = t
+        self.n_sent += 1
+
+    def send_now(self, setpoint, t=None):
+        """
+        Writes setpoint immediately and drops anything pending
+        """
+
+        self.pending = None
+        self.n_retries = 0
+        self._send(setpoint, self.clock() if t is None else t)
+
+    def estop(self, estop_setpoint, t=None):
+        self.pending = None
+        self.in_flight = None
+        self.sent = None    # The firmware zeroes its setpoint
+        self.t_estop = self.clock() if t is None else t
+        self.write(format_setpoint(estop_setpoint))
+        self.n_sent += 1
+
+    def ack(self, echoed_setpoint, estop_bool, t):
+        """
+        Matches a sample's setpoint and estop flag against the commands in flight
+        """
+
+        if estop_bool and self.t_estop is not None:
+            profiler.record('estop ack', t - self.t_estop)
+            self.t_estop = None
+
+        self.echoed = echoed_setpoint
+        if self.in_flight is not None and abs(echoed_setpoint - self.in_flight) < 0.005:
+            self.last_latency = t - self.t_sent
+            profiler.record('setpoint ack', self.last_latency)
+            self.in_flight = None
+        elif self.in_flight is None and self.sent is not None and abs(echoed_setpoint - self.sent) >= self.quantum:
+            self.log(f'Controller setpoint {echoed_setpoint:.2f}C is off the last command ({self.sent:.2f}C)')
+            self.sent = None    # Compare the next request with what the controller has
@@ -0,0 +1,83 @@
+import numpy as np
+
+RAMP, HOLD, STEP = 'ramp', 'hold', 'step'
+
+
+class SetpointProfile:
+    """
+    Piecewise-linear setpoint profile, compiled once from the (time [min], temp [C]) rows of a sequence CSV
+
+    Each segment between two breakpoints stores its start, start temp and slope, so a lookup is one multiply-add. The
+    segment of the last lookup is kept as a cursor: the run only moves forward in time, so the next lookup starts there
+    and at most steps over a few breakpoints. Two rows with the same time are a step, the setpoint jumps to the second
+    temp at that time. Equal temps on both ends are a hold.
+
+    """
+
+    def __init__(self, sequence):
+        sequence = np.asarray(sequence, dtype=float)
+        if sequence.ndim != 2 or sequence.shape[0] < 2:
+            raise ValueError('A sequence needs at least two rows of time and temperature')
+        if np.any(np.diff(sequence[:,0]) < 0):
+            raise ValueError('The times of a sequence have to be in increasing order')
+
+        # Python floats, the scalar lookups are faster on lists than on numpy arrays
+        self.times = sequence[:,0].tolist()
+        self.temps = sequence[:,1].tolist()
+        self.n_segments = len(self.times) - 1
+        self.t_start = self.times[0]
+        self.t_end = self.times[-1]
+
+        self.slopes = []
+        self.kinds = []
+        for i in range(self.n_segments):
+            dt = self.times[i+1] - self.times[i]
+            d_temp = self.temps[i+1] - self.temps[i]
+            if dt == 0:
+                self.slopes.append(0.0)
+                self.kinds.append(STEP)
+            else:
+                self.slopes.append(d_temp/dt)
+                self.kinds.append(HOLD if d_temp == 0 else RAMP)
+
+        self.cursor = 0
+
+    def segment(self, t):
+        """
+        Index of the segment that t is in, moving the cursor there. Past the end it's the last segment
+        """
+
+        i = self.cursor
+        if t < self.times[i]:
+            i = 0       # Went back in time, ex. a new run of the same profile
+        while i < self.n_segments - 1 and t >= self.times[i+1]:
+            i += 1
+        self.cursor = i
+        return i
+
+    def value(self, t):
+        """
+        Setpoint at time t [min]
+        """
+
+        if t >= self.t_end:
+            return self.temps[-1]
+        if t <= self.t_start:
+            return self.temps[0]
+        i = self.segment(t)
+        return self.temps[i] + self.slopes[i]*(t - self.times[i])
+
+    def kind(self, t):
+        return self.kinds[self.segment(t)]
+
+    def time_to_next_breakpoint(self, t):
+        """
+        Minutes from t until the next breakpoint, 0 past the end of the profile
+        """
+
+        if t >= self.t_end:
+            return 0.0
+        return self.times[self.segment(t) + 1] - t
+
+    def __len__(self):
+        return len(self.times)
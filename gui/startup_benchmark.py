@@ -0,0 +1,115 @@
+"""
+Times a cold start of the GUI: the import time of each heavy module and the time until the window is up. Ex:
+
+    python startup_benchmark.py --repeat 5 --out startup.json
+
+Every timing runs in a fresh interpreter, so nothing is already imported (the OS file cache is warm after the first
+run, like on a restart). The window is timed twice, built in full and with --fast-start. The window timings need a
+display and are skipped without one.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+import numpy as np
+
+GUI_DIRNAME = os.path.dirname(os.path.abspath(__file__))
+
+MODULES = ('numpy', 'serial.tools.list_ports', 'ttkbootstrap', 'matplotlib.figure', 'matplotlib.backends.backend_tkagg',
+           'oven_core', 'oven_gui_main')
+
+IMPORT_CHILD = """
+import json, time
+t_start = time.perf_counter()
+import {module}
+print(json.dumps({{'import_s': time.perf_counter() - t_start}}))
+"""
+
+WINDOW_CHILD = """
+import json, tempfile, time
+t_start = time.perf_counter()
+import oven_gui_main
+t_import = time.perf_counter()
+with tempfile.TemporaryDirectory() as dirname:
+    app = oven_gui_main.App('Startup benchmark', app_dirname=dirname, fast_start_bool={fast_start})
+    t_built = time.perf_counter()
+    app.update()
+    t_shown = time.perf_counter()
+    while app.live_plot is None:    # Fast start loads the plot after the window is shown
+        app.update()
+    t_plot = time.perf_counter()
+    app.core.shutdown()
+    app.destroy()
+print(json.dumps({{'import_s': t_import - t_start, 'construct_s': t_built - t_import, 'window_shown_s': t_shown - t_start,
+                  'plot_shown_s': t_plot - t_start}}))
+"""
+
+
+def run_child(code):
+    """
+    Runs code in a fresh interpreter in the gui directory and returns the JSON it prints, or None if it failed
+    """
+
+    result = subprocess.run([sys.executable, '-c', code], cwd=GUI_DIRNAME, capture_output=True, text=True)
+    if result.returncode:
+        print(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f'Exited with {result.returncode}')
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def median_of(runs):
+    runs = [run for run in runs if run is not None]
+    if not runs:
+        return None
+    return {key: float(np.median([run[key] for run in runs])) for key in runs[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the cold start of the GUI')
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreters per timing, the median is reported')
+    parser.add_argument('--out', default=f'startup-{datetime.now().strftime("%Y%m%d-%H%M%S")}.json', help='JSON file for the results')
+    args = parser.parse_args()
+
+    results = {'interpreter': None, 'imports': {}, 'window': {}}
+
+    interpreter = median_of([run_child(IMPORT_CHILD.format(module='sys')) for _ in range(args.repeat)])
+    results['interpreter'] = interpreter
+    print(f'{"Interpreter":<40}{interpreter["import_s"]*1000:>10.1f} ms')
+
+    for module in MODULES:
+        timing = median_of([run_child(IMPORT_CHILD.format(module=module)) for _ in range(args.repeat)])
+        results['imports'][module] = timing
+        if timing is None:
+            print(f'{"import " + module:<40}{"failed":>10}')
+        else:
+            print(f'{"import " + module:<40}{timing["import_s"]*1000:>10.1f} ms')
+
+    print()
+    if os.name != 'nt' and not os.environ.get('DISPLAY'):
+        print('No display, skipping the window timings')
+    else:
+        for name, fast_start in (('full', False), ('fast start', True)):
+            timing = median_of([run_child(WINDOW_CHILD.format(fast_start=fast_start)) for _ in range(args.repeat)])
+            results['window'][name] = timing
+            if timing is None:
+                print(f'{name:<12}failed')
+            else:
+                print(f'{name:<12}import {timing["import_s"]*1000:.0f} ms, construct {timing["construct_s"]*1000:.0f} ms, '
+                      f'window shown {timing["window_shown_s"]*1000:.0f} ms, plot shown {timing["plot_shown_s"]*1000:.0f} ms')
+
+    output = {'meta': {'date': datetime.now().isoformat(timespec='seconds'),
+                       'python': sys.version.split()[0],
+                       'platform': platform.platform(),
+                       'repeat': args.repeat},
+              'results': results}
+    with open(args.out, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f'\nWrote results to: {args.out}')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import numpy as np
+from datetime import datetime
+
+# Small integer codes for the mode and status strings. Strings are only produced again at export time
+MODES = ('NOT SET', 'OFF', 'MANUAL', 'AUTO')
+STATUSES = ('INACTIVE', 'CONNECTED', 'RUNNING', 'ESTOPPED')
+
+
+def encode_mode(mode_str):
+    """
+    Maps the displayed mode (ex. 'MANUAL 0:01:23') onto its code, ignoring the timer suffix
+    """
+
+    for code, mode in enumerate(MODES):
+        if mode_str.startswith(mode):
+            return code
+    return 0
+
+
+def encode_status(status_str):
+    return STATUSES.index(status_str)
+
+
+def csv_header(n_tc):
+    tc_cols = ', '.join(f'TC{i+1} [degC]' for i in range(n_tc))
+    return f'Time, Rel time [min], {tc_cols}, Setpoint [degC], Estop, Heater On/Off, Fan 1 [RPM], Fan 2 [RPM], Mode, Status'
+
+
+def parse_lines(lines, n_tc):
+    """
+    Parses a batch of serialPrintSummary lines ('<TC1> ... <TCn> <heater> <setpoint> <estop>') in one go
+
+    Returns (good, values) where good holds the indices of the lines that parsed and values is a float array with one
+    row per good line: the n_tc temperatures (nan included), heater, setpoint and estop. Partial or corrupted lines,
+    ie. the wrong number of fields, a field that isn't a number, or a heater/estop that isn't an integer, are left out.
+
+    """
+
+    n_fields = n_tc + 3
+    split = [line.split(' ') for line in lines]
+    good = [i for i, fields in enumerate(split) if len(fields) == n_fields]
+    if not good:
+        return good, np.empty((0, n_fields))
+
+    try:
+        values = np.array([split[i] for i in good], dtype=np.float64)    # numpy does the string to float conversion for the whole batch
+    except ValueError:
+        # A corrupted field somewhere in the batch, fall back to finding the bad lines one at a time
+        keep, rows = [], []
+        for i in good:
+            try:
+                rows.append([float(field) for field in split[i]])
+                keep.append(i)
+            except ValueError:
+                pass
+        good, values = keep, np.array(rows, dtype=np.float64).reshape(-1, n_fields)
+
+    flags = values[:, n_tc::2]      # Heater and estop
+    integer_bool = np.all(flags == np.round(flags), axis=1)
+    if not integer_bool.all():
+        good = [i for i, ok in zip(good, integer_bool) if ok]
+        values = values[integer_bool]
+
+    return good, values
+
+
+class TelemetryStore:
+    """
+    Typed, column-oriented history of the controller samples
+
+    Each quantity lives in its own preallocated numpy column that is grown geometrically in whole chunks,
+    so appends are amortized O(1). The public column properties are zero-copy views of the filled rows.
+    Views are invalidated when the store grows or is cleared, so don't hold on to them between samples.
+
+    """
+
+    def __init__(self, n_tc=6, chunk_size=4096):
+        self.n_tc = n_tc
+        self.chunk_size = chunk_size
+        self.clear()
+
+    def clear(self):
+        self.n = 0
+        self._capacity = 0
+        self._epoch = np.empty(0, dtype=np.float64)      # Wall clock time, seconds since the unix epoch
+        self._rel_time = np.empty(0, dtype=np.float64)   # Minutes since the timebase
+        self._temp = np.empty((0, self.n_tc), dtype=np.float32)
+        self._setpoint = np.empty(0, dtype=np.float32)
+        self._estop = np.empty(0, dtype=np.uint8)
+        self._heater = np.empty(0, dtype=np.uint8)
+        self._fan1 = np.empty(0, dtype=np.int32)
+        self._fan2 = np.empty(0, dtype=np.int32)
+        self._mode = np.empty(0, dtype=np.uint8)
+        self._status = np.empty(0, dtype=np.uint8)
+
+    def __len__(self):
+        return self.n
+
+    def _grow(self):
+        # Double the capacity (at least one chunk) so the cost of copying is amortized over the appends
+        new_capacity = max(self.chunk_size, 2*self._capacity)
+        for name in ('_epoch', '_rel_time', '_temp', '_setpoint', '_estop', '_heater', '_fan1', '_fan2', '_mode', '_status'):
+            old = getattr(self, name)
+            new = np.empty((new_capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+        self._capacity = new_capacity
+
+    def append(self, epoch, rel_time, temps, setpoint, estop, heater, fan1, fan2, mode, status):
+        """
+        mode and status are the integer codes from MODES and STATUSES
+        """
+
+        if self.n == self._capacity:
+            self._grow()
+
+        i = self.n
+        self._epoch[i] = epoch
+        self._rel_time[i] = rel_time
+        self._temp[i] = temps
+        self._setpoint[i] = setpoint
+        self._estop[i] = estop
+        self._heater[i] = heater
+        self._fan1[i] = fan1
+        self._fan2[i] = fan2
+        self._mode[i] = mode
+        self._status[i] = status
+        self.n += 1
+
+    # Zero-copy views of the filled part of each column
+    @property
+    def epoch(self):
+        return self._epoch[:self.n]
+
+    @property
+    def rel_time(self):
+        return self._rel_time[:self.n]
+
+    @property
+    def temp(self):
+        return self._temp[:self.n]
+
+    @property
+    def setpoint(self):
+        return self._setpoint[:self.n]
+
+    @property
+    def estop(self):
+        return self._estop[:self.n]
+
+    @property
+    def heater(self):
+        return self._heater[:self.n]
+
+    @property
+    def fan1(self):
+        return self._fan1[:self.n]
+
+    @property
+    def fan2(self):
+        return self._fan2[:self.n]
+
+    @property
+    def mode(self):
+        return self._mode[:self.n]
+
+    @property
+    def status(self):
+        return self._status[:self.n]
+
+    def format_row(self, i=-1):
+        """
+        One sample as a CSV line in the save_csv layout, for the streaming run log
+        """
+
+        i = range(self.n)[i]
+        temps = ','.join(str(t) for t in self._temp[i])
+        return (f'{datetime.fromtimestamp(self._epoch[i]).strftime("%m/%d/%Y, %H:%M:%S")},{self._rel_time[i]},{temps},'
+                f'{self._setpoint[i]},{self._estop[i]},{self._heater[i]},{self._fan1[i]},{self._fan2[i]},'
+                f'{MODES[self._mode[i]]},{STATUSES[self._status[i]]}')
+
+    def save_csv(self, fname):
+        """
+        Writes the history in the same layout that the GUI has always exported. The timestamps, modes and statuses
+        are turned back into strings here for the whole history at once, and by format_row() one sample at a time.
+
+        """
+
+        real_time = [datetime.fromtimestamp(t).strftime("%m/%d/%Y, %H:%M:%S") for t in self.epoch]
+        history_arry = np.column_stack((real_time,
+                                        self.rel_time.astype(str),
+                                        self.temp.astype(str),
+                                        self.setpoint.astype(str),
+                                        self.estop.astype(str),
+                                        self.heater.astype(str),
+                                        self.fan1.astype(str),
+                                        self.fan2.astype(str),
+                                        np.array(MODES)[self.mode],
+                                        np.array(STATUSES)[self.status]
+                                        ))
+
+        np.savetxt(fname, history_arry, delimiter=',', header=csv_header(self.n_tc), fmt='%s', comments='')    # Last argument prevents '#' from being appended to the start of the file
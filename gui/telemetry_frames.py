@@ -0,0 +1,133 @@
+import binascii
+import math
+import struct
+from collections import namedtuple
+
+# Binary telemetry frame of src/ez-bake.cpp (TELEMETRY_BINARY), little endian:
+#
+#   sync      2 bytes  0xEB 0x90
+#   length    u8       bytes in the payload
+#   payload:
+#     seq     u16      frame counter, wraps
+#     t_ms    u32      millis() when the TCs were read
+#     heater  u8
+#     unsafe  u8       0 safe, 1 estop, 2 fault
+#     setpoint i16     hundredths of a degree C
+#     n_tc    u8
+#     temps   i16 x n_tc, hundredths of a degree C, NAN_CODE for nan
+#   crc       u16      CRC-16/CCITT-FALSE of the length byte and the payload
+SYNC = b'\xeb\x90'
+HEADER = struct.Struct('<HIBBhB')
+HEADER_SIZE = len(SYNC) + 1
+CRC_SIZE = 2
+MAX_PAYLOAD = 255
+MAX_FRAME = HEADER_SIZE + MAX_PAYLOAD + CRC_SIZE
+NAN_CODE = -32768       # Same code as the run files
+SEQ_MOD = 1 << 16
+MAX_REPLY = 64          # Replies to commands are ASCII lines starting with '#', sent between frames
+
+TelemetryFrame = namedtuple('TelemetryFrame', ['seq', 't_ms', 'temps', 'heater', 'setpoint', 'unsafe'])
+
+
+def crc16(data):
+    # binascii.crc_hqx is the CCITT polynomial 0x1021, with an initial value of 0xFFFF it's CCITT-FALSE
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def quantize(x):
+    if math.isnan(x):
+        return NAN_CODE
+    return max(NAN_CODE + 1, min(32767, int(round(x*100))))
+
+
+def encode_frame(seq, t_ms, temps, heater, setpoint, unsafe):
+    """
+    One frame as the firmware sends it. Used by the simulator
+    """
+
+    payload = HEADER.pack(seq % SEQ_MOD, t_ms % (1 << 32), int(heater), int(unsafe), quantize(setpoint), len(temps))
+    payload += struct.pack(f'<{len(temps)}h', *(quantize(t) for t in temps))
+    body = bytes([len(payload)]) + payload
+    return SYNC + body + struct.pack('<H', crc16(body))
+
+
+def decode_frames(buf):
+    """
+    Decodes every complete frame in buf (a bytearray) without copying it, through a memoryview
+
+    Returns (frames, consumed, n_bad). The caller deletes buf[:consumed], what's after is the start of a frame that
+    hasn't fully arrived. A '#' reply line between frames is returned in frames as a str. Anything else between
+    frames, and every frame with a bad length or CRC, is skipped and the scan resyncs on the next sync word. n_bad
+    counts those frames.
+
+    """
+
+    frames = []
+    n_bad = 0
+    mv = memoryview(buf)
+    pos = 0
+    try:
+        while True:
+            start = buf.find(SYNC, pos)
+            gap_end = len(buf) if start < 0 else start
+            reply = buf.find(b'#', pos, gap_end)
+            if reply >= 0:
+                newline = buf.find(b'\n', reply, gap_end)
+                if newline >= 0:
+                    frames.append(buf[reply:newline].decode(errors='ignore').rstrip('\r'))
+                    pos = newline + 1
+                    continue
+                if start < 0 and len(buf) - reply < MAX_REPLY:    # The rest of the reply hasn't arrived yet
+                    pos = reply
+                    break
+            if start < 0:
+                # Keep a trailing first sync byte, the second may be in the next read
+                pos = len(buf) - 1 if buf.endswith(SYNC[:1]) else len(buf)
+                break
+            if start + HEADER_SIZE > len(buf):
+                pos = start
+                break
+
+            length = buf[start + 2]
+            end = start + HEADER_SIZE + length
+            if length < HEADER.size or (length - HEADER.size) % 2:
+                n_bad += 1
+                pos = start + 1
+                continue
+            if end + CRC_SIZE > len(buf):
+                pos = start
+                break
+
+            crc, = struct.unpack_from('<H', mv, end)
+            if crc != crc16(mv[start + 2:end]):
+                n_bad += 1
+                pos = start + 1
+                continue
+
+            seq, t_ms, heater, unsafe, setpoint, n_tc = HEADER.unpack_from(mv, start + HEADER_SIZE)
+            if HEADER.size + 2*n_tc != length:
+                n_bad += 1
+                pos = start + 1
+                continue
+            temps = struct.unpack_from(f'<{n_tc}h', mv, start + HEADER_SIZE + HEADER.size)
+            frames.append(TelemetryFrame(seq, t_ms, tuple(math.nan if t == NAN_CODE else t/100 for t in temps),
+                                         heater, setpoint/100, unsafe))
+            pos = end + CRC_SIZE
+    finally:
+        mv.release()    # A bytearray can't be resized while a view of it is alive
+
+    return frames, pos, n_bad
+
+
+def frames_to_values(frames, n_tc):
+    """
+    The rows that parse_lines() gives for the same samples: the n_tc temperatures, heater, setpoint and estop.
+    Returns (good, rows), frames with the wrong number of TCs are left out
+    """
+
+    good, rows = [], []
+    for i, frame in enumerate(frames):
+        if len(frame.temps) == n_tc:
+            good.append(i)
+            rows.append(frame.temps + (frame.heater, frame.setpoint, frame.unsafe))
+    return good, rows
@@ -0,0 +1,97 @@
+from collections import deque
+import numpy as np
+
+
+def parse_time_scale(scale_str):
+    """
+    '10 minutes' -> 10, 'All time' -> None
+    """
+
+    time_range = scale_str.split(' ')[0]
+    if 'all' in time_range.lower():
+        return None
+    return int(time_range)
+
+
+def window_start(time_arry, t_start):
+    """
+    Index of the first sample at or after t_start. Binary search, the time axis is monotonic
+    """
+
+    return int(np.searchsorted(time_arry, t_start, side='left'))
+
+
+class SlidingExtrema:
+    """
+    Min and max of the samples that fall within the last `span` minutes, kept with a pair of monotonic deques
+
+    Each sample is pushed and evicted at most once, so push() is amortized O(1) and the extrema are read in O(1).
+    A span of None tracks the extrema of the whole history.
+
+    """
+
+    def __init__(self, span=None):
+        self.span = span
+        self.clear()
+
+    def clear(self):
+        self._mins = deque()    # (time, value), values increasing from front to back
+        self._maxs = deque()    # (time, value), values decreasing from front to back
+
+    def push(self, t, lo, hi):
+        if self.span is None:
+            if not self._mins:
+                self._mins.append((t, lo))
+                self._maxs.append((t, hi))
+            else:
+                if lo < self._mins[0][1]:
+                    self._mins[0] = (t, lo)
+                if hi > self._maxs[0][1]:
+                    self._maxs[0] = (t, hi)
+            return
+
+        while self._mins and self._mins[-1][1] >= lo:
+            self._mins.pop()
+        self._mins.append((t, lo))
+
+        while self._maxs and self._maxs[-1][1] <= hi:
+            self._maxs.pop()
+        self._maxs.append((t, hi))
+
+        # Evict whatever slid out of the window
+        t_start = t - self.span
+        while self._mins[0][0] < t_start:
+            self._mins.popleft()
+        while self._maxs[0][0] < t_start:
+            self._maxs.popleft()
+
+    def __bool__(self):
+        return bool(self._mins)
+
+    @property
+    def min(self):
+        return self._mins[0][1]
+
+    @property
+    def max(self):
+        return self._maxs[0][1]
+
+
+class WindowExtremaSet:
+    """
+    One SlidingExtrema per selectable plot time range, all fed from the same samples
+    """
+
+    def __init__(self, time_scales):
+        self.windows = {scale: SlidingExtrema(parse_time_scale(scale)) for scale in time_scales}
+
+    def clear(self):
+        for window in self.windows.values():
+            window.clear()
+
+    def push(self, t, lo, hi):
+        for window in self.windows.values():
+            window.push(t, lo, hi)
+
+    def __getitem__(self, scale):
+        return self.windows[scale]
@@ -1,11 +1,20 @@
 #define ONE_WIRE_BUS 2
 #define OUTPUT_PIN 3
-#define SERIAL_BAUDRATE 9600
+#define SERIAL_BAUDRATE 9600     // Raise to ex. 115200 with TELEMETRY_BINARY, and start the GUI with --baud
+#define TELEMETRY_BINARY 0       // 1 sends CRC checked binary frames instead of ASCII lines, see gui/telemetry_frames.py
 #define DEBOUNCE_LOOPS 2
 
 #define MIN_LEGAL_TEMP_C -20
 #define MAX_LEGAL_TEMP_C 150
 
+#define FRAME_SYNC_0 0xEB
+#define FRAME_SYNC_1 0x90
+#define FRAME_HEADER_BYTES 11    // seq, millis, heater, unsafe, setpoint, number of TCs
+#define FRAME_MAX_TCS 122        // The length byte caps the payload at 255 bytes
+#define FRAME_NAN_CODE -32768
+
+#define MAX_PROFILE_POINTS 32    // Breakpoints of an uploaded cure profile
+
 #include <vector>
 
 typedef std::vector<float> tempCArray;
\ No newline at end of file
@@ -6,6 +6,9 @@
 #endif
 
 void checkForNewString();
+bool hasNewString();
+const char* receivedString();
+void clearNewString();
 float processInput();
 
 #endif
\ No newline at end of file
@@ -14,6 +14,16 @@ bool lastHeaterState = false;
 bool targetHeaterState = false;
 float tmp = 0;
 states isUnsafe = SAFE;
+uint16_t frameSeq = 0;
+uint32_t readTimeMs = 0;
+
+// Cure profile uploaded by the host with <P>, <B minutes temp>..., <R>, then interpolated here every loop
+float profileTimesMin[MAX_PROFILE_POINTS];
+float profileTempsC[MAX_PROFILE_POINTS];
+uint8_t profileLength = 0;
+uint8_t profileSegment = 0;
+bool profileRunning = false;
+uint32_t profileStartMs = 0;
 
 void setup(void) {
   Serial.begin(SERIAL_BAUDRATE);
@@ -43,6 +53,7 @@ void readThermocouples() {
   for (int8_t i = 0; i < NUM_THERMOCOUPLES; i++ ) {
     temperatures[i] = sensors.getTempCByIndex(i);
   }
+  readTimeMs = millis();
 }
 
 void serialPrintSummary(bool targetHeaterState, float currentSetpointC) {
@@ -58,6 +69,116 @@ void serialPrintSummary(bool targetHeaterState, float currentSetpointC) {
   Serial.println();
 }
 
+// CRC-16/CCITT-FALSE, what binascii.crc_hqx(data, 0xFFFF) computes on the GUI side
+uint16_t crc16(const uint8_t* data, size_t len) {
+  uint16_t crc = 0xFFFF;
+  for (size_t i = 0; i < len; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (uint8_t bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+int16_t quantizeTemp(float temperatureC) {
+  if (isnan(temperatureC))
+    return FRAME_NAN_CODE;
+  return (int16_t)constrain(lroundf(temperatureC*100), FRAME_NAN_CODE + 1, 32767);   // Hundredths of a degree
+}
+
+size_t putLittleEndian(uint8_t* frame, size_t i, uint32_t value, uint8_t nBytes) {
+  for (uint8_t b = 0; b < nBytes; b++) {
+    frame[i++] = (value >> (8*b)) & 0xFF;
+  }
+  return i;
+}
+
+void serialWriteFrame(bool targetHeaterState, float currentSetpointC) {
+  // Same content as serialPrintSummary, plus a frame counter and the time of the reading. Layout in gui/telemetry_frames.py
+  const uint8_t NUM_THERMOCOUPLES = min(temperatures.size(), (size_t)FRAME_MAX_TCS);
+  uint8_t frame[3 + FRAME_HEADER_BYTES + 2*FRAME_MAX_TCS + 2];
+  size_t i = 0;
+
+  frame[i++] = FRAME_SYNC_0;
+  frame[i++] = FRAME_SYNC_1;
+  frame[i++] = FRAME_HEADER_BYTES + 2*NUM_THERMOCOUPLES;
+  i = putLittleEndian(frame, i, frameSeq++, 2);
+  i = putLittleEndian(frame, i, readTimeMs, 4);
+  frame[i++] = targetHeaterState;
+  frame[i++] = isUnsafe;
+  i = putLittleEndian(frame, i, (uint16_t)quantizeTemp(currentSetpointC), 2);
+  frame[i++] = NUM_THERMOCOUPLES;
+  for (uint8_t tc = 0; tc < NUM_THERMOCOUPLES; tc++) {
+    i = putLittleEndian(frame, i, (uint16_t)quantizeTemp(temperatures[tc]), 2);
+  }
+  i = putLittleEndian(frame, i, crc16(frame + 2, i - 2), 2);   // Covers the length byte and the payload
+
+  Serial.write(frame, i);
+}
+
+// Replies to the host start with '#', the GUI tells them apart from the telemetry that way
+void serialPrintReply(const char* reply) {
+  Serial.print("# ");
+  Serial.println(reply);
+}
+
+void handleProfileCommand(const char* command) {
+  char reply[40];
+  char* end;
+  switch (command[0]) {
+    case 'P':   // Start a new upload
+      profileLength = 0;
+      profileRunning = false;
+      serialPrintReply("P");
+      break;
+
+    case 'B': {   // One breakpoint, minutes from the start and temperature
+      float timeMin = strtod(command + 1, &end);
+      float tempC = strtod(end, NULL);
+      if (profileLength >= MAX_PROFILE_POINTS || tempC < 0 || tempC >= MAX_LEGAL_TEMP_C ||
+          (profileLength > 0 && timeMin < profileTimesMin[profileLength - 1])) {
+        serialPrintReply("E bad breakpoint");
+        break;
+      }
+      profileTimesMin[profileLength] = timeMin;
+      profileTempsC[profileLength] = tempC;
+      profileLength++;
+      snprintf(reply, sizeof(reply), "B %d", profileLength);
+      serialPrintReply(reply);
+      break;
+    }
+
+    case 'R':   // Run it from the first breakpoint
+      if (profileLength < 2 || isUnsafe) {
+        serialPrintReply("E cannot run profile");
+        break;
+      }
+      profileRunning = true;
+      profileSegment = 0;
+      profileStartMs = millis();
+      snprintf(reply, sizeof(reply), "R %d", profileLength);
+      serialPrintReply(reply);
+      break;
+
+    default:
+      serialPrintReply("E unknown command");
+  }
+}
+
+float getProfileSetpoint(float elapsedMin) {
+  // The segment only moves forward, so this is a step or two at most per loop
+  while (profileSegment < profileLength - 2 && elapsedMin >= profileTimesMin[profileSegment + 1]) {
+    profileSegment++;
+  }
+  float t0 = profileTimesMin[profileSegment];
+  float t1 = profileTimesMin[profileSegment + 1];
+  if (t1 <= t0)   // A step
+    return profileTempsC[profileSegment + 1];
+  float fraction = constrain((elapsedMin - t0)/(t1 - t0), 0, 1);
+  return profileTempsC[profileSegment] + fraction*(profileTempsC[profileSegment + 1] - profileTempsC[profileSegment]);
+}
+
 bool getHeaterControlState(float setpointC) {
   // Get the mean temperature
   float meanTemperatureC = 0;
@@ -80,14 +201,40 @@ void loop(void) {
   }
 
     // Accepts an "estop" command from the user. Interprets any temp over 1000C as a shut-down command
+    // Every complete command is handled, a leading letter is a profile command and a plain number a setpoint
     checkForNewString();
-    tmp = processInput();
-    if (tmp >= 0){
-      if ((tmp < MAX_LEGAL_TEMP_C) && !isUnsafe)    // Input temp has to be bounded between [0, MAX_LEGAL_TEMP_C) degrees
-        currentSetpointC = tmp;
-      if (tmp > 1000){
-        isUnsafe = ESTOP;   // Controller received an erroneous setpoint, to be interpreted as an estop condition
+    while (hasNewString()) {
+      if (isalpha(receivedString()[0])) {
+        handleProfileCommand(receivedString());
+        clearNewString();
+      }
+      else {
+        tmp = processInput();
+        if (tmp >= 0){
+          profileRunning = false;     // A setpoint from the host takes over from the profile
+          if ((tmp < MAX_LEGAL_TEMP_C) && !isUnsafe)    // Input temp has to be bounded between [0, MAX_LEGAL_TEMP_C) degrees
+            currentSetpointC = tmp;
+          if (tmp > 1000){
+            isUnsafe = ESTOP;   // Controller received an erroneous setpoint, to be interpreted as an estop condition
+            currentSetpointC = 0;
+          }
+        }
+      }
+      checkForNewString();
+    }
+
+    if (profileRunning) {
+      float elapsedMin = (millis() - profileStartMs)/60000.0;
+      if (isUnsafe) {
+        profileRunning = false;
+      }
+      else if (elapsedMin > profileTimesMin[profileLength - 1]) {
+        profileRunning = false;
         currentSetpointC = 0;
+        serialPrintReply("D");
+      }
+      else {
+        currentSetpointC = getProfileSetpoint(elapsedMin);
       }
     }
 
@@ -108,7 +255,11 @@ void loop(void) {
   else
     targetHeaterState = 0;
 
+#if TELEMETRY_BINARY
+  serialWriteFrame(targetHeaterState, currentSetpointC);
+#else
   serialPrintSummary(targetHeaterState, currentSetpointC);    // Moving this line down so the heater status can be printed after the bang-bang calculation
+#endif
 
   // Adding a conditional so that the heater state can be printed out at every iteration - avoids breaking out of loop() if the state is not updated
   if ((targetHeaterState != lastHeaterState) && !isUnsafe){
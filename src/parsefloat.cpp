@@ -43,6 +43,18 @@ void checkForNewString() {
     }
 }
 
+bool hasNewString() {
+    return newData;
+}
+
+const char* receivedString() {
+    return receivedChars;
+}
+
+void clearNewString() {
+    newData = false;
+}
+
 float processInput() {
     if (newData == true) {
         newData = false;
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The GUI modules import each other by their bare names, like when they're run from the gui directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gui'))
@@ -0,0 +1,73 @@
+import os
+from datetime import datetime
+
+import pytest
+
+from catalog import RunCatalog, summarize
+from runfile import save_run
+from test_runfile import BASELINE_CSV
+from test_telemetry import make_store
+
+
+def paths(rows):
+    return sorted(row['path'] for row in rows)
+
+
+def test_summarize_skips_the_estop_setpoint():
+    row = summarize(make_store(10))
+    assert row['n_samples'] == 10
+    assert row['max_setpoint'] == 130.0
+    assert row['peak_temp'] == pytest.approx(20 + 9/4)
+    assert row['duration_min'] == pytest.approx(9/60)
+
+
+def test_query_filters(tmp_path):
+    catalog = RunCatalog(str(tmp_path))
+    for name in ['a', 'b']:
+        (tmp_path/f'{name}.csv').touch()
+    catalog.add([str(tmp_path/'a.csv')], make_store(10), profile='cure130.csv')
+    catalog.add([str(tmp_path/'b.csv')], make_store(4))
+    assert paths(catalog.query()) == ['a.csv', 'b.csv']
+    assert paths(catalog.query(setpoint=130.5)) == ['a.csv', 'b.csv']
+    assert paths(catalog.query(profile='cure130.csv')) == ['a.csv']
+    assert paths(catalog.query(min_duration=0.1)) == ['a.csv']
+    assert catalog.query(setpoint=200) == []
+    assert catalog.query(estopped=False) == []
+    assert catalog.query(since=datetime.fromtimestamp(1.8e9)) == []
+    catalog.close()
+
+
+def test_scan_indexes_new_and_changed_runs_once(tmp_path):
+    os.makedirs(tmp_path/'runs'/'2025')
+    store = make_store(10)
+    store.save_csv(tmp_path/'runs'/'2025'/'run-seg000.csv')
+    store.save_csv(tmp_path/'runs'/'2025'/'run-seg001.csv')
+    save_run(store, tmp_path/'runs'/'other.ezrun')
+
+    catalog = RunCatalog(str(tmp_path))
+    assert catalog.scan() == 2      # The two segments are one run
+    assert catalog.scan() == 0
+    n_samples = {row['path']: row['n_samples'] for row in catalog.query()}
+    assert n_samples == {'runs/2025/run-seg000.csv': 20, 'runs/other.ezrun': 10}
+
+    os.utime(tmp_path/'runs'/'other.ezrun', (0, 0))
+    assert catalog.scan() == 1
+    assert paths(catalog.query()) == ['runs/2025/run-seg000.csv', 'runs/other.ezrun']
+    catalog.close()
+
+
+def test_scan_indexes_legacy_runs_and_skips_exports(tmp_path, capsys):
+    os.makedirs(tmp_path/'runs'/'old')
+    os.makedirs(tmp_path/'runs'/'new')
+    (tmp_path/'runs'/'old'/'20240102-030405.csv').write_text(BASELINE_CSV)   # Before the run log, only exports
+    store = make_store(10)
+    store.save_csv(tmp_path/'runs'/'new'/'20250102-030405-seg000.csv')
+    store.save_csv(tmp_path/'runs'/'new'/'20250102-040506.csv')              # Save Data... during that run
+
+    catalog = RunCatalog(str(tmp_path))
+    assert catalog.scan() == 2
+    assert paths(catalog.query()) == ['runs/new/20250102-030405-seg000.csv', 'runs/old/20240102-030405.csv']
+    assert 'runs/new/20250102-040506.csv: an export' in capsys.readouterr().out
+    n_samples = {row['path']: row['n_samples'] for row in catalog.query(setpoint=130)}
+    assert n_samples == {'runs/new/20250102-030405-seg000.csv': 10, 'runs/old/20240102-030405.csv': 4}
+    catalog.close()
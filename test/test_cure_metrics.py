@@ -0,0 +1,81 @@
+import json
+import numpy as np
+import pytest
+
+from cure_metrics import CureMetrics
+
+
+def feed(metrics, times, temps, setpoints):
+    for t, row, setpoint in zip(times, temps, setpoints):
+        row = np.atleast_1d(np.asarray(row, dtype=float))
+        metrics.update(t, row, row.mean(), setpoint)
+
+
+def test_no_overshoot_when_the_oven_starts_above_the_ramp():
+    # cure_cycle_130C.csv starts at 0C, the oven at ambient is above the first setpoints of the ramp
+    metrics = CureMetrics(n_tc=1)
+    times = np.arange(0, 10, 0.1)
+    setpoints = np.minimum(times*10, 60)
+    temps = np.maximum(20, setpoints - 5)      # Lags 5C behind once the ramp passes ambient
+    feed(metrics, times, temps, setpoints)
+    assert metrics.peak_overshoot[0] == 0
+    assert metrics.summary()['channels']['TC1']['peak_overshoot_c'] is None
+    assert 'overshoot --' in metrics.status_str()
+
+
+def test_overshoot_counts_once_the_setpoint_is_reached_from_below():
+    metrics = CureMetrics(n_tc=1)
+    feed(metrics, [0, 1, 2, 3, 4], [20, 40, 59, 61.5, 60.5], [60, 60, 60, 60, 60])
+    assert metrics.peak_overshoot[0] == pytest.approx(1.5)
+    assert metrics.summary()['channels']['TC1']['peak_overshoot_c'] == pytest.approx(1.5)
+
+
+def test_overshoot_ignores_the_cooldown_and_estop_setpoints():
+    metrics = CureMetrics(n_tc=1)
+    feed(metrics, [0, 1, 2, 3, 4], [20, 60, 58, 40, 30], [60, 60, 30, 9000, 0])
+    assert metrics.peak_overshoot[0] == 0
+    assert metrics.max_setpoint == 60
+
+
+def test_time_above_interpolates_the_crossing():
+    metrics = CureMetrics(n_tc=1, threshold_c=100)
+    feed(metrics, [0, 1, 2, 3], [90, 110, 110, 100], [0, 0, 0, 0])
+    # Half of the first interval, all of the second, and none of the third (100 isn't above)
+    assert metrics.time_above[0] == pytest.approx(0.5 + 1 + 1)
+
+
+def test_equivalent_time_at_the_reference_temperature_is_the_elapsed_time():
+    metrics = CureMetrics(n_tc=2, ref_temp_c=130)
+    times = np.linspace(0, 60, 121)
+    feed(metrics, times, [[130, 120]]*len(times), [130]*len(times))
+    assert metrics.equivalent_time[0] == pytest.approx(60)
+    assert 0 < metrics.equivalent_time[1] < 60      # Colder is less cure
+    assert metrics.equivalent_time[2] < 60          # The mean, 125C
+
+
+def test_ramp_rate_is_measured_over_the_span():
+    metrics = CureMetrics(n_tc=1, ramp_span=1.0)
+    rng = np.random.default_rng(0)
+    times = np.arange(0, 30, 0.0125)
+    temps = np.minimum(20 + 2*times, 60) + rng.normal(0, 0.05, len(times))
+    feed(metrics, times, temps, [60]*len(times))
+    assert metrics.max_heat_rate[0] == pytest.approx(2, abs=0.2)
+    assert metrics.max_cool_rate[0] < 0.2
+
+
+def test_worst_spread_and_clear():
+    metrics = CureMetrics(n_tc=3)
+    feed(metrics, [0, 1, 2], [[20, 21, 22], [50, 55, 58], [60, 61, 60]], [60, 60, 60])
+    assert metrics.worst_spread == pytest.approx(8)
+    assert metrics.t_worst_spread == 1
+    metrics.clear()
+    assert metrics.n_samples == 0 and metrics.worst_spread == 0 and metrics.status_str() == '--'
+
+
+def test_save(tmp_path):
+    metrics = CureMetrics(n_tc=2)
+    feed(metrics, [0, 1], [[20, 22], [30, 31]], [60, 60])
+    metrics.save(tmp_path/'run-cure.json')
+    saved = json.loads((tmp_path/'run-cure.json').read_text())
+    assert saved['n_samples'] == 2
+    assert list(saved['channels']) == ['TC1', 'TC2', 'mean']
@@ -0,0 +1,41 @@
+import numpy as np
+
+from decimate import MinMaxDecimator
+
+
+def test_small_window_is_not_decimated():
+    x = np.arange(10.0)
+    y = np.arange(20.0).reshape(10, 2)
+    x_out, y_out = MinMaxDecimator().decimate(x, y, 2, 100)
+    assert np.array_equal(x_out, x[2:])
+    assert np.array_equal(y_out, y[2:])
+
+
+def test_extrema_survive_decimation():
+    rng = np.random.default_rng(0)
+    y = rng.normal(size=(5000, 3))
+    x = np.arange(5000.0)
+    decimator = MinMaxDecimator()
+    for start in [0, 123, 4000]:
+        idx = decimator.indices(y, start, 200)
+        assert idx.shape[0] <= 2*200
+        assert (idx >= start).all() and (np.diff(idx, axis=0) >= 0).all()
+        x_out, y_out = decimator.decimate(x, y, start, 200)
+        assert np.array_equal(y_out.max(axis=0), y[start:].max(axis=0))
+        assert np.array_equal(y_out.min(axis=0), y[start:].min(axis=0))
+
+
+def test_cached_buckets_match_a_fresh_decimator():
+    rng = np.random.default_rng(1)
+    y = rng.normal(size=(3000, 2))
+    decimator = MinMaxDecimator()
+    for n in range(1000, 3001, 250):     # The history grows between frames
+        assert np.array_equal(decimator.indices(y[:n], 0, 100), MinMaxDecimator().indices(y[:n], 0, 100))
+
+
+def test_cleared_history_is_recomputed():
+    rng = np.random.default_rng(2)
+    decimator = MinMaxDecimator()
+    decimator.indices(rng.normal(size=(2000, 1)), 0, 100)
+    y = rng.normal(size=(1000, 1))
+    assert np.array_equal(decimator.indices(y, 0, 100), MinMaxDecimator().indices(y, 0, 100))
@@ -0,0 +1,68 @@
+import numpy as np
+
+from oven_session import OvenSession
+from replay import ReplayClock
+
+
+class RecordingIngest:
+    """
+    Stands in for SerialIngest, keeps what the session writes
+    """
+
+    def __init__(self):
+        self.ports = {}
+        self.writes = []
+
+    def open(self, name, port, baudrate=9600):
+        self.ports[name] = port
+
+    def close(self, name):
+        self.ports.pop(name, None)
+
+    def write(self, name, data):
+        self.writes.append(data)
+
+
+def make_session(tmp_path, clock, **kwargs):
+    logs = []
+    session = OvenSession('Oven 1', RecordingIngest(), '.', str(tmp_path), clock=clock, log=logs.append, **kwargs)
+    session.connect('COM1')
+    return session, logs
+
+
+def test_device_profile_is_followed_from_its_start(tmp_path):
+    (tmp_path/'seq.csv').write_text('Time [min], Temp [C]\n0,25\n1,125\n2,125\n')
+    clock = ReplayClock(1.7e9)
+    session, logs = make_session(tmp_path, clock, profile_upload_bool=True)
+    session.load_auto_seq(tmp_path/'seq.csv')
+    session.start_auto_seq()
+    assert session.serial_ingest.writes[-1].startswith(b'<P><B 0.000 25.00>')    # The whole profile fits in one batch
+    for reply in ['#P', '#B', '#B', '#B']:
+        session.receive_controller_reply(reply)
+
+    clock.t += 10       # The batches of a long profile take seconds to confirm
+    session.receive_controller_reply('#R 3')
+    assert session.profile_mode == 'device'
+    t_device = clock.t
+
+    profile = session.auto_sequence_profile
+    n_writes = len(session.serial_ingest.writes)
+    for t in np.arange(0, 2*60, 0.5):
+        clock.t = t_device + t
+        setpoint = profile.value(t/60)
+        assert session.receive_controller_data(f'{" ".join(["30.0"]*6)} 1 {setpoint:.2f} 0', clock.t)
+    assert not any('off the profile' in msg for msg in logs)
+    assert session.mode == 'AUTO' and len(session.serial_ingest.writes) == n_writes    # Nothing sent during the profile
+
+    clock.t = t_device + 2*60 + 1
+    session.receive_controller_data(f'{" ".join(["30.0"]*6)} 1 125.00 0', clock.t)
+    assert session.mode == 'OFF'
+
+
+def test_lost_fan_clears_its_reading(tmp_path):
+    session, logs = make_session(tmp_path, ReplayClock(1.7e9))
+    session.connect_fan(2, 'COM3')
+    assert session.receive_fan_data(2, '1800')
+    session.lost_fan(2)
+    assert session.fan2_rpm == 0 and session.fan_ports == [None, None]
+    assert session.fan_devices[1] not in session.serial_ingest.ports
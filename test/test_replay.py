@@ -0,0 +1,34 @@
+import numpy as np
+
+from oven_core import OvenCore
+from replay import ReplayIngest, parse_speed
+from runfile import load_csv
+from test_runfile import BASELINE_CSV
+
+
+def test_parse_speed():
+    assert parse_speed('max') is None
+    assert parse_speed('100x') == 100
+
+
+def test_replay_baseline_csv(tmp_path):
+    (tmp_path/'run.csv').write_text(BASELINE_CSV)
+    ingest = ReplayIngest([str(tmp_path/'run.csv')], speed=None)
+    core = OvenCore(str(tmp_path), serial_ingest=ingest, clock=ingest.clock)
+    session = core.add_session()
+    session.connect('replay')
+    try:
+        n_samples = 0
+        while not ingest.finished:
+            n_samples += sum(idx for event, _, idx in core.poll(max_items=3) if event == 'sample')
+        ingest.report()
+    finally:
+        core.shutdown()
+
+    recorded = load_csv(str(tmp_path/'run.csv'))
+    assert n_samples == len(session.history) == len(recorded)
+    np.testing.assert_allclose(session.history.temp, recorded.temp)
+    np.testing.assert_allclose(session.history.setpoint, recorded.setpoint)
+    np.testing.assert_allclose(session.history.rel_time - session.history.rel_time[0],
+                               recorded.rel_time - recorded.rel_time[0], atol=1e-9)
+    assert ingest.reported_bool
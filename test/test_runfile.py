@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from runfile import RunFileReader, save_run, load_csv, csv_to_run, run_to_csv
+from telemetry import MODES, STATUSES
+from test_telemetry import make_store
+
+# Written by save_data_to_csv before the telemetry store, which kept only the first word of the mode
+BASELINE_CSV = """\
+Time, Rel time [min], TC1 [degC], TC2 [degC], TC3 [degC], TC4 [degC], TC5 [degC], TC6 [degC], Setpoint [degC], Estop, Heater On/Off, Fan 1 [RPM], Fan 2 [RPM], Mode, Status
+10/18/2026, 09:00:00,0.0,20.5,20.75,21.0,20.25,20.5,21.25,0.0,0,0,0,0,NOT,CONNECTED
+10/18/2026, 09:00:01,0.0166,21.5,21.75,22.0,21.25,21.5,22.25,0.0,0,0,1800,0,NOT,CONNECTED
+10/18/2026, 09:00:02,0.0333,22.5,22.75,23.0,22.25,22.5,23.25,130.0,0,1,1800,1790,MANUAL,RUNNING
+10/18/2026, 09:00:03,0.05,23.5,23.75,24.0,23.25,23.5,24.25,130.0,0,1,1810,1790,MANUAL,RUNNING
+"""
+
+
+def assert_same_store(a, b):
+    assert len(a) == len(b) and a.n_tc == b.n_tc
+    np.testing.assert_array_equal(a.epoch, b.epoch)
+    np.testing.assert_allclose(a.rel_time, b.rel_time)
+    np.testing.assert_allclose(a.temp, b.temp, atol=0.005)
+    np.testing.assert_array_equal(np.isnan(a.temp), np.isnan(b.temp))
+    np.testing.assert_allclose(a.setpoint, b.setpoint)
+    for column in ('estop', 'heater', 'fan1', 'fan2', 'mode', 'status'):
+        np.testing.assert_array_equal(getattr(a, column), getattr(b, column))
+
+
+def test_run_file_round_trip(tmp_path):
+    store = make_store(10)
+    save_run(store, tmp_path/'run.ezrun')
+    reader = RunFileReader(tmp_path/'run.ezrun')
+    assert len(reader) == 10
+    assert_same_store(reader.to_store(), store)
+
+
+def test_time_range(tmp_path):
+    store = make_store(10)
+    save_run(store, tmp_path/'run.ezrun')
+    reader = RunFileReader(tmp_path/'run.ezrun')
+    records = reader.time_range(2/60, 5/60)
+    np.testing.assert_allclose(records['rel_time'], np.arange(2, 5)/60)
+    assert len(reader.time_range(by='epoch', t_start=1.7e9 + 8)) == 2
+
+
+def test_torn_record_is_ignored(tmp_path):
+    store = make_store(10)
+    save_run(store, tmp_path/'run.ezrun')
+    with open(tmp_path/'run.ezrun', 'ab') as f:
+        f.write(b'\x00'*5)      # A crash in the middle of a record
+    assert len(RunFileReader(tmp_path/'run.ezrun')) == 10
+
+
+def test_not_a_run_file(tmp_path):
+    (tmp_path/'run.ezrun').write_bytes(b'Time, Rel time [min]\n')
+    with pytest.raises(ValueError):
+        RunFileReader(tmp_path/'run.ezrun')
+
+
+def test_csv_and_run_file_conversions(tmp_path):
+    store = make_store(10)
+    store.save_csv(tmp_path/'run.csv')
+    csv_to_run([str(tmp_path/'run.csv')], tmp_path/'run.ezrun')
+    run_to_csv(tmp_path/'run.ezrun', tmp_path/'back.csv')
+    assert_same_store(load_csv(str(tmp_path/'back.csv')), store)
+
+
+def test_baseline_csv(tmp_path):
+    (tmp_path/'run.csv').write_text(BASELINE_CSV)
+    store = load_csv(str(tmp_path/'run.csv'))
+    assert len(store) == 4 and store.n_tc == 6
+    assert [MODES[m] for m in store.mode] == ['NOT SET', 'NOT SET', 'MANUAL', 'MANUAL']
+    assert [STATUSES[s] for s in store.status] == ['CONNECTED', 'CONNECTED', 'RUNNING', 'RUNNING']
+    np.testing.assert_array_equal(store.fan1, [0, 1800, 1800, 1810])
+    assert np.diff(store.epoch).tolist() == [1, 1, 1]
+
+    csv_to_run([str(tmp_path/'run.csv')], tmp_path/'run.ezrun')
+    assert_same_store(RunFileReader(tmp_path/'run.ezrun').to_store(), store)
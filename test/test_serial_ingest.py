@@ -0,0 +1,96 @@
+import logging
+import os
+import time
+
+import pytest
+
+from oven_core import OvenCore
+from serial_ingest import SerialIngest
+from telemetry_frames import encode_frame
+
+
+@pytest.fixture
+def pty():
+    # The test writes to the master end, the ingest reads the other end like a serial port
+    master, slave = os.openpty()
+    yield master, os.ttyname(slave)
+    os.close(slave)
+    try:
+        os.close(master)
+    except OSError:     # Already closed by the test
+        pass
+
+
+@pytest.fixture
+def ingest():
+    ingest = SerialIngest(maxlen=3)
+    yield ingest
+    ingest.close_all()
+
+
+def drain_until(ingest, n_events, timeout=2.0):
+    events = []
+    t_stop = time.monotonic() + timeout
+    while len(events) < n_events and time.monotonic() < t_stop:
+        events += ingest.drain()
+        time.sleep(0.005)
+    return events
+
+
+def wait_for(condition, timeout=2.0):
+    t_stop = time.monotonic() + timeout
+    while not condition() and time.monotonic() < t_stop:
+        time.sleep(0.005)
+    return condition()
+
+
+def frame(seq):
+    return encode_frame(seq, 1000*seq, (20.0, 21.5, 22.0, 22.5, 23.0, 23.5), 1, 130.0, 0)
+
+
+def test_lines_split_across_reads(pty, ingest):
+    master, port = pty
+    ingest.open('a', port)
+    os.write(master, b'1 2')
+    assert drain_until(ingest, 1, timeout=0.1) == []
+    os.write(master, b' 3\n4 5 6\n')
+    assert [line for _, _, line in drain_until(ingest, 2)] == ['1 2 3', '4 5 6']
+    assert ingest.protocols['a'] == 'ascii'
+
+
+def test_full_queue_drops_and_counts_new_lines(pty, ingest):
+    master, port = pty
+    ingest.open('a', port)
+    os.write(master, b'1\n2\n3\n4\n5\n')
+    assert wait_for(lambda: ingest.dropped['a'] == 2)
+    assert [line for _, _, line in ingest.drain()] == ['1', '2', '3']
+
+
+def test_lost_device_is_never_dropped(pty, ingest):
+    master, port = pty
+    ingest.open('a', port)
+    os.write(master, b'1\n2\n3\n4\n')
+    assert wait_for(lambda: ingest.dropped['a'] == 1)     # The queue is full
+    os.close(master)    # Unplugged
+    events = drain_until(ingest, 4)
+    assert [(name, line) for name, _, line in events] == [('a', '1'), ('a', '2'), ('a', '3'), ('a', None)]
+
+
+def test_corrupted_frames_are_counted_and_reported(pty, ingest, tmp_path, caplog):
+    master, port = pty
+    core = OvenCore(str(tmp_path), serial_ingest=ingest)
+    session = core.add_session()
+    session.connect(port)
+
+    bad = bytearray(frame(2))
+    bad[-1] ^= 0xff     # Flipped bits in the CRC
+    os.write(master, frame(1) + bytes(bad) + frame(3))
+    assert wait_for(lambda: ingest.bad_frames[session.device] == 1 and len(ingest.events) == 2)
+    with caplog.at_level(logging.INFO, logger='ezbake'):
+        events = core.poll()
+        core.poll()     # Only new corrupted frames are logged
+    assert ingest.protocols[session.device] == 'binary'
+    assert [event for event, _, _ in events] == ['sample'] and len(session.history) == 2
+    assert [r.getMessage() for r in caplog.records if r.getMessage().startswith('Dropped')] == \
+        [f'Dropped 1 corrupted telemetry frames from {session.device} (1 total)']
+    core.shutdown()
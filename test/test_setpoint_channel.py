@@ -0,0 +1,80 @@
+from setpoint_channel import SetpointChannel, format_setpoint
+
+
+def make_channel(**kwargs):
+    writes = []
+    channel = SetpointChannel(writes.append, clock=lambda: 0.0, log=lambda msg: None, **kwargs)
+    return channel, writes
+
+
+def test_format_setpoint():
+    assert format_setpoint(130) == b'<130.00>'
+    assert format_setpoint(9000) == b'<9000.00>'
+
+
+def test_request_is_rounded_and_sent():
+    channel, writes = make_channel()
+    channel.request(130.004, t=0.0)
+    assert writes == [b'<130.00>']
+    assert channel.in_flight == 130.0
+
+
+def test_request_within_quantum_of_echo_is_dropped():
+    channel, writes = make_channel()
+    channel.request(130.0, t=0.0)
+    channel.ack(130.0, 0, 0.2)
+    channel.request(130.05, t=2.0)
+    assert writes == [b'<130.00>']
+    assert channel.in_flight is None
+
+
+def test_rate_limit_sends_the_newest_request():
+    channel, writes = make_channel(min_interval=1.0)
+    channel.request(100.0, t=0.0)
+    channel.request(101.0, t=0.5)
+    channel.request(102.0, t=0.6)
+    channel.service(0.9)
+    assert writes == [b'<100.00>']
+    channel.service(1.0)
+    assert writes == [b'<100.00>', b'<102.00>']
+    assert channel.n_merged == 1
+
+
+def test_stale_echo_does_not_resend_a_command_in_flight():
+    channel, writes = make_channel()
+    channel.request(130.0, t=0.0)
+    channel.ack(20.0, 0, 0.1)       # Sample from before the command arrived
+    channel.request(130.0, t=2.0)
+    assert writes == [b'<130.00>']
+    assert channel.in_flight == 130.0
+
+
+def test_setpoint_is_resent_when_the_controller_drops_it():
+    # Mid-hold the controller restarts and echoes 0 again, the next request has to go out even though it's the
+    # same as the last command
+    channel, writes = make_channel()
+    channel.request(130.0, t=0.0)
+    channel.ack(130.0, 0, 0.2)
+    channel.ack(0.0, 0, 10.0)
+    channel.request(130.0, t=11.0)
+    assert writes == [b'<130.00>', b'<130.00>']
+
+
+def test_unacknowledged_setpoint_is_resent_then_given_up():
+    channel, writes = make_channel(ack_timeout=5.0, max_retries=2)
+    channel.request(130.0, t=0.0)
+    channel.service(5.1)
+    channel.service(10.2)
+    channel.service(15.3)
+    assert writes == [b'<130.00>']*3
+    assert channel.in_flight is None
+
+
+def test_estop_skips_the_queue():
+    channel, writes = make_channel()
+    channel.request(100.0, t=0.0)
+    channel.request(110.0, t=0.1)
+    channel.estop(9000, t=0.2)
+    channel.service(5.0)
+    assert writes == [b'<100.00>', b'<9000.00>']
+    assert channel.pending is None
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from setpoint_profile import SetpointProfile, HOLD, RAMP, STEP
+
+CURE = [[0, 0], [30, 130], [210, 130], [220, 0]]
+
+
+def test_matches_np_interp():
+    profile = SetpointProfile(CURE)
+    sequence = np.array(CURE, dtype=float)
+    times = np.linspace(-5, 230, 1001)
+    expected = np.interp(times, sequence[:,0], sequence[:,1])
+    np.testing.assert_allclose([profile.value(t) for t in times], expected)
+
+
+def test_segments():
+    profile = SetpointProfile(CURE)
+    assert profile.kinds == [RAMP, HOLD, RAMP]
+    assert profile.segment(15) == 0
+    assert profile.kind(100) == HOLD
+    assert profile.time_to_next_breakpoint(100) == 110
+    assert profile.time_to_next_breakpoint(300) == 0
+    assert profile.segment(5) == 0      # Going back in time rewinds the cursor
+    assert len(profile) == 4
+
+
+def test_step():
+    profile = SetpointProfile([[0, 20], [10, 60], [10, 80], [20, 80]])
+    assert profile.kinds == [RAMP, STEP, HOLD]
+    assert profile.value(9.99) == pytest.approx(59.96)
+    assert profile.value(10) == 80
+
+
+@pytest.mark.parametrize('sequence', [[[0, 20]], [[0, 20], [10, 30], [5, 40]]])
+def test_bad_sequences(sequence):
+    with pytest.raises(ValueError):
+        SetpointProfile(sequence)
@@ -0,0 +1,54 @@
+import numpy as np
+
+from telemetry import TelemetryStore, csv_header, parse_lines
+
+
+def test_parse_lines():
+    good, values = parse_lines(['20.00 21.50 1 130.00 0', '22.25 nan 0 130.00 2'], n_tc=2)
+    assert good == [0, 1]
+    assert values.shape == (2, 5)
+    np.testing.assert_array_equal(values[0], [20, 21.5, 1, 130, 0])
+    assert np.isnan(values[1, 1])
+    assert values[1, 4] == 2
+
+
+def test_parse_lines_drops_partial_and_corrupted_lines():
+    lines = ['20.00 21.50 1 130.00 0',
+             '.50 1 130.00 0',              # Partial, the start of the line was lost
+             '20.00 2x.50 1 130.00 0',      # Corrupted field
+             '20.00 21.50 0.5 130.00 0',    # Heater isn't an integer
+             '',
+             '23.00 24.00 0 130.00 0']
+    good, values = parse_lines(lines, n_tc=2)
+    assert good == [0, 5]
+    np.testing.assert_array_equal(values[:, 0], [20, 23])
+
+
+def test_parse_lines_without_good_lines():
+    good, values = parse_lines(['garbage', ''], n_tc=6)
+    assert good == []
+    assert values.shape == (0, 9)
+
+
+def make_store(n, n_tc=2):
+    store = TelemetryStore(n_tc=n_tc, chunk_size=4)     # Small chunks so the store grows a few times
+    for i in range(n):
+        store.append(1.7e9 + i, i/60, [20 + i/4, np.nan if i == 3 else 21 + i/8], 130.0 if i < n-1 else 9000.0,
+                     int(i == n-1), i % 2, 1800 + i, 1810, 2, 2 if i < n-1 else 3)
+    return store
+
+
+def test_store_grows_and_keeps_the_samples():
+    store = make_store(10)
+    assert len(store) == 10
+    np.testing.assert_array_equal(store.fan1, 1800 + np.arange(10))
+    assert store.estop[-1] == 1 and store.setpoint[-1] == 9000
+
+
+def test_format_row_matches_save_csv(tmp_path):
+    store = make_store(10)
+    store.save_csv(tmp_path/'run.csv')
+    lines = (tmp_path/'run.csv').read_text().splitlines()
+    assert lines[0] == csv_header(2)
+    assert lines[1:] == [store.format_row(i) for i in range(len(store))]
+    assert store.format_row() == store.format_row(9)
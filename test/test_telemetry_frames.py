@@ -0,0 +1,72 @@
+import math
+import pytest
+
+from telemetry_frames import SYNC, TelemetryFrame, crc16, decode_frames, encode_frame, frames_to_values, quantize
+
+
+def frame(seq, temps=(20.0, 21.5, 22.25)):
+    return encode_frame(seq, 1000*seq, temps, seq % 2, 130.0, 0)
+
+
+def test_crc16_is_ccitt_false():
+    assert crc16(b'123456789') == 0x29b1     # Check value of CRC-16/CCITT-FALSE, the firmware's crc16() agrees
+
+
+def test_quantize():
+    assert quantize(21.504) == 2150
+    assert quantize(math.nan) == -32768
+    assert quantize(1000) == 32767
+
+
+def test_round_trip():
+    buf = bytearray(frame(1) + encode_frame(2, 2000, (math.nan, 150.0), 0, 9000, 1))
+    frames, consumed, n_bad = decode_frames(buf)
+    assert consumed == len(buf) and n_bad == 0
+    assert frames[0] == TelemetryFrame(1, 1000, (20.0, 21.5, 22.25), 1, 130.0, 0)
+    assert math.isnan(frames[1].temps[0]) and frames[1].temps[1] == 150.0
+    assert frames[1].setpoint == 327.67      # The i16 setpoint saturates, the estop flag is what counts
+    assert frames[1].unsafe == 1
+
+
+@pytest.mark.parametrize('split', [1, 2, 3, 10, 17])
+def test_frame_split_across_reads(split):
+    data = frame(1) + frame(2)
+    buf = bytearray(data[:split])
+    frames, consumed, n_bad = decode_frames(buf)
+    assert frames == [] and n_bad == 0
+    del buf[:consumed]
+    buf += data[split:]
+    frames, consumed, n_bad = decode_frames(buf)
+    assert [f.seq for f in frames] == [1, 2] and n_bad == 0
+    assert consumed == len(buf)
+
+
+def test_resync_after_corrupt_bytes():
+    corrupt = bytearray(frame(2))
+    corrupt[10] ^= 0xff
+    buf = bytearray(frame(1) + b'\x00garbage' + bytes(corrupt) + SYNC + b'\x01' + frame(3))
+    frames, consumed, n_bad = decode_frames(buf)
+    assert [f.seq for f in frames] == [1, 3]
+    assert n_bad == 2       # The bad CRC and the bad length
+    assert consumed == len(buf)
+
+
+def test_trailing_sync_byte_is_kept():
+    buf = bytearray(frame(1) + SYNC[:1])
+    frames, consumed, n_bad = decode_frames(buf)
+    assert len(frames) == 1 and consumed == len(buf) - 1
+
+
+def test_frames_to_values():
+    frames, _, _ = decode_frames(bytearray(frame(1) + frame(2, temps=(20.0,)) + frame(3)))
+    good, rows = frames_to_values(frames, n_tc=3)
+    assert good == [0, 2]
+    assert rows[0] == (20.0, 21.5, 22.25, 1, 130.0, 0)
+
+
+def test_reply_lines_between_frames():
+    buf = bytearray(frame(1) + b'# R 4\r\n' + frame(2) + b'# B 1\r\n# B 2\r\n' + b'# D')
+    frames, consumed, n_bad = decode_frames(buf)
+    assert [f if isinstance(f, str) else f.seq for f in frames] == [1, '# R 4', 2, '# B 1', '# B 2']
+    assert n_bad == 0
+    assert buf[consumed:] == b'# D'      # Waits for the rest of the reply
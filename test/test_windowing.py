@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from windowing import SlidingExtrema, WindowExtremaSet, parse_time_scale, window_start
+
+
+def test_parse_time_scale():
+    assert parse_time_scale('10 minutes') == 10
+    assert parse_time_scale('All time') is None
+
+
+def test_window_start():
+    times = np.array([0, 1, 2, 2, 3])
+    assert window_start(times, 2) == 2
+    assert window_start(times, 2.5) == 4
+    assert window_start(times, 10) == 5
+
+
+@pytest.mark.parametrize('span', [None, 0.5, 3])
+def test_sliding_extrema_match_brute_force(span):
+    rng = np.random.default_rng(0)
+    times = np.cumsum(rng.uniform(0.01, 0.1, 500))
+    lo = rng.normal(100, 5, 500)
+    hi = lo + rng.uniform(0, 2, 500)
+    window = SlidingExtrema(span)
+    for i, t in enumerate(times):
+        window.push(t, lo[i], hi[i])
+        start = 0 if span is None else window_start(times[:i+1], t - span)
+        assert window.min == lo[start:i+1].min()
+        assert window.max == hi[start:i+1].max()
+
+
+def test_window_set():
+    windows = WindowExtremaSet(['1 minute', 'All time'])
+    assert not windows['All time']
+    for t, value in [(0, 50), (1, 10), (1.5, 30)]:
+        windows.push(t, value, value)
+    assert (windows['1 minute'].min, windows['1 minute'].max) == (10, 30)
+    assert (windows['All time'].min, windows['All time'].max) == (10, 50)
+    windows.clear()
+    assert not windows['1 minute']